@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+"""
+论文分析结果存储 - paper_analysis表
+
+按 (论文id, 模型, prompt版本) 保存LLM的评分、置信度、关键词、描述和耗时，
+重新运行时直接读取已有结果，只把缺少的论文交给LLM。
+added_at冗余保存论文的日期，"某天评分最高的N篇"可以直接走索引。
+seq在每次写入或覆盖时由触发器递增，paper_export.py据此增量导出。
+表结构见migrations.py。
+"""
+import psycopg2
+from psycopg2.extras import execute_values
+
+# propensity不是LLM的输出：预排序探索样本被送入LLM的概率（preranker.py训练时按其倒数加权）
+ANALYSIS_COLUMNS = (
+    'relevant', 'confidence', 'relevance_score', 'analysis', 'keywords',
+    'description', 'detailed_analysis', 'propensity'
+)
+
+
+def load_analyses(connection, paper_ids, model, prompt_version):
+    """返回 {论文id: 分析结果dict}，只包含已有记录的论文"""
+    if not paper_ids:
+        return {}
+    with connection.cursor() as cursor:
+        cursor.execute(f"""
+            SELECT paper_id, {', '.join(ANALYSIS_COLUMNS)}
+            FROM paper_analysis
+            WHERE model = %s AND prompt_version = %s AND paper_id = ANY(%s);
+        """, (model, prompt_version, list(paper_ids)))
+        results = {}
+        for row in cursor.fetchall():
+            result = {column: value for column, value in zip(ANALYSIS_COLUMNS, row[1:]) if value is not None}
+            result['keywords'] = result.get('keywords', [])
+            results[row[0]] = result
+        return results
+
+
+def save_analyses(connection, rows, model, prompt_version):
+    """rows: [(论文id, added_at, 分析结果dict, 每篇耗时秒)]；同一键已存在时覆盖
+
+    整批写入失败时回滚并逐行重试，单独写入仍失败的行被跳过，返回这些行的论文id列表。
+    """
+    if not rows:
+        return []
+    values = [
+        (paper_id, model, prompt_version, added_at,
+         *(result.get(column) for column in ANALYSIS_COLUMNS), latency)
+        for paper_id, added_at, result, latency in rows
+    ]
+    try:
+        _upsert(connection, values)
+        return []
+    except psycopg2.Error:
+        connection.rollback()
+
+    failed = []
+    for value in values:
+        try:
+            _upsert(connection, [value])
+        except psycopg2.Error:
+            connection.rollback()
+            failed.append(value[0])
+    return failed
+
+
+def _upsert(connection, values):
+    with connection.cursor() as cursor:
+        execute_values(cursor, f"""
+            INSERT INTO paper_analysis
+                (paper_id, model, prompt_version, added_at, {', '.join(ANALYSIS_COLUMNS)}, latency)
+            VALUES %s
+            ON CONFLICT (paper_id, model, prompt_version) DO UPDATE SET
+                added_at = EXCLUDED.added_at,
+                {', '.join(f'{column} = EXCLUDED.{column}' for column in ANALYSIS_COLUMNS)},
+                latency = EXCLUDED.latency,
+                analyzed_at = CURRENT_TIMESTAMP;
+        """, values)
+    connection.commit()
+
+
+def top_scored(connection, added_at, model, prompt_version, limit=10, min_score=0):
+    """某一天评分最高的N篇论文：[(论文id, 评分, 描述, 标题, url)]
+
+    评分版本没有描述时，取同一模型下最近一次结构化分析的描述。
+    """
+    with connection.cursor() as cursor:
+        cursor.execute("""
+            SELECT a.paper_id, a.relevance_score,
+                   COALESCE(a.description, (
+                       SELECT d.description FROM paper_analysis d
+                       WHERE d.paper_id = a.paper_id AND d.model = a.model AND d.description IS NOT NULL
+                       ORDER BY d.analyzed_at DESC LIMIT 1
+                   )),
+                   p.title, p.url
+            FROM paper_analysis a
+            JOIN papers p ON p.id = a.paper_id
+            WHERE a.model = %s AND a.prompt_version = %s AND a.added_at = %s
+              AND a.relevance_score >= %s
+            ORDER BY a.relevance_score DESC
+            LIMIT %s;
+        """, (model, prompt_version, added_at, min_score, limit))
+        return cursor.fetchall()
@@ -5,20 +5,31 @@
 功能：
 1. 每天下午5点自动运行
 2. 爬取过去24小时内发布的Agent相关论文
-3. 自动发布到Twitter
+3. 推文写入发布队列，由后台进程发布到Twitter（post_outbox.py）
 4. 完善的错误处理和服务检查
 """
-import psycopg2
 import tweepy
-import subprocess
 import os
 
 import time
 import requests
 import logging
+import numpy as np
 from datetime import datetime, timedelta
-from config import DB_CONFIG, TWITTER_API_CONFIG, GROQ_CONFIG
+import db
+import migrations
+import near_duplicates
+import partitions
+import post_outbox
+import vector_index
+from config import TWITTER_API_CONFIG, PRERANK_CONFIG, DEDUP_CONFIG, EXPORT_CONFIG, OUTBOX_CONFIG
 from paper_analyzer import PaperAnalyzer
+from preranker import PreRanker
+from scrapy.crawler import CrawlerProcess
+from scrapy.utils.project import get_project_settings
+from tutorial.keyword_filter import is_vision_paper
+from tutorial.signals import paper_stored
+from tutorial.spiders.arxiv import ArxivSpider
 
 # 配置日志
 logging.basicConfig(
@@ -35,9 +46,8 @@ class AutomatedPaperBot:
     def __init__(self):
         """初始化机器人"""
         self.twitter_client = None
-        self.connection = None
-        self.cursor = None
         self.analyzer = None
+        self.new_papers = []
         
         logger.info("🤖 自动化Agent论文机器人初始化")
 
@@ -82,15 +92,14 @@ class AutomatedPaperBot:
         """检查数据库连接"""
         try:
             logger.info("  检查数据库连接...")
-            self.connection = psycopg2.connect(**DB_CONFIG)
-            self.cursor = self.connection.cursor()
             
-            # 测试查询
-            self.cursor.execute("SELECT 1;")
-            result = self.cursor.fetchone()
-            
-            if result:
+            # 测试查询（连接来自共享连接池，之后的查询直接复用）
+            if db.ping():
                 logger.info("  ✅ 数据库连接正常")
+                # 把数据库升级到当前表结构，提前创建论文分区（并按保留期归档旧分区）
+                migrations.ensure_schema(log=logger.info)
+                with db.connection() as connection:
+                    partitions.maintain(connection, log=logger.info)
                 return True
             else:
                 logger.error("  ❌ 数据库查询失败")
@@ -107,8 +116,7 @@ class AutomatedPaperBot:
                 consumer_key=TWITTER_API_CONFIG['consumer_key'],
                 consumer_secret=TWITTER_API_CONFIG['consumer_secret'],
                 access_token=TWITTER_API_CONFIG['access_token'],
-                access_token_secret=TWITTER_API_CONFIG['access_token_secret'],
-                wait_on_rate_limit=True
+                access_token_secret=TWITTER_API_CONFIG['access_token_secret']
             )
             
             # 测试API调用
@@ -119,79 +127,104 @@ class AutomatedPaperBot:
             else:
                 logger.error("  ❌ Twitter API认证失败")
                 return False
+        except tweepy.TooManyRequests:
+            # 限流说明认证是正常的，推文由发布进程在额度恢复后发布
+            logger.warning("  ⚠️ Twitter API限流中，推文将在额度恢复后发布")
+            return True
         except Exception as e:
             logger.error(f"  ❌ Twitter API检查失败: {e}")
             return False
 
     def crawl_last_24h_papers(self):
-        """爬取过去24小时内发布的Agent相关论文"""
+        """在当前进程中运行爬虫，爬取过去24小时内发布的Agent相关论文
+
+        通过paper_stored信号直接收集本次新入库的论文（保存在self.new_papers），
+        不需要启动scrapy子进程，也不需要再查询数据库统计数量。
+        """
         try:
             logger.info("🕷️ 开始爬取过去24小时的Agent论文...")
             
-            # 修改爬虫配置，爬取过去24小时的论文
-            process = subprocess.Popen(
-                ["scrapy", "crawl", "arxiv", "-s", "CLOSESPIDER_TIMEOUT=0"],
-                stdout=subprocess.PIPE,
-                stderr=subprocess.STDOUT,
-                text=True,
-                cwd=os.getcwd()
-            )
+            os.environ.setdefault('SCRAPY_SETTINGS_MODULE', 'tutorial.settings')
+            settings = get_project_settings()
+            settings.set('CLOSESPIDER_TIMEOUT', 0)
             
-            # 实时读取输出
-            output_lines = []
-            while True:
-                output = process.stdout.readline()
-                if output == '' and process.poll() is not None:
-                    break
-                if output:
-                    line = output.strip()
-                    output_lines.append(line)
-                    # 显示重要信息
-                    if any(keyword in line for keyword in ['Agent论文', '爬取', '论文已保存', 'Spider closed']):
-                        logger.info(f"   {line}")
+            # 使用机器人的日志配置，只显示爬虫自身的日志和Scrapy的警告
+            process = CrawlerProcess(settings, install_root_handler=False)
+            logging.getLogger('scrapy').setLevel(logging.WARNING)
             
-            # 等待进程完成
-            return_code = process.poll()
+            self.new_papers = []
+            crawler = process.create_crawler(ArxivSpider)
+            crawler.signals.connect(self._on_paper_stored, signal=paper_stored)
+            process.crawl(crawler)
+            process.start()
             
-            if return_code == 0:
+            stats = crawler.stats.get_stats()
+            finish_reason = stats.get('finish_reason')
+            
+            if finish_reason == 'finished':
                 logger.info("✅ 爬虫运行成功")
-                
-                # 检查爬取结果 - 获取过去24小时的论文
-                yesterday = (datetime.now() - timedelta(days=1)).strftime('%Y-%m-%d')
-                today = datetime.now().strftime('%Y-%m-%d')
-                
-                self.cursor.execute("""
-                    SELECT COUNT(*) FROM papers 
-                    WHERE added_at >= %s AND added_at <= %s;
-                """, (yesterday, today))
-                
-                new_count = self.cursor.fetchone()[0]
-                logger.info(f"📊 爬取到 {new_count} 篇Agent相关论文")
-                
-                return new_count > 0
+                logger.info(
+                    f"📊 请求 {stats.get('downloader/request_count', 0)} 次，"
+                    f"跳过已入库 {stats.get('prefilter/requests_saved', 0)} 篇，"
+                    f"Agent论文 {stats.get('item_scraped_count', 0)} 篇，"
+                    f"新入库 {len(self.new_papers)} 篇"
+                )
+                self._update_vector_index()
+                return True
             else:
-                logger.error(f"❌ 爬虫运行失败，返回码: {return_code}")
+                logger.error(f"❌ 爬虫运行失败，结束原因: {finish_reason}")
                 return False
                 
         except Exception as e:
             logger.error(f"❌ 爬取论文失败: {e}")
             return False
 
+    def _update_vector_index(self):
+        """把新入库和更新了版本的论文写入本地向量索引（索引需先用 python vector_index.py build 建立）"""
+        if not self.new_papers:
+            return
+        try:
+            if vector_index.update(log=logger.info) is None:
+                logger.info("  ℹ️ 未建立向量索引，跳过更新（可运行 python vector_index.py build）")
+        except Exception as e:
+            logger.error(f"  ❌ 向量索引更新失败: {e}")
+
+    def _export_columnar(self):
+        """把新论文和本次的分析结果增量导出为列式文件（EXPORT_ENABLED=true时）"""
+        if not EXPORT_CONFIG['enabled']:
+            return
+        try:
+            # pyarrow是可选依赖，只在启用导出时导入
+            import paper_export
+            paper_export.export(log=logger.info)
+        except Exception as e:
+            logger.error(f"  ❌ 列式导出失败: {e}")
+
+    def _on_paper_stored(self, item, spider):
+        """paper_stored信号回调：记录新入库的论文，格式与get_last_24h_papers一致"""
+        self.new_papers.append(db.Paper(
+            item['id'], item['category'], item['title'], item['authors'],
+            item['abstract'], item['url'], item['added_at']
+        ))
+
+    def get_crawled_papers(self):
+        """获取待分析的论文：优先使用本次爬取新入库的论文，没有时回退到数据库中过去24小时的论文"""
+        yesterday = (datetime.now() - timedelta(days=1)).strftime('%Y-%m-%d')
+        papers = [
+            paper for paper in reversed(self.new_papers)
+            if paper[1] in ('cs.CL', 'cs.AI') and str(paper[6]) >= yesterday
+        ]
+        if papers:
+            logger.info(f"📚 本次新入库 {len(papers)} 篇Agent论文")
+            return papers
+        
+        logger.info("📚 本次没有新入库的论文，使用数据库中过去24小时的论文")
+        return self.get_last_24h_papers()
+
     def get_last_24h_papers(self):
         """获取过去24小时的Agent论文"""
         try:
-            yesterday = (datetime.now() - timedelta(days=1)).strftime('%Y-%m-%d')
-            today = datetime.now().strftime('%Y-%m-%d')
-            
-            self.cursor.execute("""
-                SELECT id, category, title, authors, abstract, url, added_at
-                FROM papers 
-                WHERE added_at >= %s AND added_at <= %s
-                AND (category = 'cs.CL' OR category = 'cs.AI')
-                ORDER BY sn DESC;
-            """, (yesterday, today))
-            
-            papers = self.cursor.fetchall()
+            papers = db.get_last_24h_papers()
             logger.info(f"📚 过去24小时有 {len(papers)} 篇Agent论文")
             return papers
         except Exception as e:
@@ -211,35 +244,36 @@ class AutomatedPaperBot:
             return []
         
         scored_papers = []
+        candidates = []
         
         for i, paper in enumerate(papers, 1):
             paper_id, category, title, authors, abstract, url, added_at = paper
             
-            logger.info(f"  分析 {i}/{len(papers)}: {title[:50]}...")
-            
             if not abstract or len(abstract.strip()) < 50:
-                logger.info("    ⚠️ 摘要太短，跳过")
+                logger.info(f"  ⚠️ 摘要太短，跳过: {title[:50]}...")
                 continue
             
-            # 检查是否为视觉相关论文（排除）
-            vision_keywords = [
-                'vision', 'visual', 'image', 'video', 'computer vision', 'cv', 
-                'object detection', 'segmentation', 'recognition', 'vqa', 
-                'multimodal', 'image generation', 'visual question answering'
-            ]
-            title_lower = title.lower()
-            abstract_lower = abstract.lower()
-            
-            is_vision_related = any(keyword in title_lower or keyword in abstract_lower for keyword in vision_keywords)
-            
-            if is_vision_related:
-                logger.info("    🚫 视觉相关论文，跳过")
+            # 检查是否为视觉相关论文（排除），关键词见tutorial/keyword_filter.py
+            if is_vision_paper(title, abstract):
+                logger.info(f"  🚫 视觉相关论文，跳过: {title[:50]}...")
                 continue
             
+            candidates.append(paper)
+        
+        candidates = self._collapse_duplicates(candidates, papers)
+        candidates, propensities = self._prerank(candidates)
+        logger.info(f"📋 {len(candidates)}/{len(papers)} 篇论文进入LLM分析")
+        
+        # 使用AI并发分析论文相关性，结果按输入顺序返回
+        # 已存在paper_analysis中的结果直接使用，不再重复调用LLM
+        analyses = self.analyzer.score_papers(
+            ((paper[0], paper[4], paper[6]) for paper in candidates),
+            "Agent, Multi-Agent Systems, Agentic AI, LLM Agents",
+            propensities
+        )
+        for i, (paper, analysis) in enumerate(zip(candidates, analyses), 1):
+            logger.info(f"  分析 {i}/{len(candidates)}: {paper[2][:50]}...")
             try:
-                # 使用AI分析论文相关性
-                analysis = self.analyzer.analyze_abstract(abstract, "Agent, Multi-Agent Systems, Agentic AI, LLM Agents")
-                
                 # 只保留高分论文（8分以上）- 更严格的Agent论文筛选
                 if analysis['relevance_score'] < 8:
                     logger.info(f"    📊 评分过低: {analysis['relevance_score']}/10，跳过（需要≥8分）")
@@ -258,7 +292,18 @@ class AutomatedPaperBot:
         
         # 按评分排序，取前N篇
         scored_papers.sort(key=lambda x: x['score'], reverse=True)
-        top_papers = scored_papers[:max_papers]
+        shortlist = scored_papers[:max_papers]
+        
+        # 入选论文沿用上面的评分，每篇再调用一次LLM生成推文描述和详细分析，
+        # 发推时不再单独调用LLM
+        logger.info(f"🔬 为 {len(shortlist)} 篇入选论文生成描述和详细分析...")
+        details = self.analyzer.detail_papers(
+            (data['paper'][0], data['paper'][2], data['paper'][4], data['paper'][6], data['analysis'])
+            for data in shortlist
+        )
+        for paper_data, analysis in zip(shortlist, details):
+            paper_data['analysis'] = analysis
+        top_papers = shortlist
         
         logger.info(f"✅ 选出前 {len(top_papers)} 篇最相关的Agent论文")
         for i, paper_data in enumerate(top_papers, 1):
@@ -268,118 +313,182 @@ class AutomatedPaperBot:
         
         return top_papers
 
-    def post_papers_to_twitter(self, papers):
-        """发布论文到Twitter - 单条推文格式，优先保证描述和链接完整"""
-        if not papers:
-            logger.info("📝 没有论文可发布")
-            return
+    def _paper_description(self, paper_data):
+        """取结构化分析中的描述，没有时单独生成"""
+        description = paper_data['analysis'].get('description')
+        if description:
+            return description
+        paper_id, category, title, authors, abstract, url, added_at = paper_data['paper']
+        try:
+            return self.analyzer.generate_description(title, abstract)
+        except Exception as e:
+            logger.error(f"    ❌ 描述生成失败: {e}")
+            return "Novel AI agent approach solving key challenges."
+
+    def _collapse_duplicates(self, candidates, papers):
+        """合并近似重复的候选论文：同一重复簇只保留一篇，与之前入库的论文重复的全部去掉
+
+        候选论文的MinHash签名会保存到paper_minhash，之后的运行可以据此识别重复。
+        """
+        if not DEDUP_CONFIG['enabled'] or not candidates:
+            return candidates
         
-        logger.info(f"📱 准备发布 {len(papers)} 篇论文推文")
+        try:
+            start = time.perf_counter()
+            sigs = near_duplicates.signatures(near_duplicates.paper_text(paper[2], paper[4]) for paper in candidates)
+            with db.connection() as connection:
+                near_duplicates.save_signatures(connection, [paper[0] for paper in candidates], sigs)
+                # 本次时间窗口以外、与候选论文有相同分段的论文
+                earlier_ids, earlier_sigs = near_duplicates.load_colliding(
+                    connection, sigs, exclude_ids=[paper[0] for paper in papers]
+                )
+            labels = near_duplicates.cluster(np.vstack([earlier_sigs, sigs]), DEDUP_CONFIG['threshold'])
+            elapsed = time.perf_counter() - start
+        except Exception as e:
+            logger.error(f"  ❌ 近似重复检测失败，不做合并: {e}")
+            return candidates
+        
+        kept = []
+        offset = len(earlier_ids)
+        for index, paper in enumerate(candidates, offset):
+            representative = labels[index]
+            if representative < offset:
+                logger.info(f"  🧬 与已入库论文 {earlier_ids[representative]} 近似重复，跳过: {paper[2][:50]}...")
+            elif representative != index:
+                logger.info(f"  🧬 与 {candidates[representative - offset][0]} 近似重复，跳过: {paper[2][:50]}...")
+            else:
+                kept.append(paper)
+        if len(kept) < len(candidates):
+            logger.info(f"  🧬 近似重复合并: 保留 {len(kept)}/{len(candidates)} 篇 ({elapsed * 1000:.0f} ms)")
+        return kept
+
+    def _prerank(self, candidates):
+        """用本地预排序模型去掉大概率达不到8分的论文，没有模型文件时原样返回
+
+        低于阈值的论文按explore_rate的概率仍然送入LLM（探索样本），否则以后的训练数据
+        只剩模型认为相关的论文。返回 (送入LLM的论文, {探索样本的论文id: explore_rate})，
+        这个概率随评分保存，preranker.py训练时按其倒数加权。
+        """
+        model_path = PRERANK_CONFIG['model_path']
+        if not PRERANK_CONFIG['enabled'] or not candidates:
+            return candidates, {}
+        if not os.path.exists(model_path):
+            logger.info(f"  ℹ️ 未找到预排序模型 {model_path}，全部论文送入LLM（可运行 python preranker.py train）")
+            return candidates, {}
         
         try:
-            successful_tweets = 0
-            tweet_ids = []
-            
-            for i, paper_data in enumerate(papers, 1):
-                paper = paper_data['paper']
-                paper_id, category, title, authors, abstract, url, added_at = paper
-                
-                logger.info(f"\n📱 发布第 {i} 篇论文推文")
-                logger.info(f"📄 {title[:50]}...")
-                
-                # 生成论文描述
-                try:
-                    description = self.analyzer.generate_description(title, abstract)
-                    logger.info(f"    📝 生成描述 ({len(description)} 字符): {description}")
-                except Exception as e:
-                    logger.error(f"    ❌ 描述生成失败: {e}")
-                    description = "Novel AI agent approach solving key challenges."
-                
-                # 清理标题，去掉"Title:"前缀节省字符
-                clean_title = title.replace("Title:", "").strip()
-                
-                # 智能字符分配：优先保证描述和链接完整，动态分配标题空间
-                # 计算固定部分：描述 + 链接 + 换行符（这些部分不能被截断）
-                fixed_chars = len(description) + len(url) + 4  # 4个换行符
-                
-                # 计算标题可用的字符数
-                available_for_title = 280 - fixed_chars
-                
-                # 如果标题需要截断
-                if len(clean_title) > available_for_title:
-                    if available_for_title >= 10:  # 确保标题至少有10个字符才显示
-                        truncated_title = clean_title[:available_for_title-3] + "..."
-                        tweet_content = f"""{truncated_title}
+            ranker = PreRanker.load(model_path)
+            start = time.perf_counter()
+            probs = ranker.score([(paper[2], paper[4]) for paper in candidates])
+            elapsed = time.perf_counter() - start
+        except Exception as e:
+            logger.error(f"  ❌ 预排序失败，全部论文送入LLM: {e}")
+            return candidates, {}
+        
+        explore_rate = PRERANK_CONFIG['explore_rate']
+        draws = np.random.default_rng().random(len(candidates))
+        kept, propensities = [], {}
+        for paper, prob, draw in zip(candidates, probs, draws):
+            if prob >= ranker.threshold:
+                kept.append(paper)
+            elif draw < explore_rate:
+                kept.append(paper)
+                propensities[paper[0]] = explore_rate
+        logger.info(f"  🧮 预排序: 保留 {len(kept) - len(propensities)}/{len(candidates)} 篇，"
+                    f"另有 {len(propensities)} 篇低于阈值的探索样本 "
+                    f"(阈值 {ranker.threshold:.3f}, {elapsed / len(candidates) * 1e6:.0f} µs/篇)")
+        return kept, propensities
+
+    def _compose_tweet(self, paper_data):
+        """生成单条推文 - 优先保证描述和链接完整，动态分配标题空间"""
+        paper_id, category, title, authors, abstract, url, added_at = paper_data['paper']
+
+        # 论文描述（结构化分析时已生成）
+        description = self._paper_description(paper_data)
+        logger.info(f"    📝 描述 ({len(description)} 字符): {description}")
+        
+        # 清理标题，去掉"Title:"前缀节省字符
+        clean_title = title.replace("Title:", "").strip()
+        
+        # 智能字符分配：优先保证描述和链接完整，动态分配标题空间
+        # 计算固定部分：描述 + 链接 + 换行符（这些部分不能被截断）
+        fixed_chars = len(description) + len(url) + 4  # 4个换行符
+        
+        # 计算标题可用的字符数
+        available_for_title = 280 - fixed_chars
+        
+        # 如果标题需要截断
+        if len(clean_title) > available_for_title:
+            if available_for_title >= 10:  # 确保标题至少有10个字符才显示
+                truncated_title = clean_title[:available_for_title-3] + "..."
+                tweet_content = f"""{truncated_title}
 
 {description}
 
 {url}"""
-                        logger.info(f"⚠️ 标题截断至 {available_for_title-3} 字符以适应 {len(description)} 字符的描述")
-                        logger.info(f"✅ 智能分配：描述 {len(description)} 字符，标题 {len(truncated_title)} 字符")
-                    else:
-                        # 极端情况：描述太长，不显示标题，只显示描述和链接
-                        tweet_content = f"""{description}
+                logger.info(f"⚠️ 标题截断至 {available_for_title-3} 字符以适应 {len(description)} 字符的描述")
+                logger.info(f"✅ 智能分配：描述 {len(description)} 字符，标题 {len(truncated_title)} 字符")
+            else:
+                # 极端情况：描述太长，不显示标题，只显示描述和链接
+                tweet_content = f"""{description}
 
 {url}"""
-                        logger.warning(f"⚠️ 描述很长 ({len(description)} 字符)，可用空间不足 ({available_for_title} 字符)，不显示标题")
-                        logger.info(f"✅ 极简格式：仅显示描述和链接")
-                else:
-                    # 标题无需截断，显示完整标题
-                    tweet_content = f"""{clean_title}
+                logger.warning(f"⚠️ 描述很长 ({len(description)} 字符)，可用空间不足 ({available_for_title} 字符)，不显示标题")
+                logger.info(f"✅ 极简格式：仅显示描述和链接")
+        else:
+            # 标题无需截断，显示完整标题
+            tweet_content = f"""{clean_title}
 
 {description}
 
 {url}"""
-                    remaining_chars = available_for_title - len(clean_title)
-                    logger.info(f"✅ 标题完整显示，剩余 {remaining_chars} 字符空间")
+            remaining_chars = available_for_title - len(clean_title)
+            logger.info(f"✅ 标题完整显示，剩余 {remaining_chars} 字符空间")
+        
+        final_length = len(tweet_content)
+        if final_length > 280:
+            logger.error(f"❌ 推文仍超限 {final_length}/280 字符，需要进一步优化")
+        else:
+            logger.info(f"✅ 推文长度符合要求 {final_length}/280 字符")
+        return tweet_content
+
+    def post_papers_to_twitter(self, papers):
+        """把推文按排名写入发布队列（post_outbox），由后台发布进程发布，不等待发布完成"""
+        if not papers:
+            logger.info("📝 没有论文可发布")
+            return
+        
+        logger.info(f"📱 准备发布 {len(papers)} 篇论文推文")
+        
+        try:
+            posts = []
+            for i, paper_data in enumerate(papers, 1):
+                paper_id, category, title, authors, abstract, url, added_at = paper_data['paper']
                 
-                final_length = len(tweet_content)
-                if final_length > 280:
-                    logger.error(f"❌ 推文仍超限 {final_length}/280 字符，需要进一步优化")
-                else:
-                    logger.info(f"✅ 推文长度符合要求 {final_length}/280 字符")
+                logger.info(f"\n📱 第 {i} 篇论文推文")
+                logger.info(f"📄 {title[:50]}...")
+                tweet_content = self._compose_tweet(paper_data)
                 
                 logger.info(f"📝 推文内容 ({len(tweet_content)} 字符):")
                 logger.info("=" * 40)
                 logger.info(tweet_content)
                 logger.info("=" * 40)
-                
-                try:
-                    # 发布推文，最多重试3次
-                    for attempt in range(3):
-                        try:
-                            response = self.twitter_client.create_tweet(text=tweet_content)
-                            if response.data:
-                                tweet_id = response.data['id']
-                                tweet_ids.append(tweet_id)
-                                successful_tweets += 1
-                                logger.info(f"✅ 推文 {i} 发布成功！ID: {tweet_id}")
-                                break
-                            else:
-                                logger.error(f"❌ 推文 {i} 发布失败 - 无响应数据")
-                        except Exception as tweet_error:
-                            logger.error(f"❌ 推文 {i} 发布失败 (尝试 {attempt + 1}/3): {tweet_error}")
-                            if attempt < 2:
-                                time.sleep(5)  # 等待5秒后重试
-                            else:
-                                break
-                    
-                    # 推文间隔10秒
-                    if i < len(papers):
-                        logger.info("⏳ 等待10秒...")
-                        time.sleep(10)
-                        
-                except Exception as tweet_error:
-                    logger.error(f"❌ 推文 {i} 发布失败: {tweet_error}")
-                    continue
+                posts.append((paper_id, tweet_content, url))
             
-            logger.info(f"\n🎉 推文发布完成！")
-            logger.info(f"📊 成功发布 {successful_tweets}/{len(papers)} 条推文")
-            if tweet_ids:
-                logger.info(f"🔗 推文IDs: {', '.join(tweet_ids)}")
+            # 已入队过的论文（例如同一天重复运行）不会再次入队，也就不会重复发布
+            with db.connection() as connection:
+                queued = post_outbox.enqueue(connection, posts)
+            logger.info(f"\n📬 {queued}/{len(posts)} 条推文已加入发布队列"
+                        + (f"（{len(posts) - queued} 篇论文之前已入队）" if queued < len(posts) else ""))
+            
+            if OUTBOX_CONFIG['autostart']:
+                pid = post_outbox.start_worker()
+                logger.info(f"🚀 后台发布进程已启动 (PID {pid})，发布进度见日志或 python post_outbox.py status")
+            else:
+                logger.info("💡 推文将由定时运行的 python post_outbox.py 发布")
                 
         except Exception as e:
-            logger.error(f"❌ 推文发布失败: {e}")
+            logger.error(f"❌ 推文入队失败: {e}")
 
     def daily_task(self):
         """每日自动任务：爬取过去24小时的论文并发布"""
@@ -398,13 +507,14 @@ class AutomatedPaperBot:
                 return
             
             # 步骤3: 获取论文
-            papers = self.get_last_24h_papers()
+            papers = self.get_crawled_papers()
             if not papers:
                 logger.info("📝 没有新的Agent论文，今日无推文")
                 return
             
             # 步骤4: AI分析并选出最相关的论文
             top_papers = self.analyze_and_select_papers(papers, max_papers=10)
+            self._export_columnar()
             if not top_papers:
                 logger.info("📝 没有找到高质量Agent论文，今日无推文")
                 return
@@ -464,13 +574,14 @@ class AutomatedPaperBot:
                 return
             
             # 步骤3: 获取论文
-            papers = self.get_last_24h_papers()
+            papers = self.get_crawled_papers()
             if not papers:
                 logger.info("📝 没有新的Agent论文可分析")
                 return
             
             # 步骤4: AI分析并选出最相关的论文
             top_papers = self.analyze_and_select_papers(papers, max_papers=10)
+            self._export_columnar()
             if not top_papers:
                 logger.info("📝 没有找到高质量Agent论文")
                 return
@@ -493,64 +604,10 @@ class AutomatedPaperBot:
                 logger.info(f"链接: {url}")
                 logger.info(f"AI分析: {analysis.get('analysis', 'N/A')[:100]}...")
                 
-                # 生成推文内容
-                try:
-                    description = self.analyzer.generate_description(title, abstract)
-                    logger.info(f"📝 生成描述 ({len(description)} 字符): {description}")
-                except Exception as e:
-                    logger.error(f"❌ 描述生成失败: {e}")
-                    description = "Novel AI agent approach solving key challenges."
-                
-                # 清理标题，去掉"Title:"前缀节省字符
-                clean_title = title.replace("Title:", "").strip()
-                
-                # 构建推文内容
-                tweet_content = f"""{clean_title}
-
-{description}
-
-{url}"""
-                
-                # 智能字符分配：优先保证描述和链接完整，动态分配标题空间
-                # 计算固定部分：描述 + 链接 + 换行符（这些部分不能被截断）
-                fixed_chars = len(description) + len(url) + 4  # 4个换行符
-                
-                # 计算标题可用的字符数
-                available_for_title = 280 - fixed_chars
-                
-                # 如果标题需要截断
-                if len(clean_title) > available_for_title:
-                    if available_for_title >= 10:  # 确保标题至少有10个字符才显示
-                        truncated_title = clean_title[:available_for_title-3] + "..."
-                        tweet_content = f"""{truncated_title}
-
-{description}
-
-{url}"""
-                        logger.info(f"⚠️ 标题截断至 {available_for_title-3} 字符以适应 {len(description)} 字符的描述")
-                        logger.info(f"✅ 智能分配：描述 {len(description)} 字符，标题 {len(truncated_title)} 字符")
-                    else:
-                        # 极端情况：描述太长，不显示标题，只显示描述和链接
-                        tweet_content = f"""{description}
-
-{url}"""
-                        logger.warning(f"⚠️ 描述很长 ({len(description)} 字符)，可用空间不足 ({available_for_title} 字符)，不显示标题")
-                        logger.info(f"✅ 极简格式：仅显示描述和链接")
-                else:
-                    # 标题无需截断，显示完整标题
-                    tweet_content = f"""{clean_title}
-
-{description}
-
-{url}"""
-                    remaining_chars = available_for_title - len(clean_title)
-                    logger.info(f"✅ 标题完整显示，剩余 {remaining_chars} 字符空间")
+                if analysis.get('detailed_analysis'):
+                    logger.info(f"详细分析: {analysis['detailed_analysis']}")
                 
-                final_length = len(tweet_content)
-                if final_length > 280:
-                    logger.error(f"❌ 推文仍超限 {final_length}/280 字符，需要进一步优化")
-                else:
-                    logger.info(f"✅ 推文长度符合要求 {final_length}/280 字符")
+                tweet_content = self._compose_tweet(paper_data)
                 
                 # 显示最终推文内容
                 logger.info(f"\n📱 推文内容预览 ({len(tweet_content)}/280 字符):")
@@ -571,11 +628,12 @@ class AutomatedPaperBot:
         """关闭连接"""
         try:
             if self.analyzer:
+                if self.analyzer.cache:
+                    logger.info(f"🗃️ LLM缓存: {self.analyzer.cache.summary()}")
                 self.analyzer.close()
-            if self.cursor:
-                self.cursor.close()
-            if self.connection:
-                self.connection.close()
+            for line in db.format_query_stats():
+                logger.info(f"🗄️ {line}")
+            db.close_pool()
             logger.info("🔒 连接已关闭")
         except Exception as e:
             logger.error(f"❌ 关闭连接失败: {e}")
@@ -0,0 +1,57 @@
+#!/usr/bin/env python3
+"""
+LLM并发分析基准测试 - 对比逐篇analyze_abstract与并发analyze_many
+
+使用本地模拟的chat-completions服务器，不需要Groq API密钥和数据库。
+
+用法: python benchmarks/bench_analyze_many.py [论文数] [延迟秒] [并发数]
+"""
+import os
+import sys
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from fake_llm_server import start_fake_llm_server
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 40
+    latency = float(sys.argv[2]) if len(sys.argv) > 2 else 0.5
+    concurrency = int(sys.argv[3]) if len(sys.argv) > 3 else 8
+
+    server, base_url = start_fake_llm_server(latency)
+    # 必须在导入config之前设置
+    os.environ.update({
+        "GROQ_BASE_URL": base_url,
+        "GROQ_API_KEY": "fake-key",
+        "GROQ_MODEL": "fake-model",
+        "GROQ_RPM": "0",
+        "GROQ_TPM": "0",
+        # 第二轮不能命中第一轮的缓存
+        "LLM_CACHE_ENABLED": "false",
+    })
+    from paper_analyzer import PaperAnalyzer
+
+    analyzer = PaperAnalyzer()
+    abstracts = [f"Paper {i}: we propose a multi-agent framework for task {i}. " * 5 for i in range(count)]
+
+    print(f"📊 {count} 篇摘要，模拟延迟 {latency}s")
+    start = time.perf_counter()
+    sequential = [analyzer.analyze_abstract(a) for a in abstracts]
+    seq_time = time.perf_counter() - start
+    print(f"  逐篇分析          {seq_time:7.2f}s  {count / seq_time:6.2f} 篇/秒")
+
+    start = time.perf_counter()
+    concurrent = list(analyzer.analyze_many(abstracts, max_concurrency=concurrency, batch_size=1))
+    conc_time = time.perf_counter() - start
+    print(f"  并发分析(并发{concurrency:<2})   {conc_time:7.2f}s  {count / conc_time:6.2f} 篇/秒  加速 {seq_time / conc_time:.1f}x")
+
+    same_order = [r["relevance_score"] for r in sequential] == [r["relevance_score"] for r in concurrent]
+    print(f"  结果顺序一致: {'✅' if same_order else '❌'}")
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
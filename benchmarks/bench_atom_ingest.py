@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+"""
+arXiv API批量导入基准测试（离线）
+
+使用benchmarks/fixtures中的Atom feed，复制成N条记录后测量流式解析速度和内存峰值，
+并用ArxivApiSpider.parse_feed处理原始fixture，确认输出的item与HTML爬虫一致。
+
+用法: python benchmarks/bench_atom_ingest.py [条目数]
+"""
+import io
+import os
+import re
+import sys
+import time
+import tracemalloc
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from scrapy.http import Request, XmlResponse
+from scrapy.utils.test import get_crawler
+
+from tutorial.atom import parse_atom_feed
+from tutorial.spiders.arxiv_api import ArxivApiSpider
+
+FIXTURE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures", "arxiv_atom_page.xml")
+
+
+def scaled_feed(count):
+    """把fixture中的entry复制成count条，id各不相同"""
+    with open(FIXTURE, "rb") as f:
+        content = f.read()
+    head, rest = content.split(b"<entry>", 1)
+    entries = [b"<entry>" + e for e in (b"<entry>" + rest).split(b"<entry>")[1:]]
+    entries[-1] = entries[-1].replace(b"</feed>", b"")
+
+    parts = [head]
+    for i in range(count):
+        entry = entries[i % len(entries)]
+        parts.append(re.sub(rb"abs/\d{4}\.\d{5}", b"abs/2501.%05d" % (i % 100000), entry))
+    parts.append(b"</feed>\n")
+    return b"".join(parts)
+
+
+def bench_parse(count):
+    body = scaled_feed(count)
+    tracemalloc.start()
+    start = time.perf_counter()
+    parsed = sum(1 for _ in parse_atom_feed(io.BytesIO(body)))
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f"📊 流式解析 {parsed} 条 ({len(body) / 1024 / 1024:.1f} MB): "
+          f"{elapsed:.2f}s, {parsed / elapsed:.0f} 条/秒, 内存峰值 {peak / 1024 / 1024:.1f} MB")
+
+
+def bench_spider():
+    crawler = get_crawler(ArxivApiSpider, {"KNOWN_ID_PREFILTER": False})
+    spider = ArxivApiSpider.from_crawler(crawler, days=36500)
+    spider.cutoff = "0000"
+    with open(FIXTURE, "rb") as f:
+        body = f.read()
+    request = Request("https://export.arxiv.org/api/query", meta={"start": 0, "page_size": 200})
+    results = list(spider.parse_feed(XmlResponse(url=request.url, body=body, request=request)))
+    items = [r for r in results if isinstance(r, dict)]
+    print(f"🕷️ fixture中 Agent论文 {len(items)} 篇:")
+    for item in items:
+        print(f"   {item['id']}v{item['version']} [{item['categories']}] {item['title'][:60]}")
+
+
+def estimate(count, download_delay=1.0, api_delay=3.0, page_size=200, listing_pages=12):
+    """按下载延迟估算两种模式的最短爬取时间"""
+    html_requests = listing_pages + count
+    api_requests = -(-count // page_size)
+    print(f"⏱️ {count} 篇论文的请求数: 摘要页模式 {html_requests} 次 (≥{html_requests * download_delay:.0f}s), "
+          f"API模式 {api_requests} 次 (≥{api_requests * api_delay:.0f}s)")
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    bench_parse(count)
+    bench_spider()
+    estimate(300)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+"""
+批量评分基准测试 - 对比逐篇评分和多篇打包评分的token用量与耗时
+
+使用本地模拟的chat-completions服务器（固定延迟 + 按输出token计的生成时间），
+串行执行以便比较每篇论文的开销。最后一组模拟批量输出无法解析、退回逐篇评分的情况。
+
+用法: python benchmarks/bench_batch_scoring.py [论文数] [批大小] [延迟秒]
+"""
+import os
+import sys
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from fake_llm_server import FakeLLMHandler, default_responder, start_fake_llm_server
+
+
+def broken_batch_responder(prompt):
+    if "JSON array" in prompt:
+        return "Sorry, here are the scores: paper 1 looks relevant"
+    return default_responder(prompt)
+
+
+def run(analyzer, abstracts, label, batch_size):
+    before = dict(FakeLLMHandler.stats)
+    start = time.perf_counter()
+    results = list(analyzer.analyze_many(abstracts, max_concurrency=1, batch_size=batch_size))
+    elapsed = time.perf_counter() - start
+    used = {key: FakeLLMHandler.stats[key] - before[key] for key in before}
+    count = len(abstracts)
+    print(f"  {label:<22} 请求 {used['requests']:4d}  输入 {used['prompt_tokens'] / count:6.0f} tok/篇  "
+          f"输出 {used['completion_tokens'] / count:4.0f} tok/篇  耗时 {elapsed / count * 1000:6.0f} ms/篇")
+    return [r['relevance_score'] for r in results]
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 32
+    batch_size = int(sys.argv[2]) if len(sys.argv) > 2 else 8
+    latency = float(sys.argv[3]) if len(sys.argv) > 3 else 0.3
+
+    server, base_url = start_fake_llm_server(latency, token_latency=0.002)
+    # 必须在导入config之前设置
+    os.environ.update({
+        "GROQ_BASE_URL": base_url,
+        "GROQ_API_KEY": "fake-key",
+        "GROQ_MODEL": "fake-model",
+        "GROQ_RPM": "0",
+        "GROQ_TPM": "0",
+        "LLM_CACHE_ENABLED": "false",
+    })
+    from paper_analyzer import PaperAnalyzer
+
+    analyzer = PaperAnalyzer()
+    abstracts = [f"Paper {i}: we propose a multi-agent framework where LLM agents coordinate on task {i}, "
+                 f"evaluate it on several benchmarks and report consistent improvements. " * 6
+                 for i in range(count)]
+
+    print(f"📊 {count} 篇摘要，批大小 {batch_size}，请求延迟 {latency}s + 2ms/输出token")
+    single = run(analyzer, abstracts, "逐篇评分", 1)
+    batched = run(analyzer, abstracts, f"批量评分 (N≤{batch_size})", batch_size)
+    print(f"  评分一致: {'✅' if single == batched else '❌'}")
+
+    FakeLLMHandler.responder = staticmethod(broken_batch_responder)
+    fallback = run(analyzer, abstracts, "批量输出无法解析→逐篇", batch_size)
+    print(f"  退回逐篇后评分一致: {'✅' if single == fallback else '❌'}")
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
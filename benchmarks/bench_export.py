@@ -0,0 +1,145 @@
+#!/usr/bin/env python3
+"""
+列式导出基准测试 - 读取一年的论文和评分：psycopg2 SELECT 与 paper_export.read() 的耗时和峰值内存
+
+在临时schema中用migrations.py建表，写入跨越一年的合成论文（每篇一条分析结果），
+导出为Arrow和Parquet文件后，每种方式在单独的子进程中完成同一组分析（按分类计数、
+评分分布，并取出标题和摘要列），比较耗时和进程的峰值RSS。运行结束后删除schema和导出目录。
+
+用法: python benchmarks/bench_export.py [论文数]
+"""
+import os
+import resource
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from collections import Counter
+from datetime import date, timedelta
+
+SCHEMA = "bench_export"
+# 子进程继承环境变量，db.py的连接池和psycopg2连接都只看到临时schema
+os.environ['PGOPTIONS'] = f"-c search_path={SCHEMA}"
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+SINCE = date.today() - timedelta(days=364)
+COLUMNS = ['id', 'category', 'title', 'abstract', 'added_at']
+
+
+def run(mode, path):
+    """在当前进程中完成一组分析，返回 (耗时秒, 峰值RSS MB, 论文数)"""
+    import db
+    import numpy as np
+
+    start = time.perf_counter()
+    if mode == "select":
+        with db.connection() as connection, connection.cursor() as cursor:
+            cursor.execute(f"SELECT {', '.join(COLUMNS)} FROM papers WHERE added_at >= %s;", (SINCE,))
+            papers = cursor.fetchall()
+            cursor.execute("SELECT relevance_score FROM paper_analysis WHERE added_at >= %s;", (SINCE,))
+            scores = np.array([row[0] for row in cursor.fetchall()])
+        categories = Counter(row[1] for row in papers)
+        text_bytes = sum(len(row[2]) + len(row[3]) for row in papers)
+        count = len(papers)
+    else:
+        import paper_export
+
+        papers = paper_export.read('papers', COLUMNS, since=SINCE, path=path)
+        categories = paper_export.category_counts(since=SINCE, path=path)
+        scores = paper_export.column('analysis', 'relevance_score', since=SINCE, path=path)
+        # 文本列保持为Arrow缓冲区，只统计字节数，不转成Python字符串
+        text_bytes = papers['title'].nbytes + papers['abstract'].nbytes
+        count = len(papers)
+    np.bincount(scores, minlength=11)
+    elapsed = time.perf_counter() - start
+    assert sum(categories.values()) == count and text_bytes > 0
+    db.close_pool()
+    return elapsed, resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, count
+
+
+def populate(connection, count):
+    """写入count篇均匀分布在最近一年（及之前一个月）的论文，每篇一条分析结果"""
+    import partitions
+
+    first_day = SINCE - timedelta(days=30)
+    days = (date.today() - first_day).days + 1
+    partitions.ensure(connection, [first_day + timedelta(days=day) for day in range(0, days, 28)] + [date.today()])
+    with connection.cursor() as cursor:
+        cursor.execute("""
+            INSERT INTO papers (id, category, categories, version, title, authors, abstract, url, added_at)
+            SELECT 'b' || i, (ARRAY['cs.AI', 'cs.CL', 'cs.LG', 'cs.CV', 'cs.MA'])[1 + i %% 5], 'cs.AI', 1,
+                   'Synthetic paper ' || i || ' on multi-agent planning', 'Author ' || i,
+                   repeat('We study multi-agent planning and tool use. ', 14),
+                   'https://arxiv.org/abs/' || i, %s::date + (i %% %s)
+            FROM generate_series(1, %s) i;
+        """, (first_day, days, count))
+        cursor.execute("""
+            INSERT INTO paper_analysis (paper_id, model, prompt_version, added_at, relevant, confidence,
+                                        relevance_score, analysis, keywords, description, latency)
+            SELECT id, 'bench-model', 'v1', added_at, sn % 3 = 0, 'medium', (sn * 7) % 11,
+                   'Synthetic analysis', ARRAY['agents', 'planning'], 'Synthetic description', 1.5
+            FROM papers ORDER BY sn;
+        """)
+        cursor.execute("ANALYZE papers; ANALYZE paper_analysis;")
+    connection.commit()
+
+
+def main():
+    if len(sys.argv) == 4 and sys.argv[1] == "--child":
+        elapsed, peak, count = run(sys.argv[2], sys.argv[3])
+        print(f"{elapsed} {peak} {count}")
+        return
+
+    import psycopg2
+
+    import db
+    import migrations
+    import paper_export
+    from config import DB_CONFIG
+
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 300000
+    connection = psycopg2.connect(**DB_CONFIG, options="-c search_path=public")
+    with connection.cursor() as cursor:
+        cursor.execute(f"DROP SCHEMA IF EXISTS {SCHEMA} CASCADE; CREATE SCHEMA {SCHEMA};")
+    connection.commit()
+    connection.close()
+
+    root = tempfile.mkdtemp(prefix='bench_export_')
+    try:
+        with db.connection() as connection:
+            migrations.migrate(connection, log=lambda message: None)
+            populate(connection, count)
+        modes = [("select", "", "psycopg2 SELECT")]
+        for file_format in ("arrow", "parquet"):
+            path = os.path.join(root, file_format)
+            start = time.perf_counter()
+            paper_export.export(path, file_format, log=lambda message: None)
+            elapsed = time.perf_counter() - start
+            size = sum(os.path.getsize(os.path.join(directory, name))
+                       for directory, _, names in os.walk(path) for name in names)
+            print(f"🗃️ 导出 {file_format:<8} {elapsed:6.1f}s {size / 2 ** 20:8.1f} MB")
+            modes.append((file_format, path, f"read() {file_format}"))
+        db.close_pool()
+
+        print(f"📊 {count} 篇论文，读取最近一年（{SINCE} 起）")
+        print(f"   {'方式':<18} {'论文数':>8} {'耗时':>9} {'峰值RSS':>10}")
+        for mode, path, label in modes:
+            output = subprocess.run(
+                [sys.executable, __file__, "--child", mode, path or "-"],
+                check=True, capture_output=True, text=True
+            ).stdout.split()
+            elapsed, peak, rows = float(output[0]), float(output[1]), int(output[2])
+            print(f"   {label:<18} {rows:>8} {elapsed * 1000:7.0f}ms {peak:8.0f} MB")
+    finally:
+        shutil.rmtree(root)
+        connection = psycopg2.connect(**DB_CONFIG, options="-c search_path=public")
+        with connection.cursor() as cursor:
+            cursor.execute(f"DROP SCHEMA {SCHEMA} CASCADE;")
+        connection.commit()
+        connection.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,146 @@
+#!/usr/bin/env python3
+"""
+关键词过滤基准测试 - 对比原来的子串匹配和tutorial.keyword_filter
+
+分别计时爬虫调用的is_agent_paper、机器人调用的is_vision_paper、两者合计，以及返回全部命中的scan。
+
+语料优先使用数据库papers表中已保存的摘要，连接不上数据库时使用
+benchmarks/fixtures中的Atom feed。另外检查一组已知的误判样例。
+
+用法: python benchmarks/bench_keyword_filter.py [最多论文数]
+"""
+import io
+import os
+import sys
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from tutorial.atom import parse_atom_feed
+from tutorial.keyword_filter import default_matcher, is_agent_paper, is_vision_paper
+
+FIXTURE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures", "arxiv_atom_page.xml")
+
+LEGACY_CORE = [
+    'multi-agent', 'agentic', 'llm agent', 'ai agent', 'autonomous agent',
+    'agent-based', 'intelligent agent', 'conversational agent', 'agent system',
+    'agent framework', 'agent architecture', 'agent interaction', 'agent planning',
+    'agent reasoning', 'agent learning', 'agent coordination', 'agent communication'
+]
+LEGACY_EXCLUDE = [
+    'user agent', 'software agent', 'web agent', 'browser agent',
+    'reagent', 'magnetic agent', 'contrast agent', 'therapeutic agent',
+    'chemical agent', 'biological agent', 'cleaning agent'
+]
+LEGACY_VISION = [
+    'vision', 'visual', 'image', 'video', 'computer vision', 'cv',
+    'object detection', 'segmentation', 'recognition', 'vqa',
+    'multimodal', 'image generation', 'visual question answering'
+]
+
+# (标题, 摘要, 是否Agent论文, 是否视觉论文)
+FALSE_POSITIVE_CASES = [
+    ("Speech recognition for low-resource languages", "We improve ASR with LLM agents.", True, False),
+    ("Named entity recognition with agentic pipelines", "An agentic NER system.", True, False),
+    ("Scaling laws revisited", "We report results at ACVs and on CVPR-style splits.", False, False),
+    ("Magenta: music generation", "A transformer for symbolic music.", False, False),
+    ("Reagent selection with language models", "Chemistry planning.", False, False),
+    ("AutoAgents: generating agent teams", "Dynamic team construction.", True, False),
+    ("AgentBench", "Evaluating LLMs as agents.", True, False),
+    ("Multi-agent debate", "Agents debate to improve factuality.", True, False),
+    ("Multi-agent visual question answering", "Agents answer questions about images.", True, True),
+    ("Object recognition with vision agents", "A computer vision system.", True, True),
+]
+
+
+def legacy_agent(title, abstract):
+    """原来爬虫中的实现：小写后逐个关键词做子串查找"""
+    title_lower = title.lower()
+    abstract_lower = abstract.lower()
+    has_core = any(k in title_lower or k in abstract_lower for k in LEGACY_CORE)
+    has_title = any(k in title_lower for k in ['agent', 'agents'])
+    has_exclude = any(k in title_lower or k in abstract_lower for k in LEGACY_EXCLUDE)
+    return (has_core or has_title) and not has_exclude
+
+
+def legacy_vision(title, abstract):
+    """原来机器人中的实现"""
+    title_lower = title.lower()
+    abstract_lower = abstract.lower()
+    return any(k in title_lower or k in abstract_lower for k in LEGACY_VISION)
+
+
+def legacy_filters(title, abstract):
+    return legacy_agent(title, abstract), legacy_vision(title, abstract)
+
+
+def new_filters(title, abstract):
+    """爬虫和机器人现在的调用方式"""
+    return is_agent_paper(title, abstract), is_vision_paper(title, abstract)
+
+
+def full_scan(title, abstract):
+    """返回全部命中（不提前结束）"""
+    return default_matcher.scan(title, abstract)
+
+
+def load_corpus(limit):
+    try:
+        import psycopg2
+        from config import DB_CONFIG
+        connection = psycopg2.connect(**DB_CONFIG)
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT title, abstract FROM papers WHERE abstract IS NOT NULL LIMIT %s;", (limit,))
+            rows = cursor.fetchall()
+        connection.close()
+        if rows:
+            return rows, "papers表"
+    except Exception:
+        pass
+    with open(FIXTURE, "rb") as f:
+        return [(e['title'], e['abstract']) for e in parse_atom_feed(io.BytesIO(f.read()))], "fixture"
+
+
+def timed(func, corpus, repeat):
+    """每篇的耗时（µs，取repeat次中最快的一次，减少机器负载的干扰）和结果"""
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        results = [func(title, abstract) for title, abstract in corpus]
+        best = min(best, time.perf_counter() - start)
+    return best / len(corpus) * 1e6, results
+
+
+def main():
+    limit = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+    corpus, source = load_corpus(limit)
+    repeat = max(3, 20000 // len(corpus))
+    with_agent = [(title, abstract) for title, abstract in corpus if "agent" in f"{title} {abstract}".lower()]
+    no_keyword = [("Scaling laws for language models", abstract.lower().replace("agent", "model"))
+                  for _, abstract in corpus]
+
+    print(f"📊 语料: {source} {len(corpus)} 篇（µs/篇：子串匹配 → keyword_filter）")
+    for label, docs in (("原始摘要", corpus), ("含agent一词", with_agent), ("去掉agent一词", no_keyword)):
+        if not docs:
+            continue
+        columns = []
+        for name, legacy_func, new_func in (("is_agent_paper", legacy_agent, is_agent_paper),
+                                            ("is_vision_paper", legacy_vision, is_vision_paper),
+                                            ("合计", legacy_filters, new_filters)):
+            legacy_time, _ = timed(legacy_func, docs, repeat)
+            new_time, _ = timed(new_func, docs, repeat)
+            columns.append(f"{name} {legacy_time:5.1f} → {new_time:5.1f} ({legacy_time / new_time:.2f}x)")
+        changed = sum(a != b for a, b in zip(timed(legacy_filters, docs, 1)[1], timed(new_filters, docs, 1)[1]))
+        scan_time, _ = timed(full_scan, docs, repeat)
+        print(f"  {label:<10} " + "  ".join(columns) + f"  全部命中 {scan_time:5.1f}  判定变化 {changed} 篇")
+
+    print("🔎 误判样例:")
+    for title, abstract, agent, vision in FALSE_POSITIVE_CASES:
+        got = (is_agent_paper(title, abstract), is_vision_paper(title, abstract))
+        legacy = legacy_filters(title, abstract)
+        mark = "✅" if got == (agent, vision) else "❌"
+        print(f"  {mark} {title[:45]:<45} agent/vision 旧 {legacy} → 新 {got}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,61 @@
+#!/usr/bin/env python3
+"""
+LLM响应缓存基准测试 - 同一批论文连续分析两轮（模拟analyze模式后再跑test模式）
+
+使用本地模拟的chat-completions服务器和临时缓存文件。
+
+用法: python benchmarks/bench_llm_cache.py [论文数] [延迟秒]
+"""
+import os
+import sys
+import tempfile
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from fake_llm_server import FakeLLMHandler, start_fake_llm_server
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 20
+    latency = float(sys.argv[2]) if len(sys.argv) > 2 else 0.3
+
+    server, base_url = start_fake_llm_server(latency)
+    cache_dir = tempfile.mkdtemp()
+    # 必须在导入config之前设置
+    os.environ.update({
+        "GROQ_BASE_URL": base_url,
+        "GROQ_API_KEY": "fake-key",
+        "GROQ_MODEL": "fake-model",
+        "GROQ_RPM": "0",
+        "GROQ_TPM": "0",
+        "LLM_CACHE_ENABLED": "true",
+        "LLM_CACHE_PATH": os.path.join(cache_dir, "llm_cache.sqlite3"),
+    })
+    from paper_analyzer import PaperAnalyzer
+
+    papers = [(f"Agent paper {i}", f"Paper {i}: we propose a multi-agent framework for task {i}. " * 5)
+              for i in range(count)]
+
+    print(f"📊 {count} 篇论文（评分、简介、详细分析），模拟延迟 {latency}s")
+    for run in (1, 2):
+        # 每轮新建analyzer，和每次运行机器人一样重新打开缓存文件
+        analyzer = PaperAnalyzer()
+        requests_before = FakeLLMHandler.stats["requests"]
+        start = time.perf_counter()
+        for analysis in analyzer.analyze_many(abstract for _, abstract in papers):
+            pass
+        for title, abstract in papers:
+            analyzer.generate_description(title, abstract)
+            analyzer.generate_detailed_analysis(title, abstract)
+        elapsed = time.perf_counter() - start
+        print(f"  第{run}轮 {elapsed:6.2f}s  LLM请求 {FakeLLMHandler.stats['requests'] - requests_before:3d} 次  "
+              f"缓存: {analyzer.cache.summary()}")
+        analyzer.close()
+
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,194 @@
+#!/usr/bin/env python3
+"""
+发布队列基准测试 - 每日任务的阻塞时间，以及限流、丢失响应和进程崩溃下的发布结果
+
+在临时schema中建表，用模拟的Twitter客户端代替真实API（状态保存在文件中，进程崩溃后仍在）：
+每个限流窗口最多发布LIMIT条，响应头带 x-rate-limit-remaining/reset；FAIL_RATE比例的请求
+在推文已经发出后丢失响应（模拟超时）；发布进程在发出第CRASH_AFTER条推文后立即被杀死
+（推文已发出、数据库还没有记录）。不断重启发布进程直到队列清空，检查每篇论文恰好发布一次，
+并统计429次数（只在新启动的进程还不知道当前窗口的剩余额度时出现）。不需要Twitter账号。
+
+用法: python benchmarks/bench_outbox.py [推文数]
+"""
+import json
+import os
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+SCHEMA = "bench_outbox"
+# 子进程继承环境变量，db.py的连接池只看到临时schema
+os.environ['PGOPTIONS'] = f"-c search_path={SCHEMA}"
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import requests  # noqa: E402
+import tweepy  # noqa: E402
+from requests.structures import CaseInsensitiveDict  # noqa: E402
+
+LIMIT = 4
+WINDOW = 2.0
+FAIL_RATE = 0.2
+CRASH_AFTER = 3
+
+
+def _response(status, body, headers=None):
+    response = requests.Response()
+    response.status_code = status
+    response._content = json.dumps(body).encode()
+    response.headers = CaseInsensitiveDict(headers or {})
+    return response
+
+
+class FakeTwitter:
+    """按固定窗口限流的模拟客户端，已发布的推文追加到state文件（每行一条JSON）"""
+
+    def __init__(self, state, crash_after=None, seed=0):
+        self.state = state
+        self.crash_after = crash_after
+        self.random = random.Random(seed)
+        self.sent = 0
+
+    def _tweets(self):
+        if not os.path.exists(self.state):
+            return []
+        with open(self.state, encoding='utf-8') as f:
+            return [json.loads(line) for line in f]
+
+    def create_tweet(self, text, user_auth=True):
+        now = time.time()
+        window_start = now - now % WINDOW
+        headers = {'x-rate-limit-limit': str(LIMIT), 'x-rate-limit-reset': str(int(window_start + WINDOW + 0.999))}
+        tweets = self._tweets()
+        used = sum(tweet['time'] >= window_start for tweet in tweets)
+        if used >= LIMIT:
+            headers['x-rate-limit-remaining'] = '0'
+            with open(self.state + '.429', 'a') as f:
+                f.write('429\n')
+            raise tweepy.TooManyRequests(_response(429, {'title': 'Too Many Requests'}, headers))
+        if any(tweet['text'] == text for tweet in tweets):
+            raise tweepy.Forbidden(_response(403, {'detail': 'You are not allowed to create a Tweet with duplicate content.'}))
+        tweet = {'id': str(10 ** 18 + len(tweets)), 'text': text, 'url': text.rsplit('\n', 1)[-1], 'time': now}
+        with open(self.state, 'a', encoding='utf-8') as f:
+            f.write(json.dumps(tweet) + '\n')
+            f.flush()
+            os.fsync(f.fileno())
+        self.sent += 1
+        if self.crash_after and self.sent >= self.crash_after:
+            os._exit(9)
+        if self.random.random() < FAIL_RATE:
+            raise requests.exceptions.ReadTimeout("模拟超时：推文已发出，响应丢失")
+        headers['x-rate-limit-remaining'] = str(LIMIT - used - 1)
+        return _response(201, {'data': {'id': tweet['id'], 'text': text}}, headers)
+
+    def get_me(self, user_auth=True):
+        return _response(200, {'data': {'id': '1', 'username': 'bench'}})
+
+    def get_users_tweets(self, user_id, start_time=None, max_results=100, tweet_fields=None, user_auth=True):
+        since = start_time.timestamp() if start_time else 0
+        tweets = [{'id': tweet['id'], 'text': tweet['text'], 'entities': {'urls': [{'expanded_url': tweet['url']}]}}
+                  for tweet in self._tweets() if tweet['time'] >= since][-max_results:]
+        return _response(200, {'data': tweets} if tweets else {'meta': {'result_count': 0}})
+
+
+def child(state, crash_after, seed):
+    """运行一次发布进程，返回本次发布的条数"""
+    import db
+    import post_outbox
+
+    post_outbox.RECONCILE_DELAY = 0.2
+    posted = post_outbox.OutboxWorker(FakeTwitter(state, crash_after, seed)).run()
+    db.close_pool()
+    return posted
+
+
+def main():
+    if len(sys.argv) == 5 and sys.argv[1] == "--child":
+        crash_after = int(sys.argv[3]) or None
+        print(child(sys.argv[2], crash_after, int(sys.argv[4])))
+        return
+
+    import logging
+
+    import psycopg2
+
+    import db
+    import migrations
+    import post_outbox
+    from automated_paper_bot import AutomatedPaperBot
+    from config import DB_CONFIG, OUTBOX_CONFIG
+
+    logging.getLogger().setLevel(logging.WARNING)
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 20
+    connection = psycopg2.connect(**DB_CONFIG, options="-c search_path=public")
+    with connection.cursor() as cursor:
+        cursor.execute(f"DROP SCHEMA IF EXISTS {SCHEMA} CASCADE; CREATE SCHEMA {SCHEMA};")
+    connection.commit()
+    connection.close()
+
+    directory = tempfile.mkdtemp(prefix='bench_outbox_')
+    state = os.path.join(directory, 'tweets.jsonl')
+    try:
+        with db.connection() as connection:
+            migrations.migrate(connection, log=lambda message: None)
+        papers = [{
+            'paper': (f"2501.{i:05d}", 'cs.AI', f"Synthetic agent paper {i}", 'Author', 'Abstract',
+                      f"http://arxiv.org/abs/2501.{i:05d}", None),
+            'score': 9, 'analysis': {'description': f"Proposes synthetic agent method number {i}."},
+        } for i in range(count)]
+
+        # 每日任务：只写入队列，不等待发布（原来每条推文之间固定等待10秒）
+        OUTBOX_CONFIG['autostart'] = False
+        bot = AutomatedPaperBot()
+        start = time.perf_counter()
+        bot.post_papers_to_twitter(papers)
+        enqueue_ms = (time.perf_counter() - start) * 1000
+        bot.post_papers_to_twitter(papers)  # 同一天重复运行，不会再次入队
+
+        start = time.perf_counter()
+        runs = crashes = 0
+        while True:
+            with db.connection() as connection:
+                counts = post_outbox.status_counts(connection)
+            if not counts.get('pending') and not counts.get('sending'):
+                break
+            runs += 1
+            result = subprocess.run(
+                [sys.executable, __file__, "--child", state, str(CRASH_AFTER if runs <= 2 else 0), str(runs)],
+                capture_output=True, text=True
+            )
+            crashes += result.returncode != 0
+        drain = time.perf_counter() - start
+        db.close_pool()
+
+        with open(state, encoding='utf-8') as f:
+            tweets = [json.loads(line) for line in f]
+        urls = [tweet['url'] for tweet in tweets]
+        limited = len(open(state + '.429').readlines()) if os.path.exists(state + '.429') else 0
+        with db.connection() as connection, connection.cursor() as cursor:
+            cursor.execute("SELECT count(*) FILTER (WHERE status = 'posted'), "
+                           "count(*) FILTER (WHERE tweet_id IS NOT NULL), sum(attempts) FROM post_outbox;")
+            posted, with_id, attempts = cursor.fetchone()
+        db.close_pool()
+
+        print(f"📊 {count} 条推文，模拟限流 {LIMIT} 条/{WINDOW:.0f}s，{FAIL_RATE:.0%} 的请求丢失响应，"
+              f"前两次运行在第 {CRASH_AFTER} 条后崩溃")
+        print(f"   每日任务入队耗时:   {enqueue_ms:8.1f} ms（原来固定等待 {10 * (count - 1)} s）")
+        print(f"   清空队列:           {drain:8.1f} s，{runs} 次运行（{crashes} 次崩溃），共 {attempts} 次发布请求，{limited} 次429")
+        print(f"   已发布:             {posted}/{count}（{with_id} 条有tweet_id）")
+        print(f"   实际发出的推文:     {len(tweets)} 条，重复 {len(urls) - len(set(urls))} 条")
+        assert len(tweets) == len(set(urls)) == count == posted
+    finally:
+        shutil.rmtree(directory)
+        connection = psycopg2.connect(**DB_CONFIG, options="-c search_path=public")
+        with connection.cursor() as cursor:
+            cursor.execute(f"DROP SCHEMA {SCHEMA} CASCADE;")
+        connection.commit()
+        connection.close()
+
+
+if __name__ == "__main__":
+    main()
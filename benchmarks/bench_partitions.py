@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+"""
+分区基准测试 - 每日查询（papers_between）在不同表大小下的延迟，分区表与旧的单表对比
+
+在两个独立schema中分别用migrations.py建出旧结构（迁移8，单表+B-tree索引）和按月分区的
+新结构（迁移9），每天写入PAPERS_PER_DAY篇合成论文，从今天往前逐步补足历史，
+每达到一个规模就测一次最近两天的每日查询（与机器人使用同一条预编译语句）。
+运行结束后删除两个schema。
+
+用法: python benchmarks/bench_partitions.py [规模1,规模2,...]
+"""
+import os
+import statistics
+import sys
+import time
+from datetime import date, timedelta
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import psycopg2  # noqa: E402
+
+import db  # noqa: E402
+import migrations  # noqa: E402
+from config import DB_CONFIG  # noqa: E402
+
+PAPERS_PER_DAY = 400
+LAYOUTS = (("单表(迁移8)", "bench_unpartitioned", 8), ("按月分区(迁移9)", "bench_partitioned", None))
+
+
+def connect(schema):
+    return psycopg2.connect(**DB_CONFIG, options=f"-c search_path={schema}")
+
+
+def add_history(connection, first_day, last_day):
+    """为 [first_day, last_day] 的每一天写入PAPERS_PER_DAY篇论文，一半属于每日查询的分类"""
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT relkind = 'p' FROM pg_class WHERE oid = 'papers'::regclass;")
+        if cursor.fetchone()[0]:
+            cursor.execute("""
+                SELECT count(papers_ensure_partition(month::date))
+                FROM generate_series(date_trunc('month', %s::date), %s::date, interval '1 month') month;
+            """, (first_day, last_day))
+        cursor.execute("""
+            INSERT INTO papers (id, category, categories, version, title, authors, abstract, url, added_at)
+            SELECT 'b' || to_char(day, 'YYYYMMDD') || '.' || i,
+                   (ARRAY['cs.AI', 'cs.CL', 'cs.LG', 'cs.CV'])[1 + i %% 4], 'cs.AI', 1,
+                   'Synthetic paper ' || i || ' on agents', 'Author ' || i,
+                   repeat('We study multi-agent planning and tool use. ', 12),
+                   'https://arxiv.org/abs/' || i, day::date
+            FROM generate_series(%s::date, %s::date, interval '1 day') day,
+                 generate_series(1, %s) i
+            ORDER BY day, i;
+        """, (first_day, last_day, PAPERS_PER_DAY))
+        cursor.execute("ANALYZE papers;")
+    connection.commit()
+
+
+def added_at_index_bytes(connection):
+    """以added_at开头的索引（含各分区上的）的总大小：(B-tree, BRIN)"""
+    with connection.cursor() as cursor:
+        cursor.execute("""
+            SELECT coalesce(sum(pg_relation_size(i.indexrelid)) FILTER (WHERE am.amname = 'btree'), 0),
+                   coalesce(sum(pg_relation_size(i.indexrelid)) FILTER (WHERE am.amname = 'brin'), 0)
+            FROM pg_index i
+            JOIN pg_class c ON c.oid = i.indrelid
+            JOIN pg_class ic ON ic.oid = i.indexrelid
+            JOIN pg_am am ON am.oid = ic.relam
+            JOIN pg_attribute a ON a.attrelid = c.oid AND a.attnum = i.indkey[0]
+            WHERE c.relnamespace = current_schema()::regnamespace AND c.relkind = 'r'
+              AND c.relname LIKE 'papers%' AND a.attname = 'added_at';
+        """)
+        return cursor.fetchone()
+
+
+def daily_query_ms(connection, repeat=50):
+    today = date.today()
+    params = (today - timedelta(days=1), today, ['cs.AI', 'cs.CL'])
+    rows = db.execute_prepared(connection, 'papers_between', params)
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        db.execute_prepared(connection, 'papers_between', params)
+        times.append((time.perf_counter() - start) * 1000)
+    return statistics.median(times), len(rows)
+
+
+def main():
+    sizes = [int(size) for size in sys.argv[1].split(',')] if len(sys.argv) > 1 else [100000, 500000, 2000000]
+    connections = []
+    for _, schema, target in LAYOUTS:
+        connection = connect("public")
+        with connection.cursor() as cursor:
+            cursor.execute(f"DROP SCHEMA IF EXISTS {schema} CASCADE; CREATE SCHEMA {schema};")
+        connection.commit()
+        connection.close()
+        connection = connect(schema)
+        migrations.migrate(connection, log=lambda message: None, target=target)
+        connections.append(connection)
+
+    print(f"📊 每天 {PAPERS_PER_DAY} 篇论文，查询最近两天 cs.AI/cs.CL（{PAPERS_PER_DAY} 行）")
+    print(f"   {'论文数':>10} {'历史':>8} " + " ".join(f"{label:>34}" for label, _, _ in LAYOUTS))
+    days_done = 0
+    for size in sizes:
+        days = size // PAPERS_PER_DAY
+        last_day = date.today() - timedelta(days=days_done)
+        first_day = date.today() - timedelta(days=days - 1)
+        cells = []
+        for connection in connections:
+            add_history(connection, first_day, last_day)
+            elapsed, _ = daily_query_ms(connection)
+            btree, brin = added_at_index_bytes(connection)
+            cells.append(f"{elapsed:6.2f}ms B-tree{btree / 2 ** 20:6.1f}MB BRIN{brin / 2 ** 10:5.0f}KB")
+        days_done = days
+        print(f"   {size:>10} {days / 365:6.1f}年 " + " ".join(f"{cell:>34}" for cell in cells))
+
+    for connection, (_, schema, _) in zip(connections, LAYOUTS):
+        connection.close()
+        connection = connect("public")
+        with connection.cursor() as cursor:
+            cursor.execute(f"DROP SCHEMA {schema} CASCADE;")
+        connection.commit()
+        connection.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+"""
+管道写库基准测试 - 对比逐条写入与批量写入的吞吐量（rows/sec）
+
+需要可用的PostgreSQL（使用config.py中的DB_CONFIG），测试数据写入独立的
+bench_pipeline schema，运行结束后删除。
+
+用法: python benchmarks/bench_pipeline.py [论文数] [批大小]
+"""
+import logging
+import os
+import sys
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import psycopg2
+from config import DB_CONFIG
+
+BENCH_SCHEMA = "bench_pipeline"
+
+# 让管道的连接使用独立schema，不影响真实的papers表
+os.environ["PGOPTIONS"] = f"-c search_path={BENCH_SCHEMA}"
+
+import migrations  # noqa: E402
+import partitions  # noqa: E402
+from tutorial.pipelines import PostgresNoDuplicatesPipeline  # noqa: E402
+
+
+class BenchSpider:
+    name = "bench"
+    logger = logging.getLogger("bench")
+
+
+class QuietPipeline(PostgresNoDuplicatesPipeline):
+    """基准测试中不发送通知"""
+
+    def _notify_new_paper(self, item):
+        pass
+
+
+def make_items(count):
+    return [
+        {
+            "id": f"9901.{i:05d}",
+            "category": "cs.AI",
+            "title": f"Benchmark paper {i} on multi-agent coordination",
+            "authors": "Alice, Bob",
+            "abstract": "We study agentic systems. " * 40,
+            "url": f"https://arxiv.org/abs/9901.{i:05d}",
+            "added_at": "2025-01-01",
+        }
+        for i in range(count)
+    ]
+
+
+def reset_schema():
+    connection = psycopg2.connect(**DB_CONFIG)
+    with connection, connection.cursor() as cur:
+        cur.execute(f"DROP SCHEMA IF EXISTS {BENCH_SCHEMA} CASCADE;")
+        cur.execute(f"CREATE SCHEMA {BENCH_SCHEMA};")
+    connection.close()
+    # 每轮都是新schema，需要重新迁移和创建分区
+    migrations._schema_checked = False
+    partitions._ensured.clear()
+
+
+def run(items, batch_size):
+    reset_schema()
+    spider = BenchSpider()
+    pipeline = QuietPipeline(batch_size=batch_size, batch_interval=0)
+    pipeline.open_spider(spider)
+
+    start = time.perf_counter()
+    for item in items:
+        pipeline.process_item(item, spider)
+    pipeline.close_spider(spider)
+    return time.perf_counter() - start
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    batch_size = int(sys.argv[2]) if len(sys.argv) > 2 else 100
+    items = make_items(count)
+
+    print(f"📊 写入 {count} 篇论文")
+    for label, size in (("逐条模式", 1), (f"批量模式(每批{batch_size})", batch_size)):
+        elapsed = run(items, size)
+        print(f"  {label:<20} {elapsed:8.2f}s  {count / elapsed:10.0f} rows/sec")
+
+    connection = psycopg2.connect(**DB_CONFIG)
+    with connection, connection.cursor() as cur:
+        cur.execute(f"DROP SCHEMA IF EXISTS {BENCH_SCHEMA} CASCADE;")
+    connection.close()
+
+
+if __name__ == "__main__":
+    main()
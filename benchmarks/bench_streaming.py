@@ -0,0 +1,65 @@
+#!/usr/bin/env python3
+"""
+服务器端游标基准测试 - fetchall() 与 db.stream() 读取不同行数时的峰值内存
+
+每种方式、每个行数在单独的子进程中运行，比较进程的峰值RSS。
+数据用generate_series在数据库中生成（每行约600字节的摘要），不需要papers表中有数据，
+但需要.env中配置的数据库可以连接。
+
+用法: python benchmarks/bench_streaming.py [行数 ...]
+"""
+import os
+import resource
+import subprocess
+import sys
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+QUERY = """
+    SELECT 'p' || i, 'cs.AI', 'Title ' || i, 'Author',
+           repeat('we propose a multi-agent framework ', 17) || i, 'url', CURRENT_DATE
+    FROM generate_series(1, %s) AS i
+"""
+
+
+def run(mode, rows):
+    """在当前进程中读取rows行，返回 (耗时秒, 峰值RSS MB)"""
+    import db
+
+    start = time.perf_counter()
+    count = 0
+    if mode == "fetchall":
+        with db.connection() as connection, connection.cursor() as cursor:
+            cursor.execute(QUERY, (rows,))
+            for row in cursor.fetchall():
+                count += len(db.Paper(*row).abstract) > 0
+    else:
+        for row in db.stream('bench_stream', QUERY, (rows,)):
+            count += len(db.Paper(*row).abstract) > 0
+    elapsed = time.perf_counter() - start
+    assert count == rows
+    db.close_pool()
+    return elapsed, resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def main():
+    if len(sys.argv) == 4 and sys.argv[1] == "--child":
+        elapsed, peak = run(sys.argv[2], int(sys.argv[3]))
+        print(f"{elapsed} {peak}")
+        return
+
+    sizes = [int(arg) for arg in sys.argv[1:]] or [1000, 100000, 1000000]
+    print(f"{'行数':>9} {'方式':<10} {'耗时':>8} {'峰值RSS':>10}")
+    for rows in sizes:
+        for mode in ("fetchall", "stream"):
+            output = subprocess.run(
+                [sys.executable, __file__, "--child", mode, str(rows)],
+                check=True, capture_output=True, text=True
+            ).stdout.split()
+            elapsed, peak = float(output[0]), float(output[1])
+            print(f"{rows:>9} {mode:<10} {elapsed:7.2f}s {peak:8.0f} MB")
+
+
+if __name__ == "__main__":
+    main()
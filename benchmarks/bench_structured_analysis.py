@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+"""
+结构化分析基准测试 - 对比每篇入选论文分三次调用（评分、一句话概括、详细分析）
+和机器人现在的做法（score_papers批量评分，再由detail_papers对每篇调用一次summarize_paper）
+的请求数、token用量和耗时；后者每篇的开销是一次summarize_paper加上分摊的批量评分请求
+
+使用本地模拟的chat-completions服务器。score_papers/detail_papers需要config.py中的
+数据库，结果写入独立的bench_structured_analysis schema，运行结束后删除。
+
+用法: python benchmarks/bench_structured_analysis.py [论文数] [延迟秒]
+"""
+import os
+import sys
+import time
+from datetime import date
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from fake_llm_server import FakeLLMHandler, start_fake_llm_server
+
+BENCH_SCHEMA = "bench_structured_analysis"
+
+# 让paper_analysis的读写使用独立schema，不影响真实的分析结果
+os.environ["PGOPTIONS"] = f"-c search_path={BENCH_SCHEMA}"
+
+
+def measure(label, count, func):
+    before = dict(FakeLLMHandler.stats)
+    start = time.perf_counter()
+    results = func()
+    elapsed = time.perf_counter() - start
+    used = {key: FakeLLMHandler.stats[key] - before[key] for key in before}
+    print(f"  {label:<16} 请求 {used['requests'] / count:.1f} 次/篇  "
+          f"token {(used['prompt_tokens'] + used['completion_tokens']) / count:6.0f}/篇  "
+          f"耗时 {elapsed / count * 1000:6.0f} ms/篇")
+    return results
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 10
+    latency = float(sys.argv[2]) if len(sys.argv) > 2 else 0.3
+
+    server, base_url = start_fake_llm_server(latency, token_latency=0.002)
+    # 必须在导入config之前设置
+    os.environ.update({
+        "GROQ_BASE_URL": base_url,
+        "GROQ_API_KEY": "fake-key",
+        "GROQ_MODEL": "fake-model",
+        "GROQ_RPM": "0",
+        "GROQ_TPM": "0",
+        "LLM_CACHE_ENABLED": "false",
+    })
+    import psycopg2
+
+    import db
+    import migrations
+    from config import DB_CONFIG
+    from paper_analyzer import PaperAnalyzer
+
+    connection = psycopg2.connect(**DB_CONFIG)
+    with connection, connection.cursor() as cur:
+        cur.execute(f"DROP SCHEMA IF EXISTS {BENCH_SCHEMA} CASCADE;")
+        cur.execute(f"CREATE SCHEMA {BENCH_SCHEMA};")
+    with db.connection() as bench_connection:
+        migrations.migrate(bench_connection, log=lambda message: None)
+
+    analyzer = PaperAnalyzer()
+    papers = [(f"9901.{i:05d}", f"Agent paper {i}", f"Paper {i}: we propose a multi-agent framework where LLM agents "
+               f"coordinate on task {i} and report consistent improvements. " * 6, date.today())
+              for i in range(count)]
+
+    print(f"📊 {count} 篇入选论文，请求延迟 {latency}s + 2ms/输出token")
+    separate = measure("分开调用", count, lambda: [
+        (analyzer.analyze_abstract(abstract),
+         analyzer.generate_description(title, abstract),
+         analyzer.generate_detailed_analysis(title, abstract))
+        for _, title, abstract, _ in papers
+    ])
+
+    def score_and_detail():
+        scores = analyzer.score_papers((paper_id, abstract, added_at) for paper_id, _, abstract, added_at in papers)
+        return analyzer.detail_papers(
+            (paper_id, title, abstract, added_at, score)
+            for (paper_id, title, abstract, added_at), score in zip(papers, scores)
+        )
+
+    combined = measure("评分+summarize", count, score_and_detail)
+    same = [s[0]['relevance_score'] for s in separate] == [c['relevance_score'] for c in combined]
+    described = all(c.get('description') and c.get('detailed_analysis') for c in combined)
+    print(f"  评分一致: {'✅' if same else '❌'}  描述完整: {'✅' if described else '❌'}")
+
+    analyzer.close()
+    db.close_pool()
+    with connection, connection.cursor() as cur:
+        cur.execute(f"DROP SCHEMA IF EXISTS {BENCH_SCHEMA} CASCADE;")
+    connection.close()
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
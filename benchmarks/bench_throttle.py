@@ -0,0 +1,129 @@
+#!/usr/bin/env python3
+"""
+下载调度基准测试 - 本地模拟服务器对比旧的固定延迟/AutoThrottle设置与自适应调度
+
+模拟服务器为每个请求注入延迟，并在请求速率超过上限时返回429（带Retry-After）。
+
+用法: python benchmarks/bench_throttle.py [摘要页数] [延迟秒] [每秒请求上限]
+"""
+import os
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import scrapy
+from scrapy.crawler import CrawlerProcess
+
+
+class MockArxivHandler(BaseHTTPRequestHandler):
+    latency = 0.2
+    rate_limit = 5.0
+    lock = threading.Lock()
+    recent = []
+    counts = {"200": 0, "429": 0}
+
+    def do_GET(self):
+        now = time.monotonic()
+        with self.lock:
+            self.recent[:] = [t for t in self.recent if now - t < 1.0]
+            throttled = len(self.recent) >= self.rate_limit
+            if not throttled:
+                self.recent.append(now)
+            self.counts["429" if throttled else "200"] += 1
+
+        if throttled:
+            self.send_response(429)
+            self.send_header("Retry-After", "1")
+            self.end_headers()
+            return
+
+        time.sleep(self.latency)
+        body = b"<html><blockquote class='abstract mathjax'>agent</blockquote></html>"
+        self.send_response(200)
+        self.send_header("Content-Type", "text/html")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+class BenchSpider(scrapy.Spider):
+    name = "bench_throttle"
+
+    def __init__(self, base_url, pages, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.base_url = base_url
+        self.pages = pages
+
+    def start_requests(self):
+        for skip in range(0, 100, 25):
+            yield scrapy.Request(f"{self.base_url}/list/cs.AI/pastweek?skip={skip}")
+        for i in range(self.pages):
+            yield scrapy.Request(f"{self.base_url}/abs/2501.{i:05d}")
+
+    async def start(self):
+        for request in self.start_requests():
+            yield request
+
+    def parse(self, response):
+        pass
+
+
+LEGACY_SETTINGS = {
+    "DOWNLOAD_DELAY": 1,
+    "RANDOMIZE_DOWNLOAD_DELAY": 0.5,
+    "AUTOTHROTTLE_ENABLED": True,
+    "AUTOTHROTTLE_START_DELAY": 1,
+    "AUTOTHROTTLE_MAX_DELAY": 60,
+    "AUTOTHROTTLE_TARGET_CONCURRENCY": 1.0,
+}
+
+ADAPTIVE_SETTINGS = {
+    "DOWNLOAD_DELAY": 1,
+    "AUTOTHROTTLE_ENABLED": False,
+    "ADAPTIVE_THROTTLE_ENABLED": True,
+    "DOWNLOADER_MIDDLEWARES": {"tutorial.middlewares.AdaptiveThrottleMiddleware": 560},
+}
+
+
+def run(label, settings, base_url, pages):
+    MockArxivHandler.counts = {"200": 0, "429": 0}
+    process = CrawlerProcess({**settings, "LOG_LEVEL": "ERROR", "TELNETCONSOLE_ENABLED": False, "RETRY_TIMES": 10})
+    crawler = process.create_crawler(BenchSpider)
+    process.crawl(crawler, base_url=base_url, pages=pages)
+    start = time.perf_counter()
+    process.start(stop_after_crawl=True)
+    elapsed = time.perf_counter() - start
+    stats = crawler.stats.get_stats()
+    done = stats.get("response_received_count", 0) - MockArxivHandler.counts["429"]
+    print(f"  {label:<10} {elapsed:7.1f}s  {done / elapsed:6.2f} 页/秒  429次数 {MockArxivHandler.counts['429']}")
+    for key in sorted(k for k in stats if k.startswith("throttle/")):
+        print(f"      {key} = {stats[key]}")
+
+
+def main():
+    pages = int(sys.argv[1]) if len(sys.argv) > 1 else 60
+    MockArxivHandler.latency = float(sys.argv[2]) if len(sys.argv) > 2 else 0.2
+    MockArxivHandler.rate_limit = float(sys.argv[3]) if len(sys.argv) > 3 else 5.0
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), MockArxivHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base_url = f"http://127.0.0.1:{server.server_port}"
+
+    # Twisted reactor只能启动一次，每种设置在子进程中运行
+    mode = os.environ.get("BENCH_THROTTLE_MODE")
+    if mode:
+        run(mode, LEGACY_SETTINGS if mode == "legacy" else ADAPTIVE_SETTINGS, base_url, pages)
+        return
+    print(f"📊 {pages} 个摘要页 + 4 个列表页，服务器延迟 {MockArxivHandler.latency}s，限速 {MockArxivHandler.rate_limit} 次/秒")
+    for mode in ("legacy", "adaptive"):
+        os.spawnve(os.P_WAIT, sys.executable, [sys.executable] + sys.argv, {**os.environ, "BENCH_THROTTLE_MODE": mode})
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+"""
+向量索引基准测试 - 拟合/编码吞吐、主题检索质量，以及10^5~10^6篇论文时的查询延迟
+
+第一部分在合成语料上拟合模型并编码全部论文：每篇论文属于50个主题之一，约120个词中
+1/4来自该主题的专属词表，其余来自2万词的Zipf背景词表；用主题词组成的查询检索，
+统计前k篇中属于该主题的比例。
+
+第二部分把随机单位向量直接写入索引文件（编码100万篇论文耗时太久且与查询延迟无关），
+测量topic()、带分类过滤的topic()和related()的查询延迟。不需要数据库。
+
+用法: python benchmarks/bench_vector_index.py [拟合论文数] [查询规模1,查询规模2,...]
+"""
+import os
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import vector_index  # noqa: E402
+
+VOCAB = np.array([f"w{i}" for i in range(20000)])
+TOPICS = [np.array([f"t{topic}x{i}" for i in range(40)]) for topic in range(50)]
+K = 20
+
+
+def synthetic_corpus(rng, count):
+    """返回 (文本列表, 主题编号数组)"""
+    labels = rng.integers(0, len(TOPICS), count)
+    background = np.minimum(rng.zipf(1.2, size=(count, 90)), len(VOCAB)) - 1
+    topical = rng.integers(0, 40, size=(count, 30))
+    texts = [" ".join(np.concatenate([VOCAB[background[i]], TOPICS[labels[i]][topical[i]]]))
+             for i in range(count)]
+    return texts, labels
+
+
+def write_random_index(path, count, dim, categories, rng, batch=100000):
+    """直接写入count个随机单位向量，返回打开的VectorIndex"""
+    vector_index.VectorIndex.create(path, np.ones(2 ** 16, np.float32),
+                                    rng.standard_normal((dim, 2 ** 16)).astype(np.float32))
+    with open(os.path.join(path, 'vectors.f32'), 'wb') as f:
+        for begin in range(0, count, batch):
+            vectors = rng.standard_normal((min(batch, count - begin), dim)).astype(np.float32)
+            f.write((vectors / np.linalg.norm(vectors, axis=1, keepdims=True)).tobytes())
+    with open(os.path.join(path, 'categories.u8'), 'wb') as f:
+        f.write(rng.integers(0, len(categories), count).astype(np.uint8).tobytes())
+    ids = ''.join(f"bench.{i}\n" for i in range(count)).encode()
+    with open(os.path.join(path, 'ids.txt'), 'wb') as f:
+        f.write(ids)
+    vector_index._write_meta(path, count, [0, count], categories, len(ids))
+    return vector_index.VectorIndex(path)
+
+
+def median_ms(function, repeat=20):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        times.append((time.perf_counter() - start) * 1000)
+    return statistics.median(times)
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    sizes = [int(size) for size in sys.argv[2].split(',')] if len(sys.argv) > 2 else [100000, 1000000]
+    rng = np.random.default_rng(0)
+
+    texts, labels = synthetic_corpus(rng, count)
+    start = time.perf_counter()
+    idf, components = vector_index.fit(texts)
+    fit_time = time.perf_counter() - start
+    start = time.perf_counter()
+    vectors = np.vstack([vector_index.embed(texts[begin:begin + 10000], idf, components)
+                         for begin in range(0, count, 10000)])
+    embed_time = time.perf_counter() - start
+
+    precisions = []
+    for topic in range(len(TOPICS)):
+        query = " ".join(rng.choice(TOPICS[topic], 3, replace=False))
+        scores = vectors @ vector_index.embed([query], idf, components)[0]
+        top = np.argpartition(-scores, K - 1)[:K]
+        precisions.append((labels[top] == topic).mean())
+
+    print(f"📊 {count} 篇合成论文，{len(components)} 维")
+    print(f"   拟合IDF+SVD: {fit_time:6.1f}s")
+    print(f"   编码:        {embed_time:6.1f}s  {count / embed_time:8.0f} 篇/秒")
+    print(f"   3个主题词查询的 precision@{K}: {np.mean(precisions):.1%}（{len(TOPICS)} 个主题）")
+
+    categories = [f"cat{i}" for i in range(8)]
+    print(f"   {'论文数':>10} {'topic()':>10} {'topic(分类)':>12} {'related()':>10} {'向量文件':>10}")
+    for size in sizes:
+        path = tempfile.mkdtemp(prefix='bench_vector_index_')
+        try:
+            index = write_random_index(path, size, len(components), categories, rng)
+            index.topic("warm up page cache", K)
+            topic_ms = median_ms(lambda: index.topic("multi agent negotiation benchmark", K))
+            category_ms = median_ms(lambda: index.topic("multi agent negotiation benchmark", K, "cat3"))
+            related_ms = median_ms(lambda: index.related(f"bench.{size // 2}", K))
+            print(f"   {size:>10} {topic_ms:8.1f}ms {category_ms:10.1f}ms {related_ms:8.1f}ms "
+                  f"{size * len(components) * 4 / 2 ** 20:8.0f}MB")
+        finally:
+            shutil.rmtree(path)
+
+
+if __name__ == "__main__":
+    main()
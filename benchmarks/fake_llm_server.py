@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+"""
+本地模拟的chat-completions服务器（兼容Groq/OpenAI接口），用于离线基准测试
+
+每个请求延迟 latency + 输出token数 × token_latency 秒，根据prompt内容返回确定性的分析结果。
+在基准脚本中使用start_fake_llm_server()，或单独运行:
+    python benchmarks/fake_llm_server.py [端口] [延迟秒]
+然后设置 GROQ_BASE_URL=http://127.0.0.1:<端口>
+"""
+import hashlib
+import json
+import re
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+def fake_score(text):
+    """根据文本哈希得到稳定的0-10分"""
+    return int(hashlib.md5(text.strip().encode("utf-8")).hexdigest(), 16) % 11
+
+
+def fake_analysis(abstract):
+    score = fake_score(abstract)
+    return {
+        "relevant": score >= 6,
+        "confidence": "High" if score >= 8 else "Medium",
+        "relevance_score": score,
+        "keywords": ["agent"],
+    }
+
+
+def default_responder(prompt):
+    """按prompt类型返回模拟的模型输出，同一摘要在单篇和批量模式下评分相同"""
+    if "JSON array" in prompt:
+        papers = re.findall(r'<paper id="(\d+)">\n(.*?)\n</paper>', prompt, re.S)
+        return json.dumps([{"id": int(i), **fake_analysis(abstract)} for i, abstract in papers])
+    if "JSON format" in prompt or "JSON object" in prompt:
+        abstract = re.search(r"Abstract: (.*?)\n\n", prompt, re.S).group(1)
+        result = {**fake_analysis(abstract), "analysis": "Synthetic analysis from the fake server."}
+        if "detailed_analysis" in prompt:
+            result["description"] = "Proposes a synthetic agent method for benchmarking."
+            result["detailed_analysis"] = "• Synthetic bullet one\n• Synthetic bullet two"
+        return json.dumps(result)
+    if "Short summary" in prompt:
+        return "Proposes a synthetic agent method for benchmarking."
+    return "• Synthetic bullet one\n• Synthetic bullet two"
+
+
+class FakeLLMHandler(BaseHTTPRequestHandler):
+    latency = 0.5
+    token_latency = 0.0
+    responder = staticmethod(default_responder)
+    lock = threading.Lock()
+    stats = {"requests": 0, "prompt_tokens": 0, "completion_tokens": 0}
+
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        prompt = "\n".join(m.get("content", "") for m in body.get("messages", []))
+        content = self.responder(prompt)
+        prompt_tokens = len(prompt) // 4
+        completion_tokens = len(content) // 4
+        time.sleep(self.latency + completion_tokens * self.token_latency)
+
+        with self.lock:
+            self.stats["requests"] += 1
+            self.stats["prompt_tokens"] += prompt_tokens
+            self.stats["completion_tokens"] += completion_tokens
+
+        payload = json.dumps({
+            "id": f"chatcmpl-fake-{self.stats['requests']}",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": body.get("model", "fake"),
+            "choices": [{
+                "index": 0,
+                "message": {"role": "assistant", "content": content},
+                "finish_reason": "stop",
+            }],
+            "usage": {
+                "prompt_tokens": prompt_tokens,
+                "completion_tokens": completion_tokens,
+                "total_tokens": prompt_tokens + completion_tokens,
+            },
+        }).encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, *args):
+        pass
+
+
+def start_fake_llm_server(latency=0.5, port=0, responder=None, token_latency=0.0):
+    """在后台线程启动模拟服务器，返回 (server, base_url)"""
+    FakeLLMHandler.latency = latency
+    FakeLLMHandler.token_latency = token_latency
+    if responder:
+        FakeLLMHandler.responder = staticmethod(responder)
+    server = ThreadingHTTPServer(("127.0.0.1", port), FakeLLMHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_port}"
+
+
+if __name__ == "__main__":
+    port = int(sys.argv[1]) if len(sys.argv) > 1 else 8765
+    latency = float(sys.argv[2]) if len(sys.argv) > 2 else 0.5
+    server, base_url = start_fake_llm_server(latency, port)
+    print(f"🤖 模拟LLM服务器: {base_url} (延迟 {latency}s)")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.shutdown()
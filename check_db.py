@@ -1,8 +1,7 @@
-import psycopg2
-from config import DB_CONFIG
+import db
 from datetime import datetime, timedelta
 
-conn = psycopg2.connect(**DB_CONFIG)
+conn = db.acquire()
 cur = conn.cursor()
 
 # 检查最近的论文时间
@@ -21,4 +20,5 @@ cur.execute('SELECT COUNT(*) FROM papers WHERE added_at >= %s', (yesterday,))
 count_24h = cur.fetchone()[0]
 print(f'过去24小时论文数: {count_24h}')
 
-conn.close()
\ No newline at end of file
+db.release(conn)
+db.close_pool()
\ No newline at end of file
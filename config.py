@@ -13,10 +13,18 @@ DB_CONFIG = {
     "port": int(os.getenv("DB_PORT", 5432))
 }
 
+# 进程内数据库连接池大小，以及服务器端游标每次取回的行数（见db.py）
+DB_POOL_CONFIG = {
+    "min": int(os.getenv("DB_POOL_MIN", 1)),
+    "max": int(os.getenv("DB_POOL_MAX", 8)),
+    "itersize": int(os.getenv("DB_ITERSIZE", 1000))
+}
+
 # Telegram Configuration
 TELEGRAM_CONFIG = {
     "token": os.getenv("TELEGRAM_TOKEN", ""),
-    "group_id": os.getenv("TELEGRAM_GROUP_ID", "")
+    "group_id": os.getenv("TELEGRAM_GROUP_ID", ""),
+    "api_base": os.getenv("TELEGRAM_API_BASE", "https://api.telegram.org")
 }
 
 # Twitter Configuration (官方API)
@@ -39,5 +47,81 @@ TWITTER_CONFIG = {
 # Groq API Configuration
 GROQ_CONFIG = {
     "api_key": os.getenv("GROQ_API_KEY", ""),
-    "model": os.getenv("GROQ_MODEL", "qwen/qwen3-32b")
-}
\ No newline at end of file
+    "model": os.getenv("GROQ_MODEL", "qwen/qwen3-32b"),
+    # 可选：自定义API地址（例如本地模拟服务器）
+    "base_url": os.getenv("GROQ_BASE_URL", ""),
+    # 并发分析的最大并发数，以及每分钟请求数/token数上限
+    "max_concurrency": int(os.getenv("GROQ_MAX_CONCURRENCY", 4)),
+    "requests_per_minute": int(os.getenv("GROQ_RPM", 30)),
+    "tokens_per_minute": int(os.getenv("GROQ_TPM", 6000)),
+    # 批量评分：每次请求最多打包的摘要数（<=1表示逐篇评分），以及模型上下文长度
+    "batch_size": int(os.getenv("GROQ_BATCH_SIZE", 8)),
+    "context_tokens": int(os.getenv("GROQ_CONTEXT_TOKENS", 8192))
+}
+
+# LLM响应缓存（本地SQLite文件）
+LLM_CACHE_CONFIG = {
+    "enabled": os.getenv("LLM_CACHE_ENABLED", "true").lower() == "true",
+    "path": os.getenv("LLM_CACHE_PATH", ".llm_cache.sqlite3"),
+    # 缓存有效期（天）和文件大小上限（MB）
+    "ttl_days": float(os.getenv("LLM_CACHE_TTL_DAYS", 30)),
+    "max_mb": float(os.getenv("LLM_CACHE_MAX_MB", 100))
+}
+
+# 本地预排序模型（python preranker.py train 生成），用于在调用LLM前过滤低分论文
+PRERANK_CONFIG = {
+    "enabled": os.getenv("PRERANK_ENABLED", "true").lower() == "true",
+    "model_path": os.getenv("PRERANK_MODEL_PATH", "prerank_model.npz"),
+    # 训练时选择阈值所要保住的召回率（LLM评分≥8的论文）
+    "target_recall": float(os.getenv("PRERANK_TARGET_RECALL", 0.95)),
+    # 低于阈值的论文中随机送入LLM的比例（探索样本），训练时按1/比例加权，抵消只用高分论文训练的偏差
+    "explore_rate": float(os.getenv("PRERANK_EXPLORE_RATE", 0.05))
+}
+
+# 近似重复论文合并（near_duplicates.py），在调用LLM之前进行
+DEDUP_CONFIG = {
+    "enabled": os.getenv("DEDUP_ENABLED", "true").lower() == "true",
+    # MinHash估计的Jaccard相似度达到该值视为同一篇论文
+    "threshold": float(os.getenv("DEDUP_THRESHOLD", 0.7))
+}
+
+# papers表按月分区的维护（partitions.py）
+PARTITION_CONFIG = {
+    # 提前创建几个月的分区
+    "months_ahead": int(os.getenv("PARTITION_MONTHS_AHEAD", 2)),
+    # 只保留最近几个月的分区，更早的移到归档schema（0表示全部保留）
+    "retention_months": int(os.getenv("PARTITION_RETENTION_MONTHS", 0)),
+    "archive_schema": os.getenv("PARTITION_ARCHIVE_SCHEMA", "archive")
+}
+
+# 本地语义向量索引（python vector_index.py build 生成）
+VECTOR_INDEX_CONFIG = {
+    "path": os.getenv("VECTOR_INDEX_PATH", "vector_index"),
+    # 向量维数、哈希特征空间大小（2的幂）、拟合模型用的最近论文数
+    "dim": int(os.getenv("VECTOR_INDEX_DIM", 128)),
+    "n_features": int(os.getenv("VECTOR_INDEX_FEATURES", 2 ** 16)),
+    "sample_size": int(os.getenv("VECTOR_INDEX_SAMPLE_SIZE", 50000)),
+    # 按语义选择候选时，从索引中取出的论文数
+    "candidates": int(os.getenv("VECTOR_INDEX_CANDIDATES", 200))
+}
+
+# 论文和分析结果的列式导出（paper_export.py，需要pyarrow）
+EXPORT_CONFIG = {
+    # 每次运行机器人后自动增量导出
+    "enabled": os.getenv("EXPORT_ENABLED", "false").lower() == "true",
+    "path": os.getenv("EXPORT_PATH", "export"),
+    # arrow: 未压缩的Arrow IPC文件，读取时内存映射、零拷贝；parquet: 压缩更小，读取时需要解码
+    "format": os.getenv("EXPORT_FORMAT", "arrow"),
+    # 每个文件最多包含的行数
+    "batch_rows": int(os.getenv("EXPORT_BATCH_ROWS", 100000))
+}
+
+# 推文发布队列（post_outbox.py）
+OUTBOX_CONFIG = {
+    # 每日任务写入队列后，在后台启动发布进程；为false时由定时任务运行 python post_outbox.py
+    "autostart": os.getenv("POST_WORKER_AUTOSTART", "true").lower() == "true",
+    # 每条推文最多尝试发布的次数
+    "max_attempts": int(os.getenv("POST_MAX_ATTEMPTS", 5)),
+    # 限流时最多在进程内等待的秒数，超过则退出，剩下的推文由下一次运行发布
+    "max_wait": int(os.getenv("POST_MAX_WAIT", 900))
+}
@@ -0,0 +1,262 @@
+#!/usr/bin/env python3
+"""
+数据库访问层 - 进程内共享的连接池、常用查询和查询耗时统计
+
+所有模块通过这里获取连接（with connection() 或 acquire()/release()），
+同一进程中的机器人、爬虫管道和分析器复用同一组连接。
+常用查询在每个连接上PREPARE一次，之后只发送EXECUTE；每类查询的调用次数和
+耗时记录在内存中，运行结束时用format_query_stats()输出。
+整个分类、整张表这类结果行数不受限制的查询用stream()逐批读取，内存占用与行数无关。
+"""
+import itertools
+import threading
+import time
+import weakref
+from contextlib import contextmanager
+from datetime import date, datetime, timedelta
+from typing import NamedTuple, Optional
+
+from psycopg2.pool import ThreadedConnectionPool
+
+from config import DB_CONFIG, DB_POOL_CONFIG
+
+AGENT_CATEGORIES = ('cs.CL', 'cs.AI')
+
+
+class Paper(NamedTuple):
+    id: str
+    category: str
+    title: str
+    authors: str
+    abstract: str
+    url: str
+    added_at: Optional[date]
+
+
+PAPER_COLUMNS = ', '.join(Paper._fields)
+
+# 增量读取papers/paper_analysis中水位线 (modified_xid, seq)（两个参数）之后写入或修改的行，按 (modified_xid, seq) 排序。
+# seq在写入时分配而不是提交时，慢事务可能在水位线越过之后才提交更小的seq；只读取事务id小于当前快照xmin
+# （所有事务都已结束）的行，仍在进行的事务写入的行留到下次读取，它们提交后事务id仍大于这次的水位线
+CHANGED_AFTER = ("(modified_xid, seq) > (%s, %s) "
+                 "AND modified_xid < pg_snapshot_xmin(pg_current_snapshot())::text::bigint "
+                 "ORDER BY modified_xid, seq")
+
+# 名称 -> (参数类型, SQL)；参数用 $1, $2 ... 表示
+PREPARED_QUERIES = {
+    'papers_between': (
+        ('date', 'date', 'text[]'),
+        f"SELECT {PAPER_COLUMNS} FROM papers WHERE added_at >= $1 AND added_at <= $2 "
+        f"AND category = ANY($3) ORDER BY sn DESC"
+    ),
+    'recent_papers': (
+        ('integer',),
+        f"SELECT {PAPER_COLUMNS} FROM papers ORDER BY sn DESC LIMIT $1"
+    ),
+    # 全文检索：$2为真时$1中任一检索词命中即可（按命中程度排序），$6中的排除词（-词）仍全部生效；
+    # 否则要求$1全部命中（$1可以包含排除词，$6不使用）
+    'search_papers': (
+        ('text', 'boolean', 'date', 'text', 'integer', 'text'),
+        f"SELECT {PAPER_COLUMNS}, ts_rank_cd(search_vector, query) AS rank "
+        f"FROM papers, (SELECT CASE WHEN $2 "
+        f"THEN replace(websearch_to_tsquery('english', $1)::text, ' & ', ' | ')::tsquery "
+        f"&& websearch_to_tsquery('english', $6) "
+        f"ELSE websearch_to_tsquery('english', $1) END AS query) q "
+        f"WHERE search_vector @@ query AND ($3::date IS NULL OR added_at >= $3) "
+        f"AND ($4::text IS NULL OR category = $4) "
+        f"ORDER BY rank DESC, sn DESC LIMIT $5"
+    ),
+    'existing_ids': (
+        ('text[]',),
+        # paper_ids包含已归档分区中的论文
+        "SELECT id FROM paper_ids WHERE id = ANY($1)"
+    ),
+    'papers_by_ids': (
+        ('text[]',),
+        f"SELECT {PAPER_COLUMNS} FROM papers WHERE id = ANY($1)"
+    ),
+}
+
+_pool = None
+_pool_lock = threading.Lock()
+# 每个连接上已经PREPARE过的语句
+_prepared = weakref.WeakKeyDictionary()
+_stats = {}
+_stats_lock = threading.Lock()
+# 服务器端游标名在同一连接内不能重复
+_cursor_ids = itertools.count(1)
+
+
+def get_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is None or _pool.closed:
+            _pool = ThreadedConnectionPool(DB_POOL_CONFIG['min'], DB_POOL_CONFIG['max'], **DB_CONFIG)
+        return _pool
+
+
+def acquire():
+    """从连接池取一个连接，用完后必须调用release()"""
+    pool = get_pool()
+    conn = pool.getconn()
+    if conn.closed:
+        # 数据库重启等原因导致的失效连接，丢弃后重新获取
+        pool.putconn(conn, close=True)
+        conn = pool.getconn()
+    return conn
+
+
+def release(conn):
+    """归还连接；未提交的事务会被连接池回滚"""
+    if _pool is not None and not _pool.closed:
+        _pool.putconn(conn, close=bool(conn.closed))
+
+
+@contextmanager
+def connection():
+    conn = acquire()
+    try:
+        yield conn
+    except Exception:
+        if not conn.closed:
+            conn.rollback()
+        raise
+    finally:
+        release(conn)
+
+
+def close_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is not None and not _pool.closed:
+            _pool.closeall()
+        _pool = None
+
+
+def _record(name, elapsed):
+    with _stats_lock:
+        calls, total, slowest = _stats.get(name, (0, 0.0, 0.0))
+        _stats[name] = (calls + 1, total + elapsed, max(slowest, elapsed))
+
+
+@contextmanager
+def timed(name):
+    """记录一段数据库操作的耗时（用于批量写入等不走execute_prepared的操作）"""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        _record(name, time.perf_counter() - start)
+
+
+def query_stats():
+    """返回 {查询名: (调用次数, 总耗时秒, 最长耗时秒)}"""
+    with _stats_lock:
+        return dict(_stats)
+
+
+def format_query_stats():
+    lines = []
+    for name, (calls, total, slowest) in sorted(query_stats().items(), key=lambda item: -item[1][1]):
+        lines.append(f"{name}: {calls} 次, 共 {total * 1000:.1f} ms, "
+                     f"平均 {total / calls * 1000:.2f} ms, 最长 {slowest * 1000:.1f} ms")
+    return lines
+
+
+def execute_prepared(conn, name, params):
+    """在conn上执行PREPARED_QUERIES中的语句，第一次使用时先PREPARE，返回全部结果行"""
+    types, sql = PREPARED_QUERIES[name]
+    prepared = _prepared.setdefault(conn, set())
+    with timed(name), conn.cursor() as cursor:
+        if name not in prepared:
+            cursor.execute(f"PREPARE {name} ({', '.join(types)}) AS {sql}")
+            prepared.add(name)
+        cursor.execute(f"EXECUTE {name} ({', '.join(['%s'] * len(types))})", params)
+        return cursor.fetchall()
+
+
+def stream(name, sql, params=(), itersize=None):
+    """用服务器端命名游标执行查询，逐行返回结果的生成器
+
+    每次从服务器取回itersize行（默认DB_POOL_CONFIG['itersize']），处理完一批才取下一批，
+    内存中最多只有一批结果。生成器在遍历结束前占用连接池中的一个连接，
+    提前停止遍历时（close()或被回收）连接随之归还。
+    """
+    itersize = itersize or DB_POOL_CONFIG['itersize']
+    elapsed = 0.0
+    try:
+        with connection() as conn, conn.cursor(name=f"{name}_{next(_cursor_ids)}") as cursor:
+            start = time.perf_counter()
+            cursor.execute(sql, params)
+            while True:
+                rows = cursor.fetchmany(itersize)
+                elapsed += time.perf_counter() - start
+                if not rows:
+                    break
+                yield from rows
+                start = time.perf_counter()
+    finally:
+        # 只统计数据库耗时，不包括调用方处理每批结果的时间
+        _record(name, elapsed)
+
+
+def iter_papers_by_category(category, itersize=None):
+    """逐篇返回某个分类的论文（按入库顺序倒序）"""
+    for row in stream('stream_papers_by_category',
+                      f"SELECT {PAPER_COLUMNS} FROM papers WHERE category = %s ORDER BY sn DESC",
+                      (category,), itersize):
+        yield Paper(*row)
+
+
+def iter_papers(itersize=None):
+    """逐篇返回全部论文（按入库顺序倒序）"""
+    for row in stream('stream_papers', f"SELECT {PAPER_COLUMNS} FROM papers ORDER BY sn DESC", (), itersize):
+        yield Paper(*row)
+
+
+def ping():
+    """检查数据库是否可用"""
+    with connection() as conn, timed('ping'), conn.cursor() as cursor:
+        cursor.execute("SELECT 1;")
+        return cursor.fetchone() == (1,)
+
+
+def get_papers_between(start, end, categories=AGENT_CATEGORIES):
+    with connection() as conn:
+        return [Paper(*row) for row in execute_prepared(conn, 'papers_between', (start, end, list(categories)))]
+
+
+def get_last_24h_papers(categories=AGENT_CATEGORIES):
+    """昨天和今天入库的论文（按入库顺序倒序）"""
+    today = datetime.now().date()
+    return get_papers_between(today - timedelta(days=1), today, categories)
+
+
+def get_recent_papers(limit):
+    with connection() as conn:
+        return [Paper(*row) for row in execute_prepared(conn, 'recent_papers', (limit,))]
+
+
+def existing_ids(ids):
+    """返回ids中已经入库（包括已归档）的id集合"""
+    ids = list(ids)
+    if not ids:
+        return set()
+    with connection() as conn:
+        return {row[0] for row in execute_prepared(conn, 'existing_ids', (ids,))}
+
+
+def get_papers_by_ids(ids):
+    """按ids的顺序返回论文，不存在的id被跳过"""
+    ids = list(ids)
+    if not ids:
+        return []
+    with connection() as conn:
+        papers = {row[0]: Paper(*row) for row in execute_prepared(conn, 'papers_by_ids', (ids,))}
+    return [papers[paper_id] for paper_id in ids if paper_id in papers]
+
+
+def list_categories():
+    with connection() as conn, timed('list_categories'), conn.cursor() as cursor:
+        cursor.execute("SELECT DISTINCT category FROM papers ORDER BY category;")
+        return [row[0] for row in cursor.fetchall()]
@@ -1,17 +1,208 @@
--- 创建papers表
+-- 全新数据库的表结构快照（docker-compose首次启动时执行）
+-- 表结构以migrations.py为准，已有数据库由迁移升级；修改结构时两处同步更新，
+-- 并把新迁移的版本号加到文件末尾的schema_migrations中
+
+-- papers按added_at按月分区，主键必须包含分区键；id的全局唯一由paper_ids和触发器保证
 CREATE TABLE IF NOT EXISTS papers (
-    id VARCHAR(50) PRIMARY KEY,
+    id VARCHAR(50) NOT NULL,
     sn SERIAL,
     category VARCHAR(20),
+    categories TEXT,
+    version INTEGER,
     title TEXT,
     authors TEXT,
     abstract TEXT,
     url TEXT,
-    added_at DATE DEFAULT CURRENT_DATE,
-    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-);
+    added_at DATE NOT NULL DEFAULT CURRENT_DATE,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    search_vector TSVECTOR GENERATED ALWAYS AS (
+        setweight(to_tsvector('english', coalesce(title, '')), 'A') ||
+        setweight(to_tsvector('english', coalesce(abstract, '')), 'B') ||
+        setweight(to_tsvector('simple', coalesce(authors, '')), 'C')
+    ) STORED,
+    -- 插入或修改时由触发器papers_mark_modified分配，增量导出和向量索引据此读取变化的行
+    seq BIGINT NOT NULL,
+    modified_xid BIGINT NOT NULL DEFAULT 0,
+    PRIMARY KEY (id, added_at)
+) PARTITION BY RANGE (added_at);
 
--- 创建索引
-CREATE INDEX IF NOT EXISTS idx_papers_added_at ON papers(added_at);
+-- 创建索引（added_at用BRIN，每日查询用覆盖索引）
+CREATE INDEX IF NOT EXISTS idx_papers_added_at_brin ON papers USING BRIN (added_at);
+CREATE INDEX IF NOT EXISTS idx_papers_daily ON papers (added_at, category) INCLUDE (sn);
 CREATE INDEX IF NOT EXISTS idx_papers_category ON papers(category);
-CREATE INDEX IF NOT EXISTS idx_papers_sn ON papers(sn);
\ No newline at end of file
+CREATE INDEX IF NOT EXISTS idx_papers_sn ON papers(sn);
+CREATE INDEX IF NOT EXISTS idx_papers_search ON papers USING GIN (search_vector);
+CREATE INDEX IF NOT EXISTS idx_papers_modified ON papers (modified_xid, seq);
+
+CREATE SEQUENCE IF NOT EXISTS papers_seq_seq OWNED BY papers.seq;
+
+-- 所有入库过的论文id（包括已归档的分区）
+CREATE TABLE IF NOT EXISTS paper_ids (
+    id TEXT PRIMARY KEY,
+    added_at DATE NOT NULL,
+    version INTEGER
+);
+
+-- 创建day所在月份的分区（已存在时什么也不做），返回分区名
+CREATE OR REPLACE FUNCTION papers_ensure_partition(day DATE) RETURNS TEXT AS $$
+DECLARE
+    month_start DATE := date_trunc('month', day)::date;
+    partition_name TEXT := 'papers_' || to_char(day, 'YYYY_MM');
+BEGIN
+    IF to_regclass(partition_name) IS NULL THEN
+        PERFORM pg_advisory_xact_lock(hashtext(partition_name));
+        EXECUTE format('CREATE TABLE IF NOT EXISTS %I PARTITION OF papers FOR VALUES FROM (%L) TO (%L)',
+                       partition_name, month_start, (month_start + interval '1 month')::date);
+    END IF;
+    RETURN partition_name;
+END $$ LANGUAGE plpgsql;
+
+-- id已存在时跳过这一行，效果与 ON CONFLICT (id) DO NOTHING 相同
+CREATE OR REPLACE FUNCTION papers_register_id() RETURNS trigger AS $$
+BEGIN
+    INSERT INTO paper_ids (id, added_at, version) VALUES (NEW.id, NEW.added_at, NEW.version)
+        ON CONFLICT (id) DO NOTHING;
+    IF NOT FOUND THEN
+        RETURN NULL;
+    END IF;
+    RETURN NEW;
+END $$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION papers_unregister_id() RETURNS trigger AS $$
+BEGIN
+    DELETE FROM paper_ids WHERE id = OLD.id;
+    RETURN NULL;
+END $$ LANGUAGE plpgsql;
+
+-- 管道用新版本覆盖论文时，同步paper_ids中的版本号（爬虫预过滤据此放行新版本）
+CREATE OR REPLACE FUNCTION papers_sync_version() RETURNS trigger AS $$
+BEGIN
+    UPDATE paper_ids SET version = NEW.version WHERE id = NEW.id;
+    RETURN NULL;
+END $$ LANGUAGE plpgsql;
+
+-- 修改added_at会把行移到另一个分区（先删除再插入），插入时id已登记会被跳过而丢失，所以禁止修改
+CREATE OR REPLACE FUNCTION papers_freeze_key() RETURNS trigger AS $$
+BEGIN
+    IF NEW.id IS DISTINCT FROM OLD.id OR NEW.added_at IS DISTINCT FROM OLD.added_at THEN
+        RAISE EXCEPTION 'papers.id和added_at不能修改（论文 %），请删除后重新插入', OLD.id;
+    END IF;
+    RETURN NEW;
+END $$ LANGUAGE plpgsql;
+
+CREATE TRIGGER papers_register_id BEFORE INSERT ON papers
+    FOR EACH ROW EXECUTE FUNCTION papers_register_id();
+CREATE TRIGGER papers_unregister_id AFTER DELETE ON papers
+    FOR EACH ROW EXECUTE FUNCTION papers_unregister_id();
+CREATE TRIGGER papers_freeze_key BEFORE UPDATE OF id, added_at ON papers
+    FOR EACH ROW EXECUTE FUNCTION papers_freeze_key();
+CREATE TRIGGER papers_sync_version AFTER UPDATE OF version ON papers
+    FOR EACH ROW EXECUTE FUNCTION papers_sync_version();
+
+-- 插入或修改时分配新的seq（参数为序列名）并记录事务id；内容没有变化的UPDATE不分配
+CREATE OR REPLACE FUNCTION mark_modified() RETURNS trigger AS $$
+BEGIN
+    IF TG_OP = 'UPDATE' AND NEW IS NOT DISTINCT FROM OLD THEN
+        RETURN NEW;
+    END IF;
+    NEW.seq := nextval(TG_ARGV[0]);
+    NEW.modified_xid := pg_current_xact_id()::text::bigint;
+    RETURN NEW;
+END $$ LANGUAGE plpgsql;
+
+CREATE TRIGGER papers_mark_modified BEFORE INSERT OR UPDATE ON papers
+    FOR EACH ROW EXECUTE FUNCTION mark_modified('papers_seq_seq');
+
+-- 当前及之后两个月的分区（之后由partitions.py维护）
+SELECT papers_ensure_partition((CURRENT_DATE + make_interval(months => i))::date) FROM generate_series(0, 2) i;
+
+-- LLM分析结果（按论文、模型和prompt版本保存，重复运行时不再重新评分）
+CREATE TABLE IF NOT EXISTS paper_analysis (
+    paper_id TEXT NOT NULL,
+    model TEXT NOT NULL,
+    prompt_version TEXT NOT NULL,
+    added_at DATE,
+    relevant BOOLEAN NOT NULL,
+    confidence TEXT,
+    relevance_score SMALLINT NOT NULL,
+    analysis TEXT,
+    keywords TEXT[],
+    description TEXT,
+    detailed_analysis TEXT,
+    latency REAL,
+    analyzed_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    seq BIGSERIAL,
+    -- 预排序探索样本被送入LLM的概率，NULL表示没有经过预排序过滤
+    propensity REAL,
+    modified_xid BIGINT NOT NULL DEFAULT 0,
+    PRIMARY KEY (paper_id, model, prompt_version)
+);
+
+CREATE INDEX IF NOT EXISTS idx_paper_analysis_top ON paper_analysis(model, prompt_version, added_at, relevance_score DESC);
+CREATE INDEX IF NOT EXISTS idx_paper_analysis_seq ON paper_analysis(seq);
+CREATE INDEX IF NOT EXISTS idx_paper_analysis_modified ON paper_analysis (modified_xid, seq);
+
+CREATE TRIGGER paper_analysis_mark_modified BEFORE INSERT OR UPDATE ON paper_analysis
+    FOR EACH ROW EXECUTE FUNCTION mark_modified('paper_analysis_seq_seq');
+
+-- 每个分类已爬取到的最大论文id（增量爬取的水位线）
+CREATE TABLE IF NOT EXISTS crawl_watermarks (
+    category TEXT PRIMARY KEY,
+    max_id TEXT NOT NULL,
+    announce_date DATE NOT NULL,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+-- 近似重复检测的MinHash签名和LSH分段哈希
+CREATE TABLE IF NOT EXISTS paper_minhash (
+    paper_id TEXT PRIMARY KEY,
+    signature BYTEA NOT NULL,
+    bands BIGINT[] NOT NULL,
+    duplicate_of TEXT,
+    computed_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE INDEX IF NOT EXISTS idx_paper_minhash_bands ON paper_minhash USING GIN (bands);
+
+-- 推文发布队列（post_outbox.py），每篇论文最多一条
+CREATE TABLE IF NOT EXISTS post_outbox (
+    paper_id TEXT PRIMARY KEY,
+    content TEXT NOT NULL,
+    url TEXT NOT NULL,
+    position INTEGER NOT NULL DEFAULT 0,
+    status TEXT NOT NULL DEFAULT 'pending' CHECK (status IN ('pending', 'sending', 'posted', 'failed')),
+    attempts INTEGER NOT NULL DEFAULT 0,
+    tweet_id TEXT,
+    last_error TEXT,
+    enqueued_at TIMESTAMPTZ NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    next_attempt_at TIMESTAMPTZ NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    claimed_at TIMESTAMPTZ,
+    posted_at TIMESTAMPTZ
+);
+
+CREATE INDEX IF NOT EXISTS idx_post_outbox_due ON post_outbox(next_attempt_at) WHERE status = 'pending';
+
+-- 本快照包含的迁移版本，migrations.py不会再对新数据库执行它们
+CREATE TABLE IF NOT EXISTS schema_migrations (
+    version INTEGER PRIMARY KEY,
+    name TEXT NOT NULL,
+    applied_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    duration_ms REAL
+);
+
+INSERT INTO schema_migrations (version, name) VALUES
+    (1, 'create_papers'),
+    (2, 'papers_columns'),
+    (3, 'papers_dedupe_primary_key'),
+    (4, 'papers_indexes'),
+    (5, 'create_paper_analysis'),
+    (6, 'create_crawl_watermarks'),
+    (7, 'papers_search_vector'),
+    (8, 'create_paper_minhash'),
+    (9, 'partition_papers_by_month'),
+    (10, 'paper_analysis_seq'),
+    (11, 'create_post_outbox'),
+    (12, 'paper_ids_version'),
+    (13, 'paper_analysis_propensity'),
+    (14, 'modified_seq')
+ON CONFLICT (version) DO NOTHING;
@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+"""
+LLM响应缓存 - 相同模型、相同prompt模板版本、相同输入不再重复调用LLM
+
+缓存保存在本地SQLite文件中，键为 模型 + 模板名称和版本 + prompt内容的哈希。
+超过有效期的记录视为未命中；文件总大小超过上限时按最近访问时间淘汰。
+修改prompt模板时提高对应的模板版本号，旧缓存就不会再被使用。
+调用方只在响应通过解析和校验后才写入缓存（paper_analyzer.PaperAnalyzer._invoke），
+无法使用的响应不会在重新运行时被再次读出。
+"""
+import hashlib
+import sqlite3
+import threading
+import time
+
+
+class LLMCache:
+    def __init__(self, path, ttl_days=30, max_mb=100):
+        self.ttl = ttl_days * 86400
+        self.max_bytes = int(max_mb * 1024 * 1024)
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.latency_saved = 0.0
+
+        # analyze_many会在多个线程中访问缓存，统一由self.lock串行化
+        self.db = sqlite3.connect(path, check_same_thread=False)
+        self.db.execute("""
+            CREATE TABLE IF NOT EXISTS llm_responses(
+                key TEXT PRIMARY KEY,
+                model TEXT NOT NULL,
+                template TEXT NOT NULL,
+                created_at REAL NOT NULL,
+                accessed_at REAL NOT NULL,
+                latency REAL NOT NULL,
+                size INTEGER NOT NULL,
+                response TEXT NOT NULL
+            )
+        """)
+        self.db.execute("CREATE INDEX IF NOT EXISTS idx_llm_responses_accessed ON llm_responses(accessed_at)")
+        self.db.commit()
+        self.total_bytes = self.db.execute("SELECT COALESCE(SUM(size), 0) FROM llm_responses").fetchone()[0]
+
+    @staticmethod
+    def make_key(model, template, prompt):
+        """template形如 "analyze_abstract:v1"，prompt已包含所有输入内容"""
+        return hashlib.sha256(f"{model}\0{template}\0{prompt}".encode("utf-8")).hexdigest()
+
+    def get(self, key):
+        """命中返回缓存的响应文本，否则返回None"""
+        now = time.time()
+        with self.lock:
+            row = self.db.execute(
+                "SELECT created_at, latency, response FROM llm_responses WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None or (self.ttl > 0 and now - row[0] > self.ttl):
+                self.misses += 1
+                return None
+            self.db.execute("UPDATE llm_responses SET accessed_at = ? WHERE key = ?", (now, key))
+            self.db.commit()
+            self.hits += 1
+            self.latency_saved += row[1]
+            return row[2]
+
+    def put(self, key, model, template, response, latency):
+        now = time.time()
+        size = len(response.encode("utf-8")) + len(key)
+        with self.lock:
+            old = self.db.execute("SELECT size FROM llm_responses WHERE key = ?", (key,)).fetchone()
+            self.db.execute(
+                "INSERT OR REPLACE INTO llm_responses "
+                "(key, model, template, created_at, accessed_at, latency, size, response) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (key, model, template, now, now, latency, size, response)
+            )
+            self.total_bytes += size - (old[0] if old else 0)
+            if self.total_bytes > self.max_bytes:
+                self._evict()
+            self.db.commit()
+
+    def delete(self, key):
+        """删除一条记录（缓存的响应无法解析时使用）"""
+        with self.lock:
+            old = self.db.execute("SELECT size FROM llm_responses WHERE key = ?", (key,)).fetchone()
+            if old:
+                self.db.execute("DELETE FROM llm_responses WHERE key = ?", (key,))
+                self.total_bytes -= old[0]
+                self.db.commit()
+
+    def _evict(self):
+        """先删除过期记录，再按最近访问时间淘汰，直到总大小降到上限的90%"""
+        if self.ttl > 0:
+            self.db.execute("DELETE FROM llm_responses WHERE created_at < ?", (time.time() - self.ttl,))
+            self.total_bytes = self.db.execute("SELECT COALESCE(SUM(size), 0) FROM llm_responses").fetchone()[0]
+
+        target = self.max_bytes * 0.9
+        evicted = []
+        for key, size in self.db.execute("SELECT key, size FROM llm_responses ORDER BY accessed_at"):
+            if self.total_bytes <= target:
+                break
+            evicted.append((key,))
+            self.total_bytes -= size
+        self.db.executemany("DELETE FROM llm_responses WHERE key = ?", evicted)
+
+    def summary(self):
+        total = self.hits + self.misses
+        rate = self.hits / total * 100 if total else 0
+        return (f"命中 {self.hits} 次, 未命中 {self.misses} 次 (命中率 {rate:.0f}%), "
+                f"节省LLM耗时 {self.latency_saved:.1f}s")
+
+    def close(self):
+        with self.lock:
+            self.db.commit()
+            self.db.close()
@@ -0,0 +1,460 @@
+#!/usr/bin/env python3
+"""
+数据库结构迁移 - 所有表结构的唯一定义
+
+MIGRATIONS按版本号顺序执行，已执行的版本记录在schema_migrations表中。
+每个迁移都写成可以在任何已有数据库上安全执行的形式：无论数据库是init.sql创建的、
+旧版爬虫管道创建的（SN serial主键、id上没有唯一约束），还是全新的空库，
+执行完后都是同一个结构。多个进程同时启动时用advisory锁保证只有一个在迁移。
+
+init.sql是全新数据库（docker-compose首次启动）的结构快照，并在schema_migrations中
+记录它已包含的版本。修改表结构时在这里新增迁移，并同步更新init.sql。
+
+用法:
+    python migrations.py          # 执行所有未执行的迁移
+    python migrations.py status   # 查看每个迁移的执行状态
+"""
+import sys
+import time
+
+# pg_advisory_xact_lock的键，同一数据库上的迁移互斥
+MIGRATION_LOCK_ID = 7041920190
+
+
+def _is_partitioned(cursor):
+    cursor.execute("SELECT relkind = 'p' FROM pg_class WHERE oid = 'papers'::regclass;")
+    return cursor.fetchone()[0]
+
+
+def _dedupe_papers_and_primary_key(cursor, log):
+    """删除重复id和空id的论文，然后把papers的主键统一为id"""
+    if _is_partitioned(cursor):
+        # 已经是分区表（迁移9），id的唯一性由paper_ids保证
+        return
+    cursor.execute("""
+        DELETE FROM papers p
+        USING (
+            SELECT ctid, row_number() OVER (PARTITION BY id ORDER BY version DESC NULLS LAST, sn) AS rn
+            FROM papers
+            WHERE id IS NOT NULL
+        ) d
+        WHERE p.ctid = d.ctid AND d.rn > 1;
+    """)
+    if cursor.rowcount:
+        log(f"   删除了 {cursor.rowcount} 条重复论文（每个id保留版本最新、最早入库的一条）")
+    cursor.execute("DELETE FROM papers WHERE id IS NULL;")
+    if cursor.rowcount:
+        log(f"   删除了 {cursor.rowcount} 条没有id的论文")
+
+    cursor.execute("""
+        SELECT c.conname, array_agg(a.attname::text)
+        FROM pg_constraint c
+        JOIN pg_attribute a ON a.attrelid = c.conrelid AND a.attnum = ANY(c.conkey)
+        WHERE c.conrelid = 'papers'::regclass AND c.contype = 'p'
+        GROUP BY c.conname;
+    """)
+    primary_key = cursor.fetchone()
+    if primary_key and primary_key[1] == ['id']:
+        return
+    if primary_key:
+        # 旧版管道建的表以SN为主键
+        cursor.execute(f'ALTER TABLE papers DROP CONSTRAINT "{primary_key[0]}";')
+    cursor.execute("ALTER TABLE papers ADD PRIMARY KEY (id);")
+
+    # 主键已经保证唯一，去掉id上多余的唯一约束和唯一索引
+    cursor.execute("""
+        SELECT c.conname FROM pg_constraint c
+        WHERE c.conrelid = 'papers'::regclass AND c.contype = 'u'
+          AND c.conkey = ARRAY[(SELECT attnum FROM pg_attribute
+                                WHERE attrelid = 'papers'::regclass AND attname = 'id')];
+    """)
+    for (name,) in cursor.fetchall():
+        cursor.execute(f'ALTER TABLE papers DROP CONSTRAINT "{name}";')
+    cursor.execute("DROP INDEX IF EXISTS idx_papers_id_unique;")
+
+
+# 迁移9创建的函数和触发器，init.sql中有同样的定义
+PAPERS_PARTITION_FUNCTIONS = """
+    -- 创建day所在月份的分区（已存在时什么也不做），返回分区名
+    CREATE OR REPLACE FUNCTION papers_ensure_partition(day DATE) RETURNS TEXT AS $$
+    DECLARE
+        month_start DATE := date_trunc('month', day)::date;
+        partition_name TEXT := 'papers_' || to_char(day, 'YYYY_MM');
+    BEGIN
+        IF to_regclass(partition_name) IS NULL THEN
+            -- 多个进程同时创建同一个分区时，IF NOT EXISTS也可能报错，先加锁
+            PERFORM pg_advisory_xact_lock(hashtext(partition_name));
+            EXECUTE format('CREATE TABLE IF NOT EXISTS %I PARTITION OF papers FOR VALUES FROM (%L) TO (%L)',
+                           partition_name, month_start, (month_start + interval '1 month')::date);
+        END IF;
+        RETURN partition_name;
+    END $$ LANGUAGE plpgsql;
+
+    -- 分区表的主键必须包含added_at，id的全局唯一由paper_ids保证：id已存在时跳过这一行，
+    -- 效果与 ON CONFLICT (id) DO NOTHING 相同（RETURNING不会返回被跳过的行）
+    CREATE OR REPLACE FUNCTION papers_register_id() RETURNS trigger AS $$
+    BEGIN
+        INSERT INTO paper_ids (id, added_at) VALUES (NEW.id, NEW.added_at) ON CONFLICT (id) DO NOTHING;
+        IF NOT FOUND THEN
+            RETURN NULL;
+        END IF;
+        RETURN NEW;
+    END $$ LANGUAGE plpgsql;
+
+    CREATE OR REPLACE FUNCTION papers_unregister_id() RETURNS trigger AS $$
+    BEGIN
+        DELETE FROM paper_ids WHERE id = OLD.id;
+        RETURN NULL;
+    END $$ LANGUAGE plpgsql;
+
+    -- 修改added_at会把行移到另一个分区（先删除再插入），插入时id已登记会被跳过而丢失，所以禁止修改
+    CREATE OR REPLACE FUNCTION papers_freeze_key() RETURNS trigger AS $$
+    BEGIN
+        IF NEW.id IS DISTINCT FROM OLD.id OR NEW.added_at IS DISTINCT FROM OLD.added_at THEN
+            RAISE EXCEPTION 'papers.id和added_at不能修改（论文 %），请删除后重新插入', OLD.id;
+        END IF;
+        RETURN NEW;
+    END $$ LANGUAGE plpgsql;
+"""
+
+
+def _partition_papers_by_month(cursor, log):
+    """把papers改为按added_at按月分区的表
+
+    分区表的主键是 (id, added_at)，id的全局唯一（包括已归档的分区）由paper_ids表和触发器保证。
+    added_at上用BRIN索引代替B-tree，每日查询用 (added_at, category) INCLUDE (sn) 覆盖索引。
+    """
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS paper_ids (
+            id TEXT PRIMARY KEY,
+            added_at DATE NOT NULL
+        );
+    """)
+    if _is_partitioned(cursor):
+        return
+    cursor.execute("UPDATE papers SET added_at = coalesce(created_at::date, CURRENT_DATE) WHERE added_at IS NULL;")
+    if cursor.rowcount:
+        log(f"   {cursor.rowcount} 篇论文没有added_at，按入库时间补齐")
+
+    # sn的序列归属于旧表，删除旧表前先解除
+    cursor.execute("SELECT pg_get_serial_sequence('papers', 'sn');")
+    sequence = cursor.fetchone()[0]
+    cursor.execute(f"ALTER SEQUENCE {sequence} OWNED BY NONE;")
+    cursor.execute("ALTER TABLE papers RENAME TO papers_unpartitioned;")
+    cursor.execute(f"""
+        CREATE TABLE papers (
+            id VARCHAR(50) NOT NULL,
+            sn INTEGER NOT NULL DEFAULT nextval('{sequence}'),
+            category VARCHAR(20),
+            categories TEXT,
+            version INTEGER,
+            title TEXT,
+            authors TEXT,
+            abstract TEXT,
+            url TEXT,
+            added_at DATE NOT NULL DEFAULT CURRENT_DATE,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            search_vector TSVECTOR GENERATED ALWAYS AS (
+                setweight(to_tsvector('english', coalesce(title, '')), 'A') ||
+                setweight(to_tsvector('english', coalesce(abstract, '')), 'B') ||
+                setweight(to_tsvector('simple', coalesce(authors, '')), 'C')
+            ) STORED
+        ) PARTITION BY RANGE (added_at);
+    """)
+    cursor.execute(PAPERS_PARTITION_FUNCTIONS)
+    cursor.execute("""
+        SELECT count(papers_ensure_partition(month)) FROM (
+            SELECT DISTINCT date_trunc('month', added_at)::date AS month FROM papers_unpartitioned
+            UNION SELECT date_trunc('month', CURRENT_DATE)::date
+        ) months;
+    """)
+    partitions = cursor.fetchone()[0]
+    # 按sn顺序写入，BRIN索引的块范围与时间顺序一致
+    cursor.execute("""
+        INSERT INTO papers (id, sn, category, categories, version, title, authors, abstract, url, added_at, created_at)
+        SELECT id, sn, category, categories, version, title, authors, abstract, url, added_at, created_at
+        FROM papers_unpartitioned ORDER BY added_at, sn;
+    """)
+    log(f"   {cursor.rowcount} 篇论文写入 {partitions} 个月分区")
+    cursor.execute("DROP TABLE papers_unpartitioned;")
+    cursor.execute(f"ALTER SEQUENCE {sequence} OWNED BY papers.sn;")
+
+    cursor.execute("""
+        ALTER TABLE papers ADD PRIMARY KEY (id, added_at);
+        CREATE INDEX idx_papers_added_at_brin ON papers USING BRIN (added_at);
+        CREATE INDEX idx_papers_daily ON papers (added_at, category) INCLUDE (sn);
+        CREATE INDEX idx_papers_category ON papers (category);
+        CREATE INDEX idx_papers_sn ON papers (sn);
+        CREATE INDEX idx_papers_search ON papers USING GIN (search_vector);
+
+        INSERT INTO paper_ids (id, added_at) SELECT id, added_at FROM papers ON CONFLICT (id) DO NOTHING;
+        CREATE TRIGGER papers_register_id BEFORE INSERT ON papers
+            FOR EACH ROW EXECUTE FUNCTION papers_register_id();
+        CREATE TRIGGER papers_unregister_id AFTER DELETE ON papers
+            FOR EACH ROW EXECUTE FUNCTION papers_unregister_id();
+        CREATE TRIGGER papers_freeze_key BEFORE UPDATE OF id, added_at ON papers
+            FOR EACH ROW EXECUTE FUNCTION papers_freeze_key();
+    """)
+
+
+# (版本号, 名称, SQL语句或 function(cursor, log))
+MIGRATIONS = [
+    (1, "create_papers", """
+        CREATE TABLE IF NOT EXISTS papers (
+            id VARCHAR(50) PRIMARY KEY,
+            sn SERIAL,
+            category VARCHAR(20),
+            categories TEXT,
+            version INTEGER,
+            title TEXT,
+            authors TEXT,
+            abstract TEXT,
+            url TEXT,
+            added_at DATE DEFAULT CURRENT_DATE,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        );
+    """),
+    (2, "papers_columns", """
+        ALTER TABLE papers
+            ADD COLUMN IF NOT EXISTS sn SERIAL,
+            ADD COLUMN IF NOT EXISTS categories TEXT,
+            ADD COLUMN IF NOT EXISTS version INTEGER,
+            ADD COLUMN IF NOT EXISTS created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            ALTER COLUMN added_at SET DEFAULT CURRENT_DATE;
+    """),
+    (3, "papers_dedupe_primary_key", _dedupe_papers_and_primary_key),
+    (4, "papers_indexes", """
+        CREATE INDEX IF NOT EXISTS idx_papers_added_at ON papers(added_at);
+        CREATE INDEX IF NOT EXISTS idx_papers_category ON papers(category);
+        CREATE INDEX IF NOT EXISTS idx_papers_sn ON papers(sn);
+    """),
+    (5, "create_paper_analysis", """
+        CREATE TABLE IF NOT EXISTS paper_analysis (
+            paper_id TEXT NOT NULL,
+            model TEXT NOT NULL,
+            prompt_version TEXT NOT NULL,
+            added_at DATE,
+            relevant BOOLEAN NOT NULL,
+            confidence TEXT,
+            relevance_score SMALLINT NOT NULL,
+            analysis TEXT,
+            keywords TEXT[],
+            description TEXT,
+            detailed_analysis TEXT,
+            latency REAL,
+            analyzed_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            PRIMARY KEY (paper_id, model, prompt_version)
+        );
+        CREATE INDEX IF NOT EXISTS idx_paper_analysis_top
+            ON paper_analysis(model, prompt_version, added_at, relevance_score DESC);
+    """),
+    (6, "create_crawl_watermarks", """
+        CREATE TABLE IF NOT EXISTS crawl_watermarks (
+            category TEXT PRIMARY KEY,
+            max_id TEXT NOT NULL,
+            announce_date DATE NOT NULL,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        );
+    """),
+    # 全文检索（paper_search.py）：标题权重A、摘要B、作者C，作者名不做词干化
+    (7, "papers_search_vector", """
+        ALTER TABLE papers ADD COLUMN IF NOT EXISTS search_vector tsvector
+            GENERATED ALWAYS AS (
+                setweight(to_tsvector('english', coalesce(title, '')), 'A') ||
+                setweight(to_tsvector('english', coalesce(abstract, '')), 'B') ||
+                setweight(to_tsvector('simple', coalesce(authors, '')), 'C')
+            ) STORED;
+        CREATE INDEX IF NOT EXISTS idx_papers_search ON papers USING GIN (search_vector);
+    """),
+    # 近似重复检测（near_duplicates.py）：MinHash签名和LSH分段哈希
+    (8, "create_paper_minhash", """
+        CREATE TABLE IF NOT EXISTS paper_minhash (
+            paper_id TEXT PRIMARY KEY,
+            signature BYTEA NOT NULL,
+            bands BIGINT[] NOT NULL,
+            duplicate_of TEXT,
+            computed_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        );
+        CREATE INDEX IF NOT EXISTS idx_paper_minhash_bands ON paper_minhash USING GIN (bands);
+    """),
+    # papers按月分区（partitions.py负责创建新分区和归档旧分区）
+    (9, "partition_papers_by_month", _partition_papers_by_month),
+    # 增量导出（paper_export.py）的水位线：写入或覆盖分析结果时分配新的seq
+    (10, "paper_analysis_seq", """
+        ALTER TABLE paper_analysis ADD COLUMN IF NOT EXISTS seq BIGSERIAL;
+        CREATE INDEX IF NOT EXISTS idx_paper_analysis_seq ON paper_analysis(seq);
+    """),
+    # 推文发布队列（post_outbox.py）：每篇论文最多一条，时间与Twitter API比较，用TIMESTAMPTZ
+    (11, "create_post_outbox", """
+        CREATE TABLE IF NOT EXISTS post_outbox (
+            paper_id TEXT PRIMARY KEY,
+            content TEXT NOT NULL,
+            url TEXT NOT NULL,
+            position INTEGER NOT NULL DEFAULT 0,
+            status TEXT NOT NULL DEFAULT 'pending' CHECK (status IN ('pending', 'sending', 'posted', 'failed')),
+            attempts INTEGER NOT NULL DEFAULT 0,
+            tweet_id TEXT,
+            last_error TEXT,
+            enqueued_at TIMESTAMPTZ NOT NULL DEFAULT CURRENT_TIMESTAMP,
+            next_attempt_at TIMESTAMPTZ NOT NULL DEFAULT CURRENT_TIMESTAMP,
+            claimed_at TIMESTAMPTZ,
+            posted_at TIMESTAMPTZ
+        );
+        CREATE INDEX IF NOT EXISTS idx_post_outbox_due ON post_outbox(next_attempt_at) WHERE status = 'pending';
+    """),
+    # 爬虫预过滤（tutorial/known_ids.py）需要已入库的版本号，才能放行新版本（vN）；
+    # 插入时登记版本，管道用新版本覆盖论文时同步更新
+    (12, "paper_ids_version", """
+        ALTER TABLE paper_ids ADD COLUMN IF NOT EXISTS version INTEGER;
+        UPDATE paper_ids i SET version = p.version FROM papers p WHERE p.id = i.id AND p.version IS NOT NULL;
+
+        CREATE OR REPLACE FUNCTION papers_register_id() RETURNS trigger AS $$
+        BEGIN
+            INSERT INTO paper_ids (id, added_at, version) VALUES (NEW.id, NEW.added_at, NEW.version)
+                ON CONFLICT (id) DO NOTHING;
+            IF NOT FOUND THEN
+                RETURN NULL;
+            END IF;
+            RETURN NEW;
+        END $$ LANGUAGE plpgsql;
+
+        CREATE OR REPLACE FUNCTION papers_sync_version() RETURNS trigger AS $$
+        BEGIN
+            UPDATE paper_ids SET version = NEW.version WHERE id = NEW.id;
+            RETURN NULL;
+        END $$ LANGUAGE plpgsql;
+
+        DROP TRIGGER IF EXISTS papers_sync_version ON papers;
+        CREATE TRIGGER papers_sync_version AFTER UPDATE OF version ON papers
+            FOR EACH ROW EXECUTE FUNCTION papers_sync_version();
+    """),
+    # 预排序（preranker.py）的探索样本：论文被送入LLM的概率，NULL表示没有经过预排序过滤（概率为1）
+    (13, "paper_analysis_propensity", """
+        ALTER TABLE paper_analysis ADD COLUMN IF NOT EXISTS propensity REAL;
+    """),
+    # 增量导出（paper_export.py）和向量索引（vector_index.py）的水位线：papers和paper_analysis
+    # 每次插入或修改时由触发器分配新的seq并记录写入的事务id，按 (modified_xid, seq) 增量读取（db.CHANGED_AFTER）。
+    # 已有的行事务id记为0，papers的seq沿用sn，与旧的按sn/seq记录的水位线一致
+    (14, "modified_seq", """
+        CREATE SEQUENCE IF NOT EXISTS papers_seq_seq;
+        ALTER TABLE papers ADD COLUMN IF NOT EXISTS seq BIGINT,
+                           ADD COLUMN IF NOT EXISTS modified_xid BIGINT NOT NULL DEFAULT 0;
+        UPDATE papers SET seq = sn WHERE seq IS NULL;
+        ALTER TABLE papers ALTER COLUMN seq SET NOT NULL;
+        ALTER SEQUENCE papers_seq_seq OWNED BY papers.seq;
+        SELECT setval('papers_seq_seq', coalesce((SELECT max(seq) FROM papers), 0) + 1, false);
+        ALTER TABLE paper_analysis ADD COLUMN IF NOT EXISTS modified_xid BIGINT NOT NULL DEFAULT 0;
+
+        -- 参数为seq列的序列名；内容没有变化的UPDATE不分配新的seq
+        CREATE OR REPLACE FUNCTION mark_modified() RETURNS trigger AS $$
+        BEGIN
+            IF TG_OP = 'UPDATE' AND NEW IS NOT DISTINCT FROM OLD THEN
+                RETURN NEW;
+            END IF;
+            NEW.seq := nextval(TG_ARGV[0]);
+            NEW.modified_xid := pg_current_xact_id()::text::bigint;
+            RETURN NEW;
+        END $$ LANGUAGE plpgsql;
+
+        DROP TRIGGER IF EXISTS papers_mark_modified ON papers;
+        CREATE TRIGGER papers_mark_modified BEFORE INSERT OR UPDATE ON papers
+            FOR EACH ROW EXECUTE FUNCTION mark_modified('papers_seq_seq');
+        DROP TRIGGER IF EXISTS paper_analysis_mark_modified ON paper_analysis;
+        CREATE TRIGGER paper_analysis_mark_modified BEFORE INSERT OR UPDATE ON paper_analysis
+            FOR EACH ROW EXECUTE FUNCTION mark_modified('paper_analysis_seq_seq');
+
+        CREATE INDEX IF NOT EXISTS idx_papers_modified ON papers (modified_xid, seq);
+        CREATE INDEX IF NOT EXISTS idx_paper_analysis_modified ON paper_analysis (modified_xid, seq);
+    """),
+]
+
+_schema_checked = False
+
+
+def _ensure_migrations_table(connection):
+    with connection.cursor() as cursor:
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS schema_migrations (
+                version INTEGER PRIMARY KEY,
+                name TEXT NOT NULL,
+                applied_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                duration_ms REAL
+            );
+        """)
+    connection.commit()
+
+
+def applied_versions(connection):
+    """返回 {版本号: 执行时间}"""
+    _ensure_migrations_table(connection)
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT version, applied_at FROM schema_migrations;")
+        return dict(cursor.fetchall())
+
+
+def migrate(connection, log=print, target=None):
+    """按顺序执行所有未执行的迁移（target不为None时只执行到该版本），每个迁移一个事务，返回本次执行的版本号列表"""
+    _ensure_migrations_table(connection)
+    applied = []
+    for version, name, step in MIGRATIONS:
+        if target is not None and version > target:
+            break
+        with connection.cursor() as cursor:
+            # 拿到锁后再检查一次，其他进程可能刚执行完这个版本
+            cursor.execute("SELECT pg_advisory_xact_lock(%s);", (MIGRATION_LOCK_ID,))
+            cursor.execute("SELECT 1 FROM schema_migrations WHERE version = %s;", (version,))
+            if cursor.fetchone():
+                connection.commit()
+                continue
+
+            log(f"🔧 执行数据库迁移 {version:03d}_{name}")
+            start = time.perf_counter()
+            try:
+                if callable(step):
+                    step(cursor, log)
+                else:
+                    cursor.execute(step)
+                cursor.execute(
+                    "INSERT INTO schema_migrations (version, name, duration_ms) VALUES (%s, %s, %s);",
+                    (version, name, (time.perf_counter() - start) * 1000)
+                )
+                connection.commit()
+            except Exception:
+                connection.rollback()
+                raise
+        applied.append(version)
+    return applied
+
+
+def ensure_schema(log=print):
+    """用共享连接池执行迁移，每个进程只检查一次（机器人、管道和分析器启动时调用）"""
+    global _schema_checked
+    if _schema_checked:
+        return []
+    import db
+    with db.connection() as connection:
+        applied = migrate(connection, log)
+    _schema_checked = True
+    return applied
+
+
+def main():
+    import db
+
+    command = sys.argv[1] if len(sys.argv) > 1 else "migrate"
+    with db.connection() as connection:
+        if command == "migrate":
+            applied = migrate(connection)
+            print(f"✅ 执行了 {len(applied)} 个迁移" if applied else "✅ 数据库结构已是最新")
+        elif command == "status":
+            done = applied_versions(connection)
+            for version, name, _ in MIGRATIONS:
+                state = f"✅ {done[version]:%Y-%m-%d %H:%M:%S}" if version in done else "⏳ 未执行"
+                print(f"   {version:03d}_{name:<28} {state}")
+        else:
+            print(f"❌ 未知命令: {command}（可用: migrate, status）")
+    db.close_pool()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,339 @@
+#!/usr/bin/env python3
+"""
+近似重复论文检测 - MinHash签名 + LSH分桶
+
+每篇论文的标题+摘要切成连续3个词的shingle，用NumPy批量计算NUM_PERM个
+MinHash值（两篇论文签名中相同位置相等的比例≈shingle集合的Jaccard相似度）。
+签名分成BANDS段，每段哈希成一个bigint；任意一段相同的论文才作为候选对，
+再用完整签名估计相似度确认，所以查找某篇论文的近似重复不需要和全部论文比较。
+
+签名和分段哈希保存在paper_minhash表（bands上有GIN索引），
+duplicate_of记录批量去重时该论文所属重复簇中最早入库的论文。
+
+用法:
+    python near_duplicates.py dedupe             # 为缺少签名的论文计算签名，并对全表去重
+    python near_duplicates.py similar <论文id>   # 查询某篇论文的近似重复
+"""
+import sys
+import time
+
+import numpy as np
+
+NUM_PERM = 64
+BANDS = 16
+ROWS = NUM_PERM // BANDS
+SHINGLE_WORDS = 3
+# 估计的Jaccard相似度达到该值视为近似重复
+DEFAULT_THRESHOLD = 0.7
+
+# 词哈希用的多项式基数及其模2^64的逆元（奇数在模2^64下可逆）
+_BASE = np.uint64(0x100000001B3)
+_BASE_INV = np.uint64(pow(int(_BASE), -1, 2 ** 64))
+_rng = np.random.default_rng(20240917)
+# 第k个哈希函数: (a_k * x + b_k) mod 2^32，a_k为奇数，保证是32位整数上的置换
+_PERM_A = (_rng.integers(0, 2 ** 31, NUM_PERM, dtype=np.uint64) * 2 + 1).astype(np.uint32)
+_PERM_B = _rng.integers(0, 2 ** 32, NUM_PERM, dtype=np.uint64).astype(np.uint32)
+_SHINGLE_MULT = _rng.integers(1, 2 ** 63, SHINGLE_WORDS, dtype=np.uint64) | np.uint64(1)
+_BAND_MULT = _rng.integers(1, 2 ** 63, ROWS, dtype=np.uint64) | np.uint64(1)
+_BAND_SALT = _rng.integers(1, 2 ** 63, BANDS, dtype=np.uint64)
+
+# 字节 -> 小写字节，非字母数字的ASCII字节为0（词的分隔符），非ASCII字节原样保留
+_BYTE_MAP = np.zeros(256, dtype=np.uint64)
+for _byte in range(256):
+    _char = chr(_byte)
+    if _byte >= 128 or _char.isalnum():
+        _BYTE_MAP[_byte] = ord(_char.lower()) if _byte < 128 else _byte
+
+
+def _mix64(x):
+    """splitmix64的混合函数，把相近的整数打散成均匀分布的64位哈希"""
+    x = (x ^ (x >> np.uint64(30))) * np.uint64(0xBF58476D1CE4E5B9)
+    x = (x ^ (x >> np.uint64(27))) * np.uint64(0x94D049BB133111EB)
+    return x ^ (x >> np.uint64(31))
+
+
+def paper_text(title, abstract):
+    return f"{title or ''} {abstract or ''}"
+
+
+_power_cache = (np.ones(1, dtype=np.uint64), np.ones(1, dtype=np.uint64))
+
+
+def _powers(length):
+    """BASE和BASE_INV的0..length-1次幂（模2^64），按需扩大并缓存"""
+    global _power_cache
+    if len(_power_cache[0]) < length:
+        size = max(length, 2 * len(_power_cache[0]))
+        _power_cache = tuple(
+            np.cumprod(np.r_[np.uint64(1), np.full(size - 1, base, dtype=np.uint64)])
+            for base in (_BASE, _BASE_INV)
+        )
+    return _power_cache[0][:length], _power_cache[1][:length]
+
+
+def _shingles(texts):
+    """返回 (每个shingle的32位哈希, 每篇文档第一个shingle的下标)，文档之间用\\0分隔"""
+    raw = np.frombuffer('\0'.join(text.replace('\0', ' ') for text in texts).encode('utf-8', 'replace') + b'\0',
+                        dtype=np.uint8)
+    data = _BYTE_MAP[raw]
+    word = data != 0
+    boundary = np.diff(word.astype(np.int8), prepend=np.int8(0), append=np.int8(0))
+    starts, ends = np.flatnonzero(boundary == 1), np.flatnonzero(boundary == -1)
+
+    # 词哈希 = sum(字节 * BASE^位置)，用前缀和一次算出所有词（位置相对词首）
+    powers, inverse = _powers(len(data))
+    prefix = np.zeros(len(data) + 1, dtype=np.uint64)
+    np.cumsum(data * powers, out=prefix[1:])
+    words = _mix64((prefix[ends] - prefix[starts]) * inverse[starts])
+
+    # 每个词属于第几篇文档（文档之间的\0在data中的位置）
+    separators = np.flatnonzero(raw == 0)
+    word_doc = np.searchsorted(separators, starts)
+    count = len(words) - SHINGLE_WORDS + 1
+    if count <= 0:
+        return np.zeros(0, dtype=np.uint32), np.zeros(len(texts) + 1, dtype=np.int64)
+    hashes = np.zeros(count, dtype=np.uint64)
+    for offset in range(SHINGLE_WORDS):
+        hashes += words[offset:offset + count] * _SHINGLE_MULT[offset]
+    # 跨越两篇文档的shingle无效
+    valid = word_doc[:count] == word_doc[SHINGLE_WORDS - 1:]
+    shingle_doc = word_doc[:count][valid]
+    hashes = (_mix64(hashes[valid]) >> np.uint64(32)).astype(np.uint32)
+    offsets = np.searchsorted(shingle_doc, np.arange(len(texts) + 1))
+    return hashes, offsets
+
+
+def signatures(texts, batch_size=2000):
+    """计算MinHash签名，返回uint32数组 (文档数, NUM_PERM)
+
+    没有任何shingle的文档（少于3个词）签名全为0xFFFFFFFF，不会与其他文档匹配。
+    """
+    texts = list(texts)
+    result = np.full((NUM_PERM, len(texts)), 0xFFFFFFFF, dtype=np.uint32)
+    for begin in range(0, len(texts), batch_size):
+        hashes, offsets = _shingles(texts[begin:begin + batch_size])
+        nonempty = np.flatnonzero(offsets[1:] > offsets[:-1])
+        if not len(nonempty):
+            continue
+        # 逐个哈希函数处理一维连续数组，比一次算二维数组快得多
+        permuted = np.empty_like(hashes)
+        for k in range(NUM_PERM):
+            np.multiply(hashes, _PERM_A[k], out=permuted)
+            permuted += _PERM_B[k]
+            result[k, begin + nonempty] = np.minimum.reduceat(permuted, offsets[nonempty])
+    return np.ascontiguousarray(result.T)
+
+
+def band_hashes(sigs):
+    """把签名的每一段（ROWS个值）哈希成一个int64，返回 (文档数, BANDS)"""
+    sigs = np.asarray(sigs, dtype=np.uint32).reshape(len(sigs), BANDS, ROWS).astype(np.uint64)
+    hashes = (sigs * _BAND_MULT).sum(axis=2) + _BAND_SALT
+    return _mix64(hashes).view(np.int64)
+
+
+def similarity(sig, others):
+    """用签名估计一篇论文与其他论文的Jaccard相似度"""
+    return (np.asarray(others) == np.asarray(sig)).mean(axis=-1)
+
+
+def _is_empty(sigs):
+    return (sigs == 0xFFFFFFFF).all(axis=1)
+
+
+def cluster(sigs, threshold=DEFAULT_THRESHOLD):
+    """对签名做LSH聚类，返回每篇文档所属簇中下标最小的文档下标
+
+    输入按入库时间排序时，每个簇的代表就是最早入库的论文。
+    """
+    sigs = np.asarray(sigs, dtype=np.uint32)
+    count = len(sigs)
+    labels = np.arange(count)
+    if count < 2:
+        return labels
+    bands = band_hashes(sigs)
+    empty = _is_empty(sigs)
+
+    # 每一段中哈希相同的文档与该组的第一篇组成候选对
+    pairs = []
+    for band in range(BANDS):
+        keys = bands[:, band]
+        order = np.argsort(keys, kind='stable')
+        order = order[~empty[order]]
+        if len(order) < 2:
+            continue
+        new_group = np.r_[True, keys[order[1:]] != keys[order[:-1]]]
+        first = order[np.flatnonzero(new_group)][np.cumsum(new_group) - 1]
+        pairs.append(np.stack([first[~new_group], order[~new_group]], axis=1))
+    if not pairs:
+        return labels
+    pairs = np.unique(np.concatenate(pairs), axis=0)
+
+    # 用完整签名确认
+    confirmed = np.zeros(len(pairs), dtype=bool)
+    for begin in range(0, len(pairs), 100000):
+        chunk = pairs[begin:begin + 100000]
+        confirmed[begin:begin + 100000] = similarity(sigs[chunk[:, 0]], sigs[chunk[:, 1]]) >= threshold
+    left, right = pairs[confirmed, 0], pairs[confirmed, 1]
+
+    # 连通分量：反复把每条边两端的标签取较小值，直到不再变化
+    while len(left):
+        smaller = np.minimum(labels[left], labels[right])
+        before = labels.copy()
+        np.minimum.at(labels, left, smaller)
+        np.minimum.at(labels, right, smaller)
+        labels = labels[labels]
+        if np.array_equal(labels, before):
+            break
+    return labels
+
+
+def save_signatures(connection, paper_ids, sigs):
+    """写入（或覆盖）论文的签名和分段哈希"""
+    from psycopg2.extras import execute_values
+
+    if not len(paper_ids):
+        return
+    bands = band_hashes(sigs)
+    with connection.cursor() as cursor:
+        execute_values(cursor, """
+            INSERT INTO paper_minhash (paper_id, signature, bands) VALUES %s
+            ON CONFLICT (paper_id) DO UPDATE SET
+                signature = EXCLUDED.signature, bands = EXCLUDED.bands, computed_at = CURRENT_TIMESTAMP;
+        """, [(paper_id, sig.tobytes(), band.tolist()) for paper_id, sig, band in zip(paper_ids, sigs, bands)],
+            page_size=1000)
+    connection.commit()
+
+
+def load_colliding(connection, sigs, exclude_ids=()):
+    """读取与任一签名至少有一段相同的已存论文：(论文id列表, 签名数组)，按入库顺序排列"""
+    empty = _is_empty(np.asarray(sigs, dtype=np.uint32))
+    bands = band_hashes(np.asarray(sigs)[~empty])
+    if not len(bands):
+        return [], np.zeros((0, NUM_PERM), dtype=np.uint32)
+    with connection.cursor() as cursor:
+        cursor.execute("""
+            SELECT m.paper_id, m.signature
+            FROM paper_minhash m
+            JOIN papers p ON p.id = m.paper_id
+            WHERE m.bands && %s::bigint[] AND NOT (m.paper_id = ANY(%s))
+            ORDER BY p.sn;
+        """, (np.unique(bands).tolist(), list(exclude_ids)))
+        rows = cursor.fetchall()
+    return ([paper_id for paper_id, _ in rows],
+            np.frombuffer(b''.join(bytes(sig) for _, sig in rows), dtype=np.uint32).reshape(len(rows), NUM_PERM))
+
+
+def near_duplicates_of(connection, paper_id, threshold=DEFAULT_THRESHOLD):
+    """通过bands的GIN索引查询某篇论文的近似重复：[(论文id, 估计相似度)]"""
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT signature FROM paper_minhash WHERE paper_id = %s;", (paper_id,))
+        row = cursor.fetchone()
+    if row is None:
+        return None
+    sig = np.frombuffer(bytes(row[0]), dtype=np.uint32)
+    ids, others = load_colliding(connection, sig[None, :], exclude_ids=[paper_id])
+    scores = similarity(sig, others) if len(ids) else []
+    return sorted(((other, float(score)) for other, score in zip(ids, scores) if score >= threshold),
+                  key=lambda item: -item[1])
+
+
+def index_missing(chunk_size=None, log=print):
+    """为还没有签名的论文计算并保存签名，返回处理的论文数"""
+    import db
+    from config import DB_POOL_CONFIG
+
+    chunk_size = chunk_size or DB_POOL_CONFIG['itersize']
+    rows = db.stream('minhash_missing', """
+        SELECT p.id, p.title, p.abstract FROM papers p
+        LEFT JOIN paper_minhash m ON m.paper_id = p.id
+        WHERE m.paper_id IS NULL;
+    """)
+    total = 0
+    start = time.perf_counter()
+    chunk = []
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) < chunk_size:
+            continue
+        total += _index_chunk(chunk)
+        chunk = []
+    total += _index_chunk(chunk)
+    if total:
+        log(f"🔏 计算了 {total} 篇论文的MinHash签名（{total / (time.perf_counter() - start):.0f} 篇/秒）")
+    return total
+
+
+def _index_chunk(rows):
+    import db
+
+    if not rows:
+        return 0
+    sigs = signatures(paper_text(title, abstract) for _, title, abstract in rows)
+    with db.connection() as connection, db.timed('save_minhash'):
+        save_signatures(connection, [paper_id for paper_id, _, _ in rows], sigs)
+    return len(rows)
+
+
+def dedupe_all(threshold=DEFAULT_THRESHOLD, log=print):
+    """对全表聚类并写入duplicate_of（簇中最早入库的论文id，代表论文自身为NULL），返回重复论文数"""
+    import db
+
+    ids, parts = [], []
+    start = time.perf_counter()
+    for paper_id, sig in db.stream('minhash_all', """
+            SELECT m.paper_id, m.signature FROM paper_minhash m
+            JOIN papers p ON p.id = m.paper_id ORDER BY p.sn;
+        """):
+        ids.append(paper_id)
+        parts.append(bytes(sig))
+    sigs = np.frombuffer(b''.join(parts), dtype=np.uint32).reshape(len(ids), NUM_PERM)
+    del parts
+    loaded = time.perf_counter()
+
+    labels = cluster(sigs, threshold)
+    clustered = time.perf_counter()
+    duplicates = np.flatnonzero(labels != np.arange(len(labels)))
+    with db.connection() as connection, connection.cursor() as cursor:
+        from psycopg2.extras import execute_values
+        cursor.execute("UPDATE paper_minhash SET duplicate_of = NULL WHERE duplicate_of IS NOT NULL;")
+        execute_values(cursor, """
+            UPDATE paper_minhash m SET duplicate_of = d.representative
+            FROM (VALUES %s) AS d(paper_id, representative)
+            WHERE m.paper_id = d.paper_id;
+        """, [(ids[i], ids[labels[i]]) for i in duplicates], page_size=1000)
+        connection.commit()
+
+    log(f"🧬 {len(ids)} 篇论文，{len(np.unique(labels[duplicates]))} 个重复簇，{len(duplicates)} 篇标记为重复 "
+        f"(读取 {loaded - start:.1f}s，聚类 {clustered - loaded:.1f}s，写入 {time.perf_counter() - clustered:.1f}s)")
+    return len(duplicates)
+
+
+def main():
+    import db
+    import migrations
+
+    migrations.ensure_schema()
+    command = sys.argv[1] if len(sys.argv) > 1 else "dedupe"
+    if command == "dedupe":
+        index_missing()
+        dedupe_all()
+    elif command == "similar" and len(sys.argv) > 2:
+        index_missing()
+        with db.connection() as connection:
+            matches = near_duplicates_of(connection, sys.argv[2])
+            if matches is None:
+                print(f"❌ 没有找到论文 {sys.argv[2]}")
+            elif not matches:
+                print(f"✅ 论文 {sys.argv[2]} 没有近似重复")
+            for other, score in matches or []:
+                with connection.cursor() as cursor:
+                    cursor.execute("SELECT title, url FROM papers WHERE id = %s;", (other,))
+                    title, url = cursor.fetchone()
+                print(f"📄 [{score:.2f}] {other} {title[:80]}\n   🔗 {url}")
+    else:
+        print(f"❌ 未知命令: {' '.join(sys.argv[1:])}（可用: dedupe, similar <论文id>）")
+    db.close_pool()
+
+
+if __name__ == "__main__":
+    main()
@@ -2,10 +2,165 @@
 """
 论文分析工具 - 使用Groq LLM分析数据库中的论文
 """
-import psycopg2
+import itertools
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 from langchain_groq import ChatGroq
-from config import DB_CONFIG, GROQ_CONFIG
+import db
+import migrations
+import paper_search
+from config import DB_POOL_CONFIG, GROQ_CONFIG, LLM_CACHE_CONFIG, VECTOR_INDEX_CONFIG
+from llm_cache import LLMCache
+from analysis_store import load_analyses, save_analyses, top_scored
+from vector_index import VectorIndex
 import json
+from datetime import datetime
+
+# 估算token数时每个token约4个字符，另外预留输出token
+CHARS_PER_TOKEN = 4
+EXPECTED_OUTPUT_TOKENS = 200
+
+# prompt模板版本，修改对应模板时加1，使旧的缓存结果失效
+PROMPT_VERSIONS = {
+    'description': 1,
+    'detailed_analysis': 1,
+    'analyze_abstract': 1,
+    'analyze_batch': 1,
+    'summarize_paper': 1,
+}
+
+# 一条完整分析结果（评分加推文描述和详细分析）的字段及类型
+PAPER_ANALYSIS_SCHEMA = {
+    'relevant': bool,
+    'confidence': str,
+    'relevance_score': int,
+    'analysis': str,
+    'keywords': list,
+    'description': str,
+    'detailed_analysis': str,
+}
+# 只评分（analyze_abstract / analyze_batch）的结果没有描述和详细分析
+SCORE_SCHEMA = {field: expected for field, expected in PAPER_ANALYSIS_SCHEMA.items()
+                if field not in ('description', 'detailed_analysis')}
+# summarize_paper只生成描述和详细分析，评分沿用已有结果
+SUMMARY_SCHEMA = {field: PAPER_ANALYSIS_SCHEMA[field] for field in ('description', 'detailed_analysis')}
+
+# generate_description / generate_detailed_analysis 调用失败时的默认文本
+DEFAULT_DESCRIPTION = "Novel AI agent approach solving key challenges."
+DEFAULT_DETAILED_ANALYSIS = ("• Novel agent architecture\n• Solves key challenges in multi-agent coordination\n"
+                             "• Achieves improved performance over baselines")
+
+# 批量评分时每篇论文预留的输出token数，以及prompt中说明部分的大致token数
+BATCH_OUTPUT_TOKENS_PER_PAPER = 60
+BATCH_INSTRUCTION_TOKENS = 450
+
+# 评分类prompt（analyze_abstract / analyze_batch）共用的Agent论文判定标准，修改后两个模板的版本号都要加1
+AGENT_CRITERIA = """IMPORTANT: Only papers that are DIRECTLY about AI agents should get high scores. Papers that merely mention "agent" in passing or use it in non-AI contexts should get low scores.
+
+TRUE Agent papers include:
+- Multi-agent systems and coordination
+- LLM agents and agentic AI
+- Autonomous agents and planning
+- Agent-based reasoning and decision making
+- Agent frameworks and architectures
+- Conversational agents and chatbots
+- Agent learning and adaptation
+
+NOT Agent papers (should get low scores):
+- Papers that only mention "agent" in citations or related work
+- RAG systems (unless specifically about agentic RAG)
+- General LLM research without agent focus
+- Role-playing or persona research
+- Benchmarking that's not agent-specific
+- Fine-tuning or training methods
+- User agents, web agents, or software agents"""
+
+
+def relevance_prompt(task: str, papers: str, output_format: str) -> str:
+    """组装评分类prompt：任务说明、AGENT_CRITERIA、论文内容、输出格式，最后是严格评分的要求"""
+    return f"""You are an expert AI researcher specializing in Agent systems. {task}
+
+{AGENT_CRITERIA}
+
+{papers}
+
+{output_format}
+
+Be STRICT in your evaluation. Only give scores 8+ for papers that are clearly and primarily about AI agents."""
+
+
+class TokenBucket:
+    """令牌桶：每分钟补充rate_per_minute个令牌，令牌不足时阻塞等待"""
+
+    def __init__(self, rate_per_minute):
+        self.capacity = float(rate_per_minute)
+        self.tokens = float(rate_per_minute)
+        self.rate = rate_per_minute / 60.0
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self, amount=1):
+        amount = min(amount, self.capacity)
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= amount:
+                    self.tokens -= amount
+                    return
+                wait = (amount - self.tokens) / self.rate
+            time.sleep(wait)
+
+
+class RateLimiter:
+    """同时限制每分钟请求数和每分钟token数（<=0表示不限制）"""
+
+    def __init__(self, requests_per_minute, tokens_per_minute):
+        self.requests = TokenBucket(requests_per_minute) if requests_per_minute > 0 else None
+        self.tokens = TokenBucket(tokens_per_minute) if tokens_per_minute > 0 else None
+
+    def acquire(self, prompt):
+        if self.requests:
+            self.requests.acquire(1)
+        if self.tokens:
+            self.tokens.acquire(len(prompt) // CHARS_PER_TOKEN + EXPECTED_OUTPUT_TOKENS)
+
+
+class InvalidResponse(ValueError):
+    """LLM响应无法解析或不符合schema，response为原始响应文本"""
+
+    def __init__(self, response, reason):
+        super().__init__(str(reason))
+        self.response = response
+
+
+def validate_paper_analysis(data, schema=PAPER_ANALYSIS_SCHEMA):
+    """按schema（默认PAPER_ANALYSIS_SCHEMA）校验模型输出，返回只含schema字段的dict，不符合时抛出ValueError"""
+    if not isinstance(data, dict):
+        raise ValueError(f"expected a JSON object, got {type(data).__name__}")
+    result = {}
+    for field, expected in schema.items():
+        value = data.get(field)
+        # 评分允许写成 8.0 或 "8"
+        if expected is int and isinstance(value, (float, str)) and not isinstance(value, bool):
+            try:
+                value = int(float(value))
+            except ValueError:
+                pass
+        if not isinstance(value, expected) or (expected is int and isinstance(value, bool)):
+            raise ValueError(f"field '{field}' should be {expected.__name__}, got {value!r}")
+        result[field] = value
+    if 'relevance_score' in result and not 0 <= result['relevance_score'] <= 10:
+        raise ValueError(f"relevance_score out of range: {result['relevance_score']}")
+    if 'confidence' in result and result['confidence'] not in ('High', 'Medium', 'Low'):
+        raise ValueError(f"unknown confidence: {result['confidence']!r}")
+    if 'description' in result and not result['description'].strip():
+        raise ValueError("empty description")
+    return result
+
 
 class PaperAnalyzer:
     def __init__(self):
@@ -14,35 +169,93 @@ class PaperAnalyzer:
             raise ValueError("❌ Groq API密钥未配置！请在.env文件中设置GROQ_API_KEY")
         
         # 初始化LLM - 对Qwen模型关闭推理过程
+        llm_kwargs = dict(
+            model=GROQ_CONFIG['model'],
+            temperature=0,
+            max_tokens=1000,
+            timeout=60,
+            max_retries=3,
+            api_key=GROQ_CONFIG['api_key']
+        )
         if 'qwen' in GROQ_CONFIG['model'].lower():
-            self.llm = ChatGroq(
-                model=GROQ_CONFIG['model'],
-                temperature=0,
-                max_tokens=1000,
-                timeout=60,
-                max_retries=3,
-                api_key=GROQ_CONFIG['api_key'],
-                extra_body={"reasoning_effort": "none"}
-            )
-        else:
-            self.llm = ChatGroq(
-                model=GROQ_CONFIG['model'],
-                temperature=0,
-                max_tokens=1000,
-                timeout=60,
-                max_retries=3,
-                api_key=GROQ_CONFIG['api_key']
+            llm_kwargs['extra_body'] = {"reasoning_effort": "none"}
+        if GROQ_CONFIG['base_url']:
+            llm_kwargs['base_url'] = GROQ_CONFIG['base_url']
+        self.llm = ChatGroq(**llm_kwargs)
+        
+        # 所有LLM调用共用的限速器
+        self.rate_limiter = RateLimiter(GROQ_CONFIG['requests_per_minute'], GROQ_CONFIG['tokens_per_minute'])
+        
+        # LLM响应缓存
+        self.cache = None
+        if LLM_CACHE_CONFIG['enabled']:
+            self.cache = LLMCache(
+                LLM_CACHE_CONFIG['path'],
+                ttl_days=LLM_CACHE_CONFIG['ttl_days'],
+                max_mb=LLM_CACHE_CONFIG['max_mb']
             )
+
+    def _invoke(self, prompt: str, template: str, parse=None, **kwargs):
+        """调用LLM并返回parse(响应文本)：先查缓存，未命中时经过限速器调用LLM
+
+        parse解析并校验响应（None时直接返回响应文本），失败时抛出InvalidResponse，
+        这样的响应不写入缓存，调用方退回后重新运行会再次调用LLM；
+        缓存中无法解析的旧记录被删除并重新调用。
+        """
+        template = f"{template}:v{PROMPT_VERSIONS[template]}"
+        key = None
+        if self.cache:
+            key = LLMCache.make_key(GROQ_CONFIG['model'], template, prompt)
+            cached = self.cache.get(key)
+            if cached is not None:
+                try:
+                    return parse(cached) if parse else cached
+                except Exception:
+                    self.cache.delete(key)
+
+        self.rate_limiter.acquire(prompt)
+        start = time.monotonic()
+        content = self.llm.invoke(prompt, **kwargs).content
+        latency = time.monotonic() - start
+        try:
+            result = parse(content) if parse else content
+        except Exception as e:
+            raise InvalidResponse(content, e) from e
+        if self.cache:
+            self.cache.put(key, GROQ_CONFIG['model'], template, content, latency)
+        return result
+
+    @staticmethod
+    def _clean_description(description: str) -> str:
+        """清理一句话概括并限制长度"""
+        # 清理引号和多余字符，包括字符计数信息
+        description = description.strip().replace('"', '').replace("'", "").strip()
+        # 移除可能的字符计数信息
+        if "chars)" in description:
+            description = description.split("(")[0].strip()
+        if description.endswith("."):
+            description = description[:-1].strip() + "."
+        # 严格控制描述长度，确保推文不会超限
+        # 最大安全描述长度：280 - 32(链接) - 4(换行) - 20(最小标题) - 3(省略号) = 221字符
+        # 为了更安全，限制在200字符以内
+        max_safe_length = 200
         
-        # 数据库连接
-        self.connection = psycopg2.connect(
-            host=DB_CONFIG['host'],
-            database=DB_CONFIG['database'],
-            user=DB_CONFIG['user'],
-            password=DB_CONFIG['password'],
-            port=DB_CONFIG['port']
-        )
-        self.cursor = self.connection.cursor()
+        if len(description) > max_safe_length:
+            # 截断到安全长度，确保以句号结尾
+            print(f"Warning: Description too long ({len(description)} chars), truncating to {max_safe_length}: {description}")
+            description = description[:max_safe_length-1] + "."
+            
+        return description
+
+    @staticmethod
+    def _clean_detailed_analysis(analysis: str) -> str:
+        """清理详细分析并限制在250字符内"""
+        # 清理引号和多余字符
+        analysis = analysis.strip().replace('"', '').replace("'", "").strip()
+        # 限制长度
+        if len(analysis) > 250:
+            analysis = analysis[:247] + "..."
+        return analysis
 
     def generate_description(self, title: str, abstract: str) -> str:
         """为论文生成非常简短的一句话概括，严格限制在150字符内"""
@@ -65,29 +278,10 @@ Abstract: {abstract}
 Short summary (≤150 chars):"""
 
         try:
-            response = self.llm.invoke(prompt)
-            description = response.content.strip()
-            # 清理引号和多余字符，包括字符计数信息
-            description = description.replace('"', '').replace("'", "").strip()
-            # 移除可能的字符计数信息
-            if "chars)" in description:
-                description = description.split("(")[0].strip()
-            if description.endswith("."):
-                description = description[:-1].strip() + "."
-            # 严格控制描述长度，确保推文不会超限
-            # 最大安全描述长度：280 - 32(链接) - 4(换行) - 20(最小标题) - 3(省略号) = 221字符
-            # 为了更安全，限制在200字符以内
-            max_safe_length = 200
-            
-            if len(description) > max_safe_length:
-                # 截断到安全长度，确保以句号结尾
-                print(f"Warning: Description too long ({len(description)} chars), truncating to {max_safe_length}: {description}")
-                description = description[:max_safe_length-1] + "."
-                
-            return description
+            return self._clean_description(self._invoke(prompt, 'description'))
         except Exception as e:
             # 如果API调用失败，返回默认描述（也要控制长度）
-            return "Novel AI agent approach solving key challenges."
+            return DEFAULT_DESCRIPTION
 
     def generate_detailed_analysis(self, title: str, abstract: str) -> str:
         """为论文生成详细分析（用于Twitter线程第二条推文）"""
@@ -105,111 +299,350 @@ Abstract: {abstract}
 Analysis:"""
 
         try:
-            response = self.llm.invoke(prompt)
-            analysis = response.content.strip()
-            # 清理引号和多余字符
-            analysis = analysis.replace('"', '').replace("'", "").strip()
-            # 限制长度
-            if len(analysis) > 250:
-                analysis = analysis[:247] + "..."
-            return analysis
+            return self._clean_detailed_analysis(self._invoke(prompt, 'detailed_analysis'))
         except Exception as e:
             # 如果API调用失败，返回默认分析
-            return "• Novel agent architecture\n• Solves key challenges in multi-agent coordination\n• Achieves improved performance over baselines"
+            return DEFAULT_DETAILED_ANALYSIS
 
     def analyze_abstract(self, abstract: str, topic: str = "Agent Systems") -> dict:
         """分析论文摘要与Agent系统的相关性"""
-        prompt = f"""You are an expert AI researcher specializing in Agent systems. Analyze if this research paper is SPECIFICALLY about AI Agents, Multi-Agent Systems, or Agentic AI.
-
-IMPORTANT: Only papers that are DIRECTLY about AI agents should get high scores. Papers that merely mention "agent" in passing or use it in non-AI contexts should get low scores.
-
-TRUE Agent papers include:
-- Multi-agent systems and coordination
-- LLM agents and agentic AI
-- Autonomous agents and planning
-- Agent-based reasoning and decision making
-- Agent frameworks and architectures
-- Conversational agents and chatbots
-- Agent learning and adaptation
-
-NOT Agent papers (should get low scores):
-- Papers that only mention "agent" in citations or related work
-- RAG systems (unless specifically about agentic RAG)
-- General LLM research without agent focus
-- Role-playing or persona research
-- Benchmarking that's not agent-specific
-- Fine-tuning or training methods
-- User agents, web agents, or software agents
-
-Abstract: {abstract}
-
-Please provide a structured analysis in the following JSON format:
-{{
+        prompt = relevance_prompt(
+            "Analyze if this research paper is SPECIFICALLY about AI Agents, Multi-Agent Systems, or Agentic AI.",
+            f"Abstract: {abstract}",
+            """Please provide a structured analysis in the following JSON format:
+{
     "relevant": true/false,
     "confidence": "High/Medium/Low",
     "relevance_score": 0-10,
     "analysis": "Brief explanation of why it is or isn't a true Agent paper",
     "keywords": ["key", "agent", "words", "found"]
-}}
+}"""
+        )
 
-Be STRICT in your evaluation. Only give scores 8+ for papers that are clearly and primarily about AI agents."""
+        def parse(response):
+            # 提取JSON部分
+            content = response.strip()
+            if content.startswith('```json'):
+                content = content[7:-3]
+            elif content.startswith('```'):
+                content = content[3:-3]
+            return validate_paper_analysis(json.loads(content), SCORE_SCHEMA)
 
         try:
-            response = self.llm.invoke(prompt)
-            # 尝试解析JSON响应
-            try:
-                # 提取JSON部分
-                content = response.content.strip()
-                if content.startswith('```json'):
-                    content = content[7:-3]
-                elif content.startswith('```'):
-                    content = content[3:-3]
-                
-                result = json.loads(content)
-                return result
-            except json.JSONDecodeError:
-                # 如果JSON解析失败，返回基本结构
-                return {
-                    "relevant": "yes" in response.content.lower() or "true" in response.content.lower(),
-                    "confidence": "Medium",
-                    "relevance_score": 5,
-                    "analysis": response.content[:200] + "...",
-                    "keywords": []
-                }
+            return self._invoke(prompt, 'analyze_abstract', parse)
+        except InvalidResponse as e:
+            # 如果JSON解析或校验失败，返回基本结构；评分是猜测的，不写入paper_analysis
+            response = e.response
+            return {
+                "relevant": "yes" in response.lower() or "true" in response.lower(),
+                "confidence": "Medium",
+                "relevance_score": 5,
+                "analysis": response[:200] + "...",
+                "keywords": [],
+                "error": True
+            }
         except Exception as e:
             return {
                 "relevant": False,
                 "confidence": "Low",
                 "relevance_score": 0,
                 "analysis": f"Error analyzing: {str(e)}",
-                "keywords": []
+                "keywords": [],
+                # 调用失败的结果不写入paper_analysis
+                "error": True
+            }
+
+    def summarize_paper(self, title: str, abstract: str) -> dict:
+        """一次LLM调用同时得到一句话概括和详细分析：{'description': ..., 'detailed_analysis': ...}
+
+        用于已经评过分的入选论文，不再重复评分。模型输出按SUMMARY_SCHEMA校验，
+        不符合时退回为generate_description和generate_detailed_analysis两次单独调用。
+        """
+        prompt = f"""Summarize this AI agent research paper.
+
+Title: {title}
+Abstract: {abstract}
+
+Return ONLY a JSON object in the following format:
+{{
+    "description": "ONE very short sentence (max 150 characters) with the key method and main contribution, e.g. Uses multi-agent RL for task allocation.",
+    "detailed_analysis": "Bullet points with the • symbol covering methods, problems solved, key contributions and results, max 250 characters total"
+}}"""
+
+        def parse(response):
+            content = response.strip()
+            if content.startswith('```'):
+                content = content.split('\n', 1)[1].rsplit('```', 1)[0]
+            return validate_paper_analysis(json.loads(content), SUMMARY_SCHEMA)
+
+        try:
+            result = self._invoke(prompt, 'summarize_paper', parse, response_format={"type": "json_object"})
+            result['description'] = self._clean_description(result['description'])
+            result['detailed_analysis'] = self._clean_detailed_analysis(result['detailed_analysis'])
+            return result
+        except Exception as e:
+            print(f"Warning: structured summary failed ({e}), falling back to separate calls")
+            result = {
+                'description': self.generate_description(title, abstract),
+                'detailed_analysis': self.generate_detailed_analysis(title, abstract),
             }
+            # 任一单独调用失败（默认文本）时整个结果不写入paper_analysis
+            if result['description'] == DEFAULT_DESCRIPTION or result['detailed_analysis'] == DEFAULT_DETAILED_ANALYSIS:
+                result['error'] = True
+            return result
+
+    def summarize_papers(self, papers, max_concurrency: int = None):
+        """并发对多篇 (标题, 摘要) 调用summarize_paper，按输入顺序逐个返回结果"""
+        max_concurrency = max_concurrency or GROQ_CONFIG['max_concurrency']
+        with ThreadPoolExecutor(max_workers=max_concurrency) as executor:
+            pending = deque()
+            for title, abstract in papers:
+                pending.append(executor.submit(self.summarize_paper, title, abstract))
+                if len(pending) >= max_concurrency:
+                    yield pending.popleft().result()
+            while pending:
+                yield pending.popleft().result()
+
+    def analyze_batch(self, abstracts: list, topic: str = "Agent Systems") -> list:
+        """在一次LLM请求中为多篇摘要评分，返回与输入顺序一致的结果列表
+
+        结果字段与analyze_abstract相同。批量输出无法解析时逐篇调用analyze_abstract，
+        只缺少部分论文的结果时只对缺少的论文逐篇调用。
+        """
+        if len(abstracts) == 1:
+            return [self.analyze_abstract(abstracts[0], topic)]
+
+        papers = "\n\n".join(f'<paper id="{i}">\n{abstract}\n</paper>' for i, abstract in enumerate(abstracts, 1))
+        prompt = relevance_prompt(
+            "For EACH paper below, decide if it is SPECIFICALLY about AI Agents, Multi-Agent Systems, or Agentic AI.",
+            papers,
+            """Return ONLY a JSON array with one entry per paper, in the same order, in the following format:
+[
+    {"id": 1, "relevant": true/false, "confidence": "High/Medium/Low", "relevance_score": 0-10, "keywords": ["key", "agent", "words"]}
+]"""
+        )
+
+        def parse(response):
+            content = response.strip()
+            if content.startswith('```'):
+                content = content.split('\n', 1)[1].rsplit('```', 1)[0]
+            entries = json.loads(content)
+            if not isinstance(entries, list):
+                raise ValueError(f"expected a JSON array, got {type(entries).__name__}")
+            return entries
+
+        results = [None] * len(abstracts)
+        try:
+            entries = self._invoke(
+                prompt, 'analyze_batch', parse,
+                max_tokens=len(abstracts) * BATCH_OUTPUT_TOKENS_PER_PAPER + 100
+            )
+            for entry in entries:
+                # 单篇结果不符合SCORE_SCHEMA（包括缺少confidence）时跳过，后面对这篇逐篇调用
+                try:
+                    index = int(entry['id']) - 1
+                    result = validate_paper_analysis({"keywords": [], **entry, "analysis": ""}, SCORE_SCHEMA)
+                except (TypeError, KeyError, ValueError):
+                    continue
+                if 0 <= index < len(abstracts) and results[index] is None:
+                    results[index] = result
+        except Exception as e:
+            print(f"Warning: batch scoring of {len(abstracts)} abstracts failed ({e}), falling back to single calls")
+
+        for index, result in enumerate(results):
+            if result is None:
+                results[index] = self.analyze_abstract(abstracts[index], topic)
+        return results
+
+    def _batches(self, abstracts, batch_size: int):
+        """把摘要分组：每组不超过batch_size篇，且prompt加输出不超过模型上下文长度"""
+        budget = GROQ_CONFIG['context_tokens'] - BATCH_INSTRUCTION_TOKENS - 100
+        batch, used = [], 0
+        for abstract in abstracts:
+            cost = len(abstract) // CHARS_PER_TOKEN + 10 + BATCH_OUTPUT_TOKENS_PER_PAPER
+            if batch and (len(batch) >= batch_size or used + cost > budget):
+                yield batch
+                batch, used = [], 0
+            batch.append(abstract)
+            used += cost
+        if batch:
+            yield batch
+
+    def analyze_many(self, abstracts, topic: str = "Agent Systems", max_concurrency: int = None,
+                     batch_size: int = None):
+        """并发分析多篇摘要，按输入顺序逐个返回结果
+
+        batch_size>1时（默认GROQ_CONFIG['batch_size']）每次请求打包多篇摘要
+        （analyze_batch），每批的篇数还受模型上下文长度限制；batch_size=1时逐篇分析。
+        最多同时进行max_concurrency个请求（默认GROQ_CONFIG['max_concurrency']），
+        请求速率受每分钟请求数/token数限制。abstracts可以是任意可迭代对象，
+        只会提前读取max_concurrency个请求所需的元素。
+        """
+        max_concurrency = max_concurrency or GROQ_CONFIG['max_concurrency']
+        batch_size = max(1, GROQ_CONFIG['batch_size'] if batch_size is None else batch_size)
+        with ThreadPoolExecutor(max_workers=max_concurrency) as executor:
+            pending = deque()
+            for batch in self._batches(abstracts, batch_size):
+                pending.append(executor.submit(self.analyze_batch, batch, topic))
+                if len(pending) >= max_concurrency:
+                    yield from pending.popleft().result()
+            while pending:
+                yield from pending.popleft().result()
 
-    def analyze_recent_papers(self, limit: int = 10, topic: str = "Carbon Emission"):
-        """分析最近的论文"""
-        print(f"🔍 分析最近的 {limit} 篇论文，主题: {topic}")
+    @staticmethod
+    def score_version() -> str:
+        """逐篇和批量评分的结果存在同一版本下，任一模板修改都会使已存结果失效"""
+        return f"score:v{PROMPT_VERSIONS['analyze_abstract']}.{PROMPT_VERSIONS['analyze_batch']}"
+
+    @staticmethod
+    def detail_version() -> str:
+        """描述沿用评分结果，评分或描述模板修改都会使已存结果失效"""
+        return f"{PaperAnalyzer.score_version()}+summary:v{PROMPT_VERSIONS['summarize_paper']}"
+
+    def _stored_stream(self, prompt_version: str, items, key, analyze, chunk_size: int = None,
+                       propensities=None):
+        """先读paper_analysis，只把缺少结果的论文交给analyze，新结果写回表中
+
+        key(item)返回 (论文id, added_at, analyze的输入)，analyze接收输入列表并按顺序返回结果。
+        items按chunk_size篇一组处理（None表示全部作为一组），每组读取已有结果、分析缺少的论文、
+        保存后立即按输入顺序返回 (item, 分析结果)，items可以是数据库游标这样的流。
+        propensities: {论文id: 被送入LLM的概率}，随新结果一起保存（预排序的探索样本）。
+        """
+        items = iter(items)
+        model = GROQ_CONFIG['model']
+        stored_count = analyzed_count = 0
+        while True:
+            chunk = list(itertools.islice(items, chunk_size))
+            if not chunk:
+                break
+            papers = [key(item) for item in chunk]
+            with db.connection() as connection:
+                results = load_analyses(connection, [paper_id for paper_id, _, _ in papers], model, prompt_version)
+            missing = [paper for paper in papers if paper[0] not in results]
+            stored_count += len(papers) - len(missing)
+            analyzed_count += len(missing)
+
+            if missing:
+                start = time.monotonic()
+                analyses = list(analyze([arg for _, _, arg in missing]))
+                latency = (time.monotonic() - start) / len(missing)
+                rows = []
+                for (paper_id, added_at, _), analysis in zip(missing, analyses):
+                    if propensities and paper_id in propensities:
+                        analysis['propensity'] = propensities[paper_id]
+                    results[paper_id] = analysis
+                    if not analysis.get('error'):
+                        rows.append((paper_id, added_at, analysis, latency))
+                # 保存失败不影响本次运行，结果照常返回，下次运行时重新分析
+                try:
+                    with db.connection() as connection, db.timed('save_analyses'):
+                        failed = save_analyses(connection, rows, model, prompt_version)
+                except Exception as e:
+                    failed = [paper_id for paper_id, _, _, _ in rows]
+                    print(f"Warning: saving {len(rows)} analyses failed ({e})")
+                if failed:
+                    print(f"⚠️  {len(failed)} 篇论文的分析结果未能保存: {', '.join(failed)}")
+
+            for item, (paper_id, _, _) in zip(chunk, papers):
+                yield item, results[paper_id]
+
+        print(f"📦 {stored_count} 篇论文已有分析结果，{analyzed_count} 篇调用了LLM ({prompt_version})")
+
+    def _stored(self, prompt_version: str, papers, analyze, propensities=None) -> list:
+        """papers: [(论文id, added_at, analyze的输入)]，返回与papers顺序一致的结果列表"""
+        return [result for _, result in self._stored_stream(
+            prompt_version, papers, lambda paper: paper, analyze, propensities=propensities
+        )]
+
+    def score_papers(self, papers, topic: str = "Agent Systems", propensities=None) -> list:
+        """为 (论文id, 摘要, added_at) 评分，已存结果直接使用，其余走analyze_many
+
+        propensities: {论文id: 被送入LLM的概率}，预排序的探索样本随评分一起保存。
+        """
+        return self._stored(
+            self.score_version(),
+            ((paper_id, added_at, abstract) for paper_id, abstract, added_at in papers),
+            lambda abstracts: self.analyze_many(abstracts, topic),
+            propensities
+        )
+
+    def stream_scores(self, papers, topic: str = "Agent Systems", chunk_size: int = None):
+        """为Paper流式评分，按输入顺序逐个返回 (Paper, 分析结果)
+
+        每读到chunk_size篇（默认DB_POOL_CONFIG['itersize']）就开始评分，不需要先读完全部论文。
+        """
+        return self._stored_stream(
+            self.score_version(), papers,
+            lambda paper: (paper.id, paper.added_at, paper.abstract),
+            lambda abstracts: self.analyze_many(abstracts, topic),
+            chunk_size or DB_POOL_CONFIG['itersize']
+        )
+
+    def detail_papers(self, papers) -> list:
+        """为已评分的 (论文id, 标题, 摘要, added_at, 评分结果) 补充描述和详细分析
+
+        评分直接沿用score_papers的结果，LLM只生成描述和详细分析（summarize_paper，每篇一次调用）；
+        返回评分结果加上description和detailed_analysis，已存结果直接使用。
+        """
+        def analyze(inputs):
+            summaries = self.summarize_papers((title, abstract) for title, abstract, _ in inputs)
+            return ({**score, **summary} for (_, _, score), summary in zip(inputs, summaries))
+
+        return self._stored(
+            self.detail_version(),
+            ((paper_id, added_at, (title, abstract, score)) for paper_id, title, abstract, added_at, score in papers),
+            analyze
+        )
+
+    def top_papers(self, added_at, limit: int = 10):
+        """某天评分最高的N篇论文（当前模型和评分prompt版本）"""
+        with db.connection() as connection:
+            return top_scored(connection, added_at, GROQ_CONFIG['model'], self.score_version(), limit)
+
+    @staticmethod
+    def _semantic_candidates(topic: str, limit: int, category: str = None):
+        """向量索引中与主题最相近的limit篇论文，索引不存在时返回None"""
+        path = VECTOR_INDEX_CONFIG['path']
+        if not VectorIndex.exists(path):
+            print(f"⚠️  向量索引 {path} 不存在（python vector_index.py build），改为分析最近的论文")
+            return None
+        print(f"🧭 从向量索引中选出与 '{topic}' 语义最相近的 {limit} 篇论文")
+        ids = [paper_id for paper_id, _ in VectorIndex(path).topic(topic, limit, category)]
+        return db.get_papers_by_ids(ids)
+
+    def analyze_recent_papers(self, limit: int = 10, topic: str = "Carbon Emission", select: str = "recent"):
+        """分析最近的论文
+
+        select决定交给LLM的limit篇候选论文：'recent'为最近入库的，'search'为全文检索与主题
+        最匹配的，'semantic'为向量索引中与主题语义最相近的（索引不存在时退回'recent'）。
+        """
+        papers = self._semantic_candidates(topic, limit) if select == "semantic" else None
+        if select == "search":
+            print(f"🔍 全文检索与 '{topic}' 最匹配的 {limit} 篇论文并分析")
+            papers = [result.paper for result in paper_search.search(topic, limit=limit, match_any=True)]
+            print(f"📊 检索到 {len(papers)} 篇候选论文")
+        elif papers is None:
+            print(f"🔍 分析最近的 {limit} 篇论文，主题: {topic}")
+            papers = db.get_recent_papers(limit)
         print("=" * 80)
-        
-        # 获取最近的论文
-        self.cursor.execute("""
-            SELECT id, title, abstract, category, authors, url
-            FROM papers 
-            ORDER BY sn DESC 
-            LIMIT %s;
-        """, (limit,))
-        
-        papers = self.cursor.fetchall()
+        limit = len(papers)
         relevant_papers = []
         
-        for i, (paper_id, title, abstract, category, authors, url) in enumerate(papers, 1):
+        # 已有结果直接读取，其余论文并发评分
+        candidates = [paper for paper in papers if paper.abstract and len(paper.abstract.strip()) >= 50]
+        analyses = dict(zip(
+            (paper.id for paper in candidates),
+            self.score_papers(((paper.id, paper.abstract, paper.added_at) for paper in candidates), topic)
+        ))
+        
+        for i, (paper_id, category, title, authors, abstract, url, added_at) in enumerate(papers, 1):
             print(f"\n📄 [{i}/{limit}] 分析论文: {title[:60]}...")
             
-            if not abstract or len(abstract.strip()) < 50:
+            if paper_id not in analyses:
                 print("   ⚠️  摘要太短，跳过分析")
                 continue
             
-            # 分析论文
-            analysis = self.analyze_abstract(abstract, topic)
+            analysis = analyses[paper_id]
             
             print(f"   🎯 相关性: {'✅ 相关' if analysis['relevant'] else '❌ 不相关'}")
             print(f"   📊 置信度: {analysis['confidence']}")
@@ -240,33 +673,34 @@ Be STRICT in your evaluation. Only give scores 8+ for papers that are clearly an
         else:
             print(f"\n😔 没有找到与 '{topic}' 高度相关的论文")
 
-    def analyze_by_category(self, category: str, topic: str = "Carbon Emission"):
-        """按分类分析论文"""
+    def analyze_by_category(self, category: str, topic: str = "Carbon Emission", select: str = "recent"):
+        """按分类分析论文
+
+        select为'search'时只把全文检索命中主题任一检索词的论文交给LLM，为'semantic'时
+        只交给向量索引中与主题最相近的VECTOR_INDEX_CONFIG['candidates']篇，默认分析分类中的全部论文。
+        """
         print(f"🔍 分析 '{category}' 分类中与 '{topic}' 相关的论文")
         print("=" * 80)
         
-        self.cursor.execute("""
-            SELECT id, title, abstract, authors, url
-            FROM papers 
-            WHERE category = %s
-            ORDER BY sn DESC;
-        """, (category,))
-        
-        papers = self.cursor.fetchall()
-        
-        if not papers:
-            print(f"❌ 没有找到 '{category}' 分类的论文")
-            return
-        
-        print(f"📊 找到 {len(papers)} 篇 '{category}' 分类的论文")
+        # 服务器端游标逐批读取，读到第一批就开始评分
+        total = 0
+        papers = (self._semantic_candidates(topic, VECTOR_INDEX_CONFIG['candidates'], category)
+                  if select == "semantic" else None)
+        if select == "search":
+            papers = (result.paper for result in paper_search.search(topic, category=category, limit=None, match_any=True))
+        elif papers is None:
+            select = "recent"
+            papers = db.iter_papers_by_category(category)
+
+        def candidates():
+            nonlocal total
+            for paper in papers:
+                total += 1
+                if paper.abstract and len(paper.abstract.strip()) >= 50:
+                    yield paper
         
         relevant_count = 0
-        for paper_id, title, abstract, authors, url in papers:
-            if not abstract or len(abstract.strip()) < 50:
-                continue
-                
-            analysis = self.analyze_abstract(abstract, topic)
-            
+        for (paper_id, _, title, authors, abstract, url, added_at), analysis in self.stream_scores(candidates(), topic):
             if analysis['relevant'] and analysis['relevance_score'] >= 7:
                 relevant_count += 1
                 print(f"\n✅ 相关论文 #{relevant_count}:")
@@ -276,47 +710,80 @@ Be STRICT in your evaluation. Only give scores 8+ for papers that are clearly an
                 print(f"   💭 分析: {analysis['analysis'][:150]}...")
                 print(f"   🔗 链接: {url}")
         
-        print(f"\n📈 总结: 在 {len(papers)} 篇 '{category}' 论文中，找到 {relevant_count} 篇与 '{topic}' 相关")
+        scope = {"search": f"'{category}' 分类中检索到的", "semantic": f"'{category}' 分类中语义相近的"}.get(
+            select, f"'{category}'")
+        if not total:
+            print(f"❌ 没有找到{scope}论文")
+            return
+        
+        print(f"\n📈 总结: 在 {total} 篇{scope}论文中，找到 {relevant_count} 篇与 '{topic}' 相关")
 
     def close(self):
-        """关闭数据库连接"""
-        self.cursor.close()
-        self.connection.close()
+        """关闭缓存（数据库连接归共享连接池管理）"""
+        if self.cache:
+            self.cache.close()
+            self.cache = None
+
+def choose_candidates():
+    """交互式选择候选论文的筛选方式"""
+    choice = input("候选论文: 1. 不筛选  2. 全文检索  3. 向量索引语义相近 (默认1): ").strip()
+    return {"2": "search", "3": "semantic"}.get(choice, "recent")
+
 
 def main():
     """主函数"""
     try:
         analyzer = PaperAnalyzer()
+        migrations.ensure_schema()
         
         print("🤖 论文分析工具")
         print("选择分析模式:")
         print("1. 分析最近的论文")
         print("2. 按分类分析论文")
-        print("3. 退出")
+        print("3. 查看某天评分最高的论文")
+        print("4. 退出")
         
-        choice = input("\n请选择 (1-3): ").strip()
+        choice = input("\n请选择 (1-4): ").strip()
         
         if choice == "1":
             limit = int(input("分析多少篇最近的论文? (默认10): ") or "10")
             topic = input("分析主题 (默认: Carbon Emission): ").strip() or "Carbon Emission"
-            analyzer.analyze_recent_papers(limit, topic)
+            select = choose_candidates()
+            analyzer.analyze_recent_papers(limit, topic, select)
             
         elif choice == "2":
             # 显示可用分类
-            analyzer.cursor.execute("SELECT DISTINCT category FROM papers ORDER BY category;")
-            categories = [row[0] for row in analyzer.cursor.fetchall()]
+            categories = db.list_categories()
             print(f"可用分类: {', '.join(categories)}")
             
             category = input("选择分类: ").strip()
             topic = input("分析主题 (默认: Carbon Emission): ").strip() or "Carbon Emission"
-            analyzer.analyze_by_category(category, topic)
+            select = choose_candidates()
+            analyzer.analyze_by_category(category, topic, select)
             
         elif choice == "3":
+            added_at = input("日期 (YYYY-MM-DD，默认今天): ").strip() or datetime.now().strftime('%Y-%m-%d')
+            limit = int(input("显示多少篇? (默认10): ") or "10")
+            rows = analyzer.top_papers(added_at, limit)
+            if not rows:
+                print(f"😔 {added_at} 没有已评分的论文")
+            for paper_id, score, description, title, url in rows:
+                print(f"📊 [{score}/10] {title}")
+                if description:
+                    print(f"   📝 {description}")
+                print(f"   🔗 {url}")
+            
+        elif choice == "4":
             print("👋 再见!")
         else:
             print("❌ 无效选择")
         
+        if analyzer.cache:
+            print(f"🗃️ LLM缓存: {analyzer.cache.summary()}")
         analyzer.close()
+        for line in db.format_query_stats():
+            print(f"🗄️ {line}")
+        db.close_pool()
         
     except ValueError as e:
         print(str(e))
@@ -0,0 +1,323 @@
+#!/usr/bin/env python3
+"""
+论文和分析结果的列式导出 - 按月分目录的Arrow/Parquet文件，以及内存映射的读取接口
+
+导出是增量的：两个表都按 (modified_xid, seq) 记录水位线（_state.json，见db.CHANGED_AFTER），
+每次只导出新增或修改过的行（论文更新版本、分析结果被覆盖时seq会变大，也会重新导出，
+读取时按键只保留最新的一条）。文件按论文的added_at月份分目录，以第一行的 (modified_xid, seq) 命名:
+
+    export/papers/month=2026-10/part-000000000000_000000012345.arrow
+    export/analysis/month=2026-10/part-000000004321_000000000678.arrow
+
+默认格式是未压缩的Arrow IPC文件，读取时用内存映射，列数据直接引用映射的页，
+不经过Python对象，也不复制；只访问到的列和月份才会被读入内存。
+EXPORT_FORMAT=parquet时写压缩的Parquet，文件更小但读取时需要解码。
+
+用法:
+    python paper_export.py                       # 增量导出
+    python paper_export.py status                # 每个表的文件数、行数和大小
+    python paper_export.py categories [起始日期] [结束日期]
+    python paper_export.py scores [起始日期] [结束日期]
+"""
+import glob
+import json
+import os
+import sys
+import time
+from datetime import date
+
+import numpy as np
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.parquet as pq
+
+from config import EXPORT_CONFIG
+
+# sql按schema的列顺序返回，最后多一列modified_xid用于水位线，不写入文件；{changed_after}替换为db.CHANGED_AFTER
+TABLES = {
+    'papers': {
+        'sql': """
+            SELECT id, sn, category, categories, version, title, authors, abstract, url, added_at, created_at,
+                   seq, modified_xid
+            FROM papers WHERE {changed_after};
+        """,
+        'schema': pa.schema([
+            ('id', pa.string()), ('sn', pa.int64()), ('category', pa.string()), ('categories', pa.string()),
+            ('version', pa.int32()), ('title', pa.string()), ('authors', pa.string()),
+            ('abstract', pa.string()), ('url', pa.string()), ('added_at', pa.date32()),
+            ('created_at', pa.timestamp('us')), ('seq', pa.int64()),
+        ]),
+        # 论文更新版本后会导出多次，读取时保留seq最大的一条
+        'unique': ('id',),
+        # 加入seq之前导出的文件没有这一列，迁移时seq取的就是sn
+        'legacy': {'seq': 'sn'},
+    },
+    'analysis': {
+        'sql': """
+            SELECT paper_id, model, prompt_version, coalesce(added_at, analyzed_at::date), relevant, confidence,
+                   relevance_score, analysis, keywords, description, detailed_analysis, latency, analyzed_at, seq,
+                   propensity, modified_xid
+            FROM paper_analysis WHERE {changed_after};
+        """,
+        'schema': pa.schema([
+            ('paper_id', pa.string()), ('model', pa.string()), ('prompt_version', pa.string()),
+            ('added_at', pa.date32()), ('relevant', pa.bool_()), ('confidence', pa.string()),
+            ('relevance_score', pa.int16()), ('analysis', pa.string()), ('keywords', pa.list_(pa.string())),
+            ('description', pa.string()), ('detailed_analysis', pa.string()), ('latency', pa.float32()),
+            ('analyzed_at', pa.timestamp('us')), ('seq', pa.int64()), ('propensity', pa.float32()),
+        ]),
+        # 同一键被重新分析后会导出多次，读取时保留seq最大的一条
+        'unique': ('paper_id', 'model', 'prompt_version'),
+    },
+}
+EXTENSIONS = {'arrow': '.arrow', 'parquet': '.parquet'}
+
+
+def _load_state(path):
+    """{表名: [modified_xid, seq]}；旧版本只记录sn/seq，迁移时已有行的modified_xid为0，seq不变"""
+    try:
+        with open(os.path.join(path, '_state.json'), encoding='utf-8') as f:
+            state = json.load(f)
+    except FileNotFoundError:
+        state = {}
+    return {table: [0, state[table]] if isinstance(state.get(table), int) else state.get(table, [0, 0])
+            for table in TABLES}
+
+
+def _save_state(path, state):
+    temporary = os.path.join(path, '_state.json.tmp')
+    with open(temporary, 'w', encoding='utf-8') as f:
+        json.dump(state, f)
+    os.replace(temporary, os.path.join(path, '_state.json'))
+
+
+def _parts(path, table):
+    """[(文件路径, 月份字符串, 文件中第一行的 [modified_xid, seq])]"""
+    parts = []
+    for file in glob.glob(os.path.join(path, table, 'month=*', 'part-*')):
+        if file.endswith('.tmp'):
+            continue
+        month = os.path.basename(os.path.dirname(file))[len('month='):]
+        # 旧版本的文件名只有sn/seq，对应modified_xid为0
+        first_key = [int(value) for value in os.path.basename(file)[len('part-'):].split('.')[0].split('_')]
+        parts.append((file, month, [0] * (2 - len(first_key)) + first_key))
+    return sorted(parts, key=lambda part: (part[1], part[2]))
+
+
+def _key(row, table):
+    """导出查询返回的一行的 [modified_xid, seq]"""
+    return [row[-1], row[TABLES[table]['schema'].get_field_index('seq')]]
+
+
+def _write(path, table, rows, file_format):
+    """把一批行按月份写成文件（每个月一个文件，以该月第一行的 (modified_xid, seq) 命名）"""
+    schema = TABLES[table]['schema']
+    month_index = schema.get_field_index('added_at')
+    by_month = {}
+    for row in rows:
+        by_month.setdefault(row[month_index].strftime('%Y-%m'), []).append(row)
+    for month, month_rows in by_month.items():
+        columns = list(zip(*month_rows))[:len(schema)]
+        batch = pa.Table.from_arrays([pa.array(column, type=field.type) for column, field in zip(columns, schema)],
+                                     schema=schema)
+        directory = os.path.join(path, table, f"month={month}")
+        os.makedirs(directory, exist_ok=True)
+        xid, seq = _key(month_rows[0], table)
+        file = os.path.join(directory, f"part-{xid:012d}_{seq:012d}{EXTENSIONS[file_format]}")
+        if file_format == 'parquet':
+            pq.write_table(batch, file + '.tmp', compression='zstd')
+        else:
+            with pa.OSFile(file + '.tmp', 'wb') as sink, pa.ipc.new_file(sink, schema) as writer:
+                writer.write_table(batch)
+        os.replace(file + '.tmp', file)
+
+
+def export(path=None, file_format=None, batch_rows=None, log=print):
+    """把水位线之后的papers和paper_analysis行追加导出，返回 {表名: 导出行数}"""
+    import db
+
+    path = path or EXPORT_CONFIG['path']
+    file_format = file_format or EXPORT_CONFIG['format']
+    batch_rows = batch_rows or EXPORT_CONFIG['batch_rows']
+    if file_format not in EXTENSIONS:
+        raise ValueError(f"未知的导出格式: {file_format}（可用: {', '.join(EXTENSIONS)}）")
+    os.makedirs(path, exist_ok=True)
+    state = _load_state(path)
+    exported = {}
+    for table, spec in TABLES.items():
+        start = time.perf_counter()
+        # 上次导出中途失败时，水位线之后可能有已写入的文件，先删除再重新导出
+        for file, _, first_key in _parts(path, table):
+            if first_key > state[table]:
+                os.remove(file)
+
+        count, rows = 0, []
+        sql = spec['sql'].format(changed_after=db.CHANGED_AFTER)
+        for row in db.stream(f'export_{table}', sql, tuple(state[table])):
+            rows.append(row)
+            if len(rows) >= batch_rows:
+                _write(path, table, rows, file_format)
+                state[table] = _key(rows[-1], table)
+                _save_state(path, state)
+                count += len(rows)
+                rows = []
+        if rows:
+            _write(path, table, rows, file_format)
+            state[table] = _key(rows[-1], table)
+            _save_state(path, state)
+            count += len(rows)
+        exported[table] = count
+        if count:
+            log(f"🗃️ 导出 {table} {count} 行 ({time.perf_counter() - start:.1f}s)")
+    return exported
+
+
+def _month(day):
+    return str(day)[:7] if day else None
+
+
+def read(table='papers', columns=None, since=None, until=None, path=None):
+    """读取导出的表，返回pyarrow.Table
+
+    Arrow格式的文件通过内存映射读取，返回的列直接引用映射的文件页（零拷贝）。
+    since/until（含）按论文的added_at过滤，先按月份目录跳过无关文件；
+    只有since/until所在月份的文件需要逐行过滤（会复制这些文件中选中的列），其余月份不复制。
+    """
+    path = path or EXPORT_CONFIG['path']
+    schema = TABLES[table]['schema']
+    unique = TABLES[table].get('unique', ())
+    columns = list(columns or schema.names)
+    needed = list(dict.fromkeys(columns + (['added_at'] if since or until else []) +
+                                (list(unique) + ['seq'] if unique else [])))
+
+    first = pa.scalar(date.fromisoformat(str(since or '0001-01-01')))
+    last = pa.scalar(date.fromisoformat(str(until or '9999-12-31')))
+    tables = []
+    for file, month, _ in _parts(path, table):
+        if (since and month < _month(since)) or (until and month > _month(until)):
+            continue
+        part = _read_part(file, table, needed)
+        if month in (_month(since), _month(until)):
+            mask = pc.and_(pc.greater_equal(part['added_at'], first), pc.less_equal(part['added_at'], last))
+            if pc.sum(mask).as_py() != len(part):
+                part = part.filter(mask)
+        tables.append(part)
+    result = pa.concat_tables(tables) if tables else schema.empty_table().select(needed)
+
+    if unique and len(result):
+        latest = result.group_by(list(unique)).aggregate([('seq', 'max')])
+        if len(latest) != len(result):
+            result = result.filter(pc.is_in(result['seq'], latest['seq_max']))
+    return result.select(columns)
+
+
+def _read_part(file, table, needed):
+    """读取一个文件中的needed列
+
+    旧版本导出的文件缺少后来新增的列：TABLES中legacy指定了替代列的（如papers的seq用sn）读取替代列，
+    其余（如analysis的propensity）补为空值列。
+    """
+    schema = TABLES[table]['schema']
+    legacy = TABLES[table].get('legacy', {})
+    if file.endswith('.arrow'):
+        part = pa.ipc.open_file(pa.memory_map(file)).read_all()
+    else:
+        present = pq.read_schema(file, memory_map=True).names
+        sources = [name if name in present else legacy.get(name) for name in needed]
+        part = pq.read_table(file, columns=list({source for source in sources if source in present}),
+                             memory_map=True)
+    arrays = []
+    for name in needed:
+        field = schema.field(name)
+        source = name if name in part.column_names else legacy.get(name)
+        if source in part.column_names:
+            arrays.append(part[source])
+        else:
+            arrays.append(pa.nulls(len(part), field.type))
+    return pa.Table.from_arrays(arrays, schema=pa.schema([schema.field(name) for name in needed]))
+
+
+def column(table, name, since=None, until=None, path=None):
+    """一列数据的NumPy数组；数据只有一个文件块且没有空值时零拷贝，否则拼接时复制一次"""
+    chunked = read(table, [name], since, until, path)[name]
+    if chunked.num_chunks == 1 and chunked.null_count == 0:
+        return chunked.chunk(0).to_numpy(zero_copy_only=False)
+    return chunked.to_numpy()
+
+
+def category_counts(since=None, until=None, path=None):
+    """{分类: 论文数}，按数量降序"""
+    counts = pc.value_counts(read('papers', ['category'], since, until, path)['category'])
+    pairs = zip(counts.field('values').to_pylist(), counts.field('counts').to_pylist())
+    return dict(sorted(pairs, key=lambda pair: -pair[1]))
+
+
+def score_distribution(model=None, prompt_version=None, since=None, until=None, path=None):
+    """相关性评分0~10的篇数数组，可按模型和prompt版本过滤"""
+    analysis = read('analysis', ['model', 'prompt_version', 'relevance_score'], since, until, path)
+    if model:
+        analysis = analysis.filter(pc.equal(analysis['model'], model))
+    if prompt_version:
+        analysis = analysis.filter(pc.equal(analysis['prompt_version'], prompt_version))
+    scores = analysis['relevance_score'].to_numpy()
+    return np.bincount(np.clip(scores, 0, 10), minlength=11)
+
+
+def training_data(model, prompt_version, path=None):
+    """与preranker.load_training_data相同的训练数据，从导出文件读取：[(标题, 摘要)], 标签数组, 样本权重数组"""
+    from preranker import LLM_THRESHOLD
+
+    analysis = read('analysis', ['paper_id', 'model', 'prompt_version', 'relevance_score', 'propensity'], path=path)
+    analysis = analysis.filter(pc.and_(pc.equal(analysis['model'], model),
+                                       pc.equal(analysis['prompt_version'], prompt_version)))
+    papers = read('papers', ['id', 'title', 'abstract'], path=path)
+    joined = analysis.join(papers, 'paper_id', 'id', join_type='inner').sort_by('paper_id')
+    labels = (joined['relevance_score'].to_numpy() >= LLM_THRESHOLD).astype(np.int8)
+    propensity = pc.fill_null(joined['propensity'], 1.0).to_numpy().astype(np.float64)
+    return list(zip(joined['title'].to_pylist(), joined['abstract'].to_pylist())), labels, 1 / propensity
+
+
+def exists(path=None):
+    return os.path.exists(os.path.join(path or EXPORT_CONFIG['path'], '_state.json'))
+
+
+def main():
+    import db
+    import migrations
+
+    command = sys.argv[1] if len(sys.argv) > 1 else "export"
+    since = sys.argv[2] if len(sys.argv) > 2 else None
+    until = sys.argv[3] if len(sys.argv) > 3 else None
+    path = EXPORT_CONFIG['path']
+    if command == "export":
+        migrations.ensure_schema()
+        exported = export(path)
+        print(f"✅ 导出完成: " + "，".join(f"{table} {count} 行" for table, count in exported.items()))
+    elif command == "status":
+        state = _load_state(path)
+        for table in TABLES:
+            parts = _parts(path, table)
+            size = sum(os.path.getsize(file) for file, _, _ in parts)
+            rows = len(read(table, ['seq'], path=path))
+            xid, seq = state[table]
+            print(f"   {table:<10} {len(parts):>5} 个文件 {rows:>10} 行 {size / 2 ** 20:>9.1f} MB  "
+                  f"水位线 modified_xid={xid} seq={seq}")
+    elif command == "categories":
+        start = time.perf_counter()
+        counts = category_counts(since, until, path)
+        for category, count in counts.items():
+            print(f"   {category:<12} {count:>10}")
+        print(f"📊 {sum(counts.values())} 篇论文，用时 {(time.perf_counter() - start) * 1000:.1f} ms")
+    elif command == "scores":
+        start = time.perf_counter()
+        distribution = score_distribution(since=since, until=until, path=path)
+        for score, count in enumerate(distribution):
+            print(f"   {score:>2} 分 {count:>10}")
+        print(f"📊 {distribution.sum()} 条评分，用时 {(time.perf_counter() - start) * 1000:.1f} ms")
+    else:
+        print(f"❌ 未知命令: {command}（可用: export, status, categories, scores）")
+    db.close_pool()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+"""
+论文全文检索 - 基于papers.search_vector（GIN索引）的关键词检索
+
+检索语法与搜索引擎相同（websearch_to_tsquery）：空格分隔的词全部命中，
+"..."表示短语，or表示任一，-词表示排除。结果按ts_rank_cd相关度排序，
+标题中的命中权重高于摘要，摘要高于作者。
+
+用法:
+    python paper_search.py "multi-agent planning"
+    python paper_search.py "tool use" --since 2025-01-01 --category cs.AI --limit 50
+"""
+import argparse
+import re
+import time
+from typing import NamedTuple
+
+import db
+
+
+# 检索语法中的一项：可选的排除符号 - 加上 "短语" 或单个词
+TERM_RE = re.compile(r'(-?)("[^"]*"?|[^\s"]+)')
+
+
+class SearchResult(NamedTuple):
+    paper: db.Paper
+    rank: float
+
+
+def split_excluded(query):
+    """把检索词分成 (普通部分, 排除部分)，排除部分保留 - 号，如 'tool -robot' -> ('tool', '-robot')"""
+    included, excluded = [], []
+    for sign, term in TERM_RE.findall(query):
+        (excluded if sign else included).append(sign + term)
+    return ' '.join(included), ' '.join(excluded)
+
+
+def search(query, since=None, category=None, limit=20, match_any=False):
+    """按相关度返回 [SearchResult]
+
+    since: 只返回该日期（含）之后入库的论文；category: 只返回该分类；
+    limit为None时返回全部命中；match_any为真时任一检索词命中即可（同时命中的排在前面），
+    适合把较宽泛的主题描述当作检索词时提高召回，-词排除的论文仍然不会返回。
+    """
+    excluded = ''
+    if match_any:
+        # 只把普通检索词改为"任一命中"，排除词另外AND上
+        query, excluded = split_excluded(query)
+    with db.connection() as connection:
+        rows = db.execute_prepared(connection, 'search_papers', (query, match_any, since, category, limit, excluded))
+    return [SearchResult(db.Paper(*row[:-1]), row[-1]) for row in rows]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="论文全文检索")
+    parser.add_argument("query", help='检索词，如 "multi-agent planning" 或 \'"tool use" -robot\'')
+    parser.add_argument("--since", help="只检索该日期之后入库的论文 (YYYY-MM-DD)")
+    parser.add_argument("--category", help="只检索该分类，如 cs.AI")
+    parser.add_argument("--limit", type=int, default=20, help="最多返回多少篇（默认20）")
+    parser.add_argument("--any", action="store_true", help="任一检索词命中即可")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    results = search(args.query, args.since, args.category, args.limit, args.any)
+    elapsed = (time.perf_counter() - start) * 1000
+
+    if not results:
+        print(f"😔 没有找到与 '{args.query}' 匹配的论文（{elapsed:.1f} ms）")
+    for i, (paper, rank) in enumerate(results, 1):
+        print(f"{i:3d}. [{rank:.3f}] {paper.title}")
+        print(f"     🏷️  {paper.category}  📅 {paper.added_at}  🔗 {paper.url}")
+    if results:
+        print(f"\n🔍 {len(results)} 篇结果，用时 {elapsed:.1f} ms")
+    db.close_pool()
+
+
+if __name__ == "__main__":
+    main()
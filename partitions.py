@@ -0,0 +1,128 @@
+#!/usr/bin/env python3
+"""
+papers按月分区的维护 - 提前创建分区，把过期分区移出热表
+
+papers按added_at按月分区（迁移9），分区名为 papers_YYYY_MM。写入前必须存在对应月份的分区：
+机器人每天的健康检查会提前创建PARTITION_MONTHS_AHEAD个月的分区，爬虫管道写入时
+还会为批次中出现的月份补建分区（例如补爬很早以前的论文）。
+
+设置了PARTITION_RETENTION_MONTHS时，更早的分区会从papers上DETACH并移到archive schema，
+不再参与任何查询，但数据保留，需要时可以重新ATTACH。已归档论文的id仍在paper_ids中，
+不会被重新爬取入库。
+
+用法:
+    python partitions.py status             # 查看每个分区的行数和大小
+    python partitions.py ensure             # 创建当前及之后几个月的分区
+    python partitions.py archive <月数>      # 归档早于<月数>个月之前的分区
+"""
+import re
+import sys
+from datetime import date
+
+from config import PARTITION_CONFIG
+
+PARTITION_RE = re.compile(r'^papers_(\d{4})_(\d{2})$')
+# search_vector是生成列，不能直接写入
+ARCHIVE_COLUMNS = "id, sn, category, categories, version, title, authors, abstract, url, added_at, created_at"
+
+# 本进程中已确认存在的分区（月份第一天）
+_ensured = set()
+
+
+def month_start(day):
+    if isinstance(day, str):
+        day = date.fromisoformat(day[:10])
+    return day.replace(day=1)
+
+
+def add_months(day, months):
+    index = day.year * 12 + day.month - 1 + months
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def ensure(connection, days):
+    """确保days所在月份的分区都存在，在单独的事务中创建并提交，返回新确认的月份数"""
+    months = {month_start(day) for day in days if day} - _ensured
+    if not months:
+        return 0
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT papers_ensure_partition(month) FROM unnest(%s::date[]) month;", (sorted(months),))
+    connection.commit()
+    _ensured.update(months)
+    return len(months)
+
+
+def list_partitions(connection):
+    """返回 [(分区名, 月份第一天, 估计行数, 字节数)]，按月份排序"""
+    with connection.cursor() as cursor:
+        cursor.execute("""
+            SELECT c.relname, c.reltuples::bigint, pg_total_relation_size(c.oid)
+            FROM pg_inherits i JOIN pg_class c ON c.oid = i.inhrelid
+            WHERE i.inhparent = 'papers'::regclass;
+        """)
+        rows = cursor.fetchall()
+    partitions = []
+    for name, rows_estimate, size in rows:
+        match = PARTITION_RE.match(name)
+        if match:
+            partitions.append((name, date(int(match[1]), int(match[2]), 1), max(rows_estimate, 0), size))
+    return sorted(partitions, key=lambda partition: partition[1])
+
+
+def archive(connection, before, log=print):
+    """把整个月份都早于before的分区DETACH并移到归档schema，返回归档的分区名列表"""
+    schema = PARTITION_CONFIG['archive_schema']
+    archived = []
+    for name, month, _, _ in list_partitions(connection):
+        if add_months(month, 1) > before:
+            continue
+        with connection.cursor() as cursor:
+            cursor.execute(f'CREATE SCHEMA IF NOT EXISTS "{schema}";')
+            cursor.execute(f'ALTER TABLE papers DETACH PARTITION "{name}";')
+            cursor.execute("SELECT to_regclass(%s);", (f'"{schema}"."{name}"',))
+            if cursor.fetchone()[0] is None:
+                cursor.execute(f'ALTER TABLE "{name}" SET SCHEMA "{schema}";')
+            else:
+                # 该月份归档后又补建过分区（补爬旧论文），合并到已归档的表中
+                cursor.execute(f'INSERT INTO "{schema}"."{name}" ({ARCHIVE_COLUMNS}) '
+                               f'SELECT {ARCHIVE_COLUMNS} FROM "{name}";')
+                cursor.execute(f'DROP TABLE "{name}";')
+        connection.commit()
+        _ensured.discard(month)
+        archived.append(name)
+        log(f"📦 分区 {name} 已归档到 {schema}.{name}")
+    return archived
+
+
+def maintain(connection, log=print):
+    """每日维护：创建当前及之后PARTITION_MONTHS_AHEAD个月的分区，按保留期归档旧分区"""
+    this_month = month_start(date.today())
+    ensure(connection, [add_months(this_month, i) for i in range(PARTITION_CONFIG['months_ahead'] + 1)])
+    if PARTITION_CONFIG['retention_months'] > 0:
+        archive(connection, add_months(this_month, -PARTITION_CONFIG['retention_months']), log)
+
+
+def main():
+    import db
+
+    command = sys.argv[1] if len(sys.argv) > 1 else "status"
+    with db.connection() as connection:
+        if command == "status":
+            partitions = list_partitions(connection)
+            for name, _, rows, size in partitions:
+                print(f"   {name:<16} {rows:>10} 行 {size / 2 ** 20:>9.1f} MB")
+            print(f"🗂️  共 {len(partitions)} 个分区")
+        elif command == "ensure":
+            maintain(connection)
+            print(f"✅ 已创建到 {add_months(month_start(date.today()), PARTITION_CONFIG['months_ahead']):%Y-%m} 的分区")
+        elif command == "archive" and len(sys.argv) > 2:
+            before = add_months(month_start(date.today()), -int(sys.argv[2]))
+            archived = archive(connection, before)
+            print(f"✅ 归档了 {len(archived)} 个 {before:%Y-%m} 之前的分区")
+        else:
+            print(f"❌ 未知命令: {' '.join(sys.argv[1:])}（可用: status, ensure, archive <月数>）")
+    db.close_pool()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,354 @@
+#!/usr/bin/env python3
+"""
+推文发布队列 - post_outbox表和后台发布进程
+
+每日任务只把排好序的推文写入post_outbox（每篇论文一行，已入队的论文不会再次入队）
+然后立即返回，由发布进程按顺序发布：
+
+- 发布前先把行标记为sending并提交，成功后记录tweet_id并标记为posted。
+- 请求没有明确结果（超时、连接中断、5xx），或进程在发布和记录之间崩溃时，行停留在sending。
+  再次处理前先在账号最近的推文中按论文链接查找：找到则补记为posted，找不到才重新发布，
+  所以同一篇论文不会被发布两次。
+- 不使用固定间隔：根据响应头中的 x-rate-limit-* 和 x-user-limit-24hour-* 决定何时发下一条，
+  额度用完时等到重置时间；需要等待超过POST_MAX_WAIT秒时退出，剩下的推文留给下一次运行。
+- 同一数据库上只有一个发布进程（advisory锁），其余进程直接退出。
+
+用法:
+    python post_outbox.py            # 发布所有到期的推文，发完后退出
+    python post_outbox.py status     # 查看队列
+    python post_outbox.py retry      # 把发布失败的推文放回队列
+"""
+import logging
+import os
+import subprocess
+import sys
+import time
+from datetime import timedelta
+
+import requests
+import tweepy
+from psycopg2.extras import execute_values
+from urllib3.exceptions import NewConnectionError
+
+import db
+from config import OUTBOX_CONFIG, TWITTER_API_CONFIG
+
+# pg_try_advisory_lock的键，同一数据库上只运行一个发布进程
+OUTBOX_LOCK_ID = 7041920191
+# 请求结果不明时，等待几秒再到时间线中核对（新推文出现在时间线中有延迟）
+RECONCILE_DELAY = 5
+# 核对时从标记为sending之前多少秒开始查找
+RECONCILE_WINDOW = 60
+# 限流响应没有重置时间时的等待秒数
+DEFAULT_RATE_LIMIT_WAIT = 60
+# 重试间隔：30秒、1分钟、2分钟……
+RETRY_BACKOFF = 30
+
+logger = logging.getLogger(__name__)
+
+
+def enqueue(connection, posts):
+    """posts: [(论文id, 推文内容, 论文链接)]，按发布顺序；返回新入队的条数（已入队过的论文跳过）"""
+    if not posts:
+        return 0
+    with connection.cursor() as cursor:
+        inserted = execute_values(cursor, """
+            INSERT INTO post_outbox (paper_id, content, url, position) VALUES %s
+            ON CONFLICT (paper_id) DO NOTHING
+            RETURNING paper_id;
+        """, [(paper_id, content, url, position) for position, (paper_id, content, url) in enumerate(posts)],
+            fetch=True)
+    connection.commit()
+    return len(inserted)
+
+
+def status_counts(connection):
+    """{状态: 条数}"""
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT status, count(*) FROM post_outbox GROUP BY status;")
+        return dict(cursor.fetchall())
+
+
+def start_worker():
+    """在后台启动发布进程（与当前进程脱离，当前进程退出后继续运行），返回进程号"""
+    directory = os.path.dirname(os.path.abspath(__file__))
+    process = subprocess.Popen(
+        [sys.executable, os.path.join(directory, 'post_outbox.py')], cwd=directory,
+        stdin=subprocess.DEVNULL, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+        start_new_session=True
+    )
+    return process.pid
+
+
+def make_client():
+    """返回原始requests.Response的Twitter客户端，以便读取限流响应头；限流时不在库内等待"""
+    return tweepy.Client(
+        consumer_key=TWITTER_API_CONFIG['consumer_key'],
+        consumer_secret=TWITTER_API_CONFIG['consumer_secret'],
+        access_token=TWITTER_API_CONFIG['access_token'],
+        access_token_secret=TWITTER_API_CONFIG['access_token_secret'],
+        return_type=requests.Response,
+        wait_on_rate_limit=False
+    )
+
+
+def _never_sent(error):
+    """连接超时或连接建立失败时请求一定没有发出；连接建立后中断则结果未知"""
+    reason = getattr(error.args[0], 'reason', None) if error.args else None
+    return isinstance(error, requests.exceptions.ConnectTimeout) or isinstance(reason, NewConnectionError)
+
+
+class OutboxWorker:
+    def __init__(self, client=None):
+        self.client = client or make_client()
+        self.user_id = None
+        # 限流额度用完时，重置之前不再发布（unix时间戳）
+        self.not_before = 0.0
+
+    def run(self):
+        """发布所有到期的推文，返回本次发布的条数；已有发布进程在运行时返回None"""
+        with db.connection() as connection:
+            with connection.cursor() as cursor:
+                cursor.execute("SELECT pg_try_advisory_lock(%s);", (OUTBOX_LOCK_ID,))
+                locked = cursor.fetchone()[0]
+            connection.commit()
+            if not locked:
+                logger.info("📭 已有发布进程在运行")
+                return None
+            try:
+                return self._drain(connection)
+            finally:
+                if not connection.closed:
+                    connection.rollback()
+                    with connection.cursor() as cursor:
+                        cursor.execute("SELECT pg_advisory_unlock(%s);", (OUTBOX_LOCK_ID,))
+                    connection.commit()
+
+    def _drain(self, connection):
+        posted = 0
+        # 上一个发布进程留下的sending行：结果未知，先核对
+        with connection.cursor() as cursor:
+            cursor.execute("""
+                SELECT paper_id, url, claimed_at, extract(epoch FROM clock_timestamp() - claimed_at)
+                FROM post_outbox WHERE status = 'sending' ORDER BY enqueued_at, position;
+            """)
+            unresolved = cursor.fetchall()
+        connection.commit()
+        for paper_id, url, claimed_at, age in unresolved:
+            if age < RECONCILE_DELAY:
+                time.sleep(RECONCILE_DELAY - float(age))
+            posted += self._reconcile(connection, paper_id, url, claimed_at, "发布进程中断，结果未知")
+
+        while True:
+            due = self._seconds_until_due(connection)
+            if due is None:
+                break
+            wait = max(due, self.not_before - time.time())
+            if wait > OUTBOX_CONFIG['max_wait']:
+                logger.info(f"⏸️ {wait / 60:.0f} 分钟后才能继续发布，剩余推文留给下一次运行")
+                break
+            if wait > 0:
+                logger.info(f"⏳ 等待 {wait:.0f} 秒（Twitter限流）")
+                time.sleep(wait)
+            claimed = self._claim(connection)
+            if claimed:
+                posted += self._post(connection, *claimed)
+        return posted
+
+    def _seconds_until_due(self, connection):
+        """距下一条待发布推文到期的秒数（已到期为0），没有待发布推文时返回None"""
+        with connection.cursor() as cursor:
+            cursor.execute("""
+                SELECT extract(epoch FROM min(next_attempt_at) - clock_timestamp())
+                FROM post_outbox WHERE status = 'pending';
+            """)
+            seconds = cursor.fetchone()[0]
+        connection.commit()
+        return None if seconds is None else max(float(seconds), 0.0)
+
+    def _claim(self, connection):
+        """把最早入队的到期推文标记为sending并提交：(论文id, 内容, 链接, 标记时间)"""
+        with connection.cursor() as cursor:
+            cursor.execute("""
+                UPDATE post_outbox
+                SET status = 'sending', attempts = attempts + 1, claimed_at = clock_timestamp()
+                WHERE paper_id = (
+                    SELECT paper_id FROM post_outbox
+                    WHERE status = 'pending' AND next_attempt_at <= clock_timestamp()
+                    ORDER BY enqueued_at, position
+                    LIMIT 1 FOR UPDATE SKIP LOCKED
+                )
+                RETURNING paper_id, content, url, claimed_at;
+            """)
+            claimed = cursor.fetchone()
+        connection.commit()
+        return claimed
+
+    def _post(self, connection, paper_id, content, url, claimed_at):
+        """发布一条已标记为sending的推文，返回成功发布（或确认已发布）的条数"""
+        try:
+            response = self.client.create_tweet(text=content, user_auth=True)
+        except tweepy.TooManyRequests as e:
+            # 429一定没有发布：放回队列，不计入尝试次数
+            self._pace(e.response.headers, limited=True)
+            logger.warning(f"⚠️ {paper_id} 被限流，{self.not_before - time.time():.0f} 秒后重试")
+            self._release(connection, paper_id, e, retry_at=self.not_before, count_attempt=False)
+            return 0
+        except tweepy.Unauthorized:
+            # 认证失败对所有推文都一样：放回队列并停止
+            self._release(connection, paper_id, "认证失败", count_attempt=False)
+            raise
+        except tweepy.Forbidden as e:
+            if 'duplicate' in str(e).lower():
+                # 相同内容的推文已经存在：之前的某次请求其实成功了
+                return self._reconcile(connection, paper_id, url, claimed_at, e, duplicate=True)
+            self._fail(connection, paper_id, e)
+            return 0
+        except (tweepy.BadRequest, tweepy.NotFound) as e:
+            # 请求被明确拒绝，重试也不会成功
+            self._fail(connection, paper_id, e)
+            return 0
+        except requests.exceptions.ConnectionError as e:
+            if not _never_sent(e):
+                return self._unknown_result(connection, paper_id, url, claimed_at, e)
+            # 连接没有建立（网络不通、DNS失败），推文一定没有发出：放回队列并停止
+            self._release(connection, paper_id, e, count_attempt=False)
+            raise
+        except Exception as e:
+            return self._unknown_result(connection, paper_id, url, claimed_at, e)
+
+        self._pace(response.headers)
+        self._mark_posted(connection, paper_id, response.json()['data']['id'])
+        return 1
+
+    def _unknown_result(self, connection, paper_id, url, claimed_at, error):
+        """超时、连接中断、5xx：推文可能已经发出，核对时间线后再决定是否重试"""
+        logger.warning(f"⚠️ {paper_id} 发布结果未知: {error}")
+        time.sleep(RECONCILE_DELAY)
+        return self._reconcile(connection, paper_id, url, claimed_at, error)
+
+    def _pace(self, headers, limited=False):
+        """根据限流响应头更新下一次可以发布的时间：应用和账号24小时额度任一用完时，等到它重置"""
+        for prefix in ('x-rate-limit', 'x-user-limit-24hour'):
+            remaining, reset = headers.get(f'{prefix}-remaining'), headers.get(f'{prefix}-reset')
+            if remaining is not None and reset is not None and int(remaining) <= 0:
+                self.not_before = max(self.not_before, float(reset) + 1)
+        if limited and self.not_before <= time.time():
+            self.not_before = time.time() + DEFAULT_RATE_LIMIT_WAIT
+
+    def _reconcile(self, connection, paper_id, url, claimed_at, error, duplicate=False):
+        """在时间线中查找这篇论文的推文：找到则记为已发布，否则放回队列；返回确认已发布的条数
+
+        查询时间线失败时抛出异常，行保持sending，由下一次运行重新核对。
+        """
+        tweet_id = self._find_tweet(url, claimed_at)
+        if tweet_id or duplicate:
+            logger.info(f"🔎 {paper_id} 的推文已存在（{tweet_id or '时间线中未找到ID'}），记为已发布")
+            self._mark_posted(connection, paper_id, tweet_id)
+            return 1
+        self._release(connection, paper_id, error)
+        return 0
+
+    def _find_tweet(self, url, since):
+        if self.user_id is None:
+            self.user_id = self.client.get_me(user_auth=True).json()['data']['id']
+        response = self.client.get_users_tweets(
+            self.user_id, start_time=since - timedelta(seconds=RECONCILE_WINDOW), max_results=100,
+            tweet_fields=['entities'], user_auth=True
+        )
+        self._pace(response.headers)
+        for tweet in response.json().get('data', []):
+            for link in tweet.get('entities', {}).get('urls', []):
+                if url in (link.get('expanded_url'), link.get('unwound_url')):
+                    return tweet['id']
+        return None
+
+    def _mark_posted(self, connection, paper_id, tweet_id):
+        with connection.cursor() as cursor:
+            cursor.execute("""
+                UPDATE post_outbox SET status = 'posted', tweet_id = %s, posted_at = clock_timestamp(), last_error = NULL
+                WHERE paper_id = %s;
+            """, (tweet_id, paper_id))
+        connection.commit()
+        logger.info(f"✅ {paper_id} 发布成功！ID: {tweet_id}")
+
+    def _release(self, connection, paper_id, error, retry_at=None, count_attempt=True):
+        """放回队列；计入尝试次数时按指数退避，达到POST_MAX_ATTEMPTS次后标记为failed"""
+        with connection.cursor() as cursor:
+            cursor.execute("""
+                UPDATE post_outbox SET
+                    attempts = attempts - %(uncounted)s,
+                    status = CASE WHEN attempts - %(uncounted)s >= %(max_attempts)s THEN 'failed' ELSE 'pending' END,
+                    next_attempt_at = coalesce(to_timestamp(%(retry_at)s),
+                                               clock_timestamp() + make_interval(secs => %(backoff)s * power(2, attempts - 1))),
+                    last_error = %(error)s
+                WHERE paper_id = %(paper_id)s
+                RETURNING status;
+            """, {'uncounted': int(not count_attempt), 'max_attempts': OUTBOX_CONFIG['max_attempts'],
+                  'retry_at': retry_at, 'backoff': RETRY_BACKOFF, 'error': str(error)[:500], 'paper_id': paper_id})
+            status = cursor.fetchone()[0]
+        connection.commit()
+        if status == 'failed':
+            logger.error(f"❌ {paper_id} 已尝试 {OUTBOX_CONFIG['max_attempts']} 次，放弃发布: {error}")
+
+    def _fail(self, connection, paper_id, error):
+        with connection.cursor() as cursor:
+            cursor.execute("UPDATE post_outbox SET status = 'failed', last_error = %s WHERE paper_id = %s;",
+                           (str(error)[:500], paper_id))
+        connection.commit()
+        logger.error(f"❌ {paper_id} 发布被拒绝: {error}")
+
+
+def main():
+    import migrations
+
+    command = sys.argv[1] if len(sys.argv) > 1 else "run"
+    if command == "run":
+        # 发布进程在后台运行，日志写入机器人的日志文件
+        logging.basicConfig(
+            level=logging.INFO,
+            format='%(asctime)s - %(levelname)s - %(message)s',
+            handlers=[
+                logging.FileHandler('paper_bot.log', encoding='utf-8'),
+                logging.StreamHandler()
+            ]
+        )
+        try:
+            migrations.ensure_schema(log=logger.info)
+            posted = OutboxWorker().run()
+            if posted is not None:
+                with db.connection() as connection:
+                    counts = status_counts(connection)
+                logger.info(f"📱 本次发布 {posted} 条推文，队列中还有 {counts.get('pending', 0)} 条待发布"
+                            f"、{counts.get('sending', 0)} 条待核对、{counts.get('failed', 0)} 条失败")
+        except Exception as e:
+            logger.error(f"❌ 发布进程失败: {e}")
+    elif command == "status":
+        with db.connection() as connection, connection.cursor() as cursor:
+            cursor.execute("""
+                SELECT paper_id, status, attempts, tweet_id, next_attempt_at, last_error FROM post_outbox
+                WHERE status <> 'posted' OR posted_at > now() - interval '1 day'
+                ORDER BY enqueued_at, position;
+            """)
+            for paper_id, status, attempts, tweet_id, next_attempt_at, last_error in cursor.fetchall():
+                detail = tweet_id if status == 'posted' else f"{next_attempt_at:%m-%d %H:%M} {last_error or ''}"
+                print(f"   {paper_id:<14} {status:<8} {attempts} 次  {detail}")
+            counts = status_counts(connection)
+        print("📬 " + ("，".join(f"{status} {count}" for status, count in sorted(counts.items())) or "队列为空"))
+    elif command == "retry":
+        with db.connection() as connection:
+            with connection.cursor() as cursor:
+                cursor.execute("""
+                    UPDATE post_outbox SET status = 'pending', attempts = 0, next_attempt_at = now()
+                    WHERE status = 'failed';
+                """)
+                count = cursor.rowcount
+            connection.commit()
+        print(f"✅ {count} 条失败的推文已放回队列")
+    else:
+        print(f"❌ 未知命令: {command}（可用: run, status, retry）")
+    db.close_pool()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,242 @@
+#!/usr/bin/env python3
+"""
+本地预排序模型 - 在调用LLM之前过滤掉大概率低分的论文
+
+用paper_analysis中历史的LLM评分训练：标题+摘要经哈希向量化（词和相邻词对），
+用NumPy实现的逻辑回归预测"LLM评分≥8"的概率。训练时在验证集上选出能保住
+target_recall召回率的阈值，和权重一起保存在npz文件中。
+
+模型上线后，低于阈值的论文不再送入LLM，历史评分只剩下模型认为相关的论文，
+用它训练和选阈值会越来越乐观。automated_paper_bot.py因此按explore_rate的概率
+把低于阈值的论文也送入LLM（探索样本），paper_analysis.propensity记录这个概率；
+训练和评估时每条样本按1/propensity加权，代表同一概率下没有被送入LLM的论文。
+
+用法:
+    python preranker.py train      # 用全部历史评分训练并保存模型
+    python preranker.py evaluate   # 交叉验证，报告各阈值下的召回率和节省的LLM调用
+    加 --from-export 时从paper_export.py的导出文件读取训练数据
+"""
+import re
+import sys
+import time
+import zlib
+
+import numpy as np
+
+# LLM评分达到该值视为相关论文（与analyze_and_select_papers的筛选条件一致）
+LLM_THRESHOLD = 8
+TOKEN_RE = re.compile(r"[a-z0-9]+")
+
+
+def hash_features(texts, n_features):
+    """把文本转换为CSR稀疏矩阵 (data, indices, indptr)，每行做L2归一化
+
+    特征为词和相邻词对的crc32哈希，词频取log(1+tf)。
+    """
+    data, indices, indptr = [], [], [0]
+    mask = n_features - 1
+    for text in texts:
+        tokens = TOKEN_RE.findall(text.lower())
+        counts = {}
+        for token in tokens:
+            h = zlib.crc32(token.encode()) & mask
+            counts[h] = counts.get(h, 0) + 1
+        for first, second in zip(tokens, tokens[1:]):
+            h = zlib.crc32(f"{first} {second}".encode()) & mask
+            counts[h] = counts.get(h, 0) + 1
+        values = np.log1p(np.fromiter(counts.values(), dtype=np.float32, count=len(counts)))
+        norm = np.sqrt((values * values).sum())
+        data.append(values / norm if norm else values)
+        indices.append(np.fromiter(counts.keys(), dtype=np.int32, count=len(counts)))
+        indptr.append(indptr[-1] + len(counts))
+    return (
+        np.concatenate(data) if data else np.zeros(0, np.float32),
+        np.concatenate(indices) if indices else np.zeros(0, np.int32),
+        np.asarray(indptr, dtype=np.int64),
+    )
+
+
+def _matvec(matrix, weights):
+    data, indices, indptr = matrix
+    rows = np.repeat(np.arange(len(indptr) - 1), np.diff(indptr))
+    return np.bincount(rows, weights=data * weights[indices], minlength=len(indptr) - 1)
+
+
+def _rmatvec(matrix, values, n_features):
+    data, indices, indptr = matrix
+    return np.bincount(indices, weights=data * np.repeat(values, np.diff(indptr)), minlength=n_features)
+
+
+def _rows(matrix, selected):
+    """取CSR矩阵的部分行"""
+    data, indices, indptr = matrix
+    parts = [slice(indptr[i], indptr[i + 1]) for i in selected]
+    lengths = np.array([indptr[i + 1] - indptr[i] for i in selected], dtype=np.int64)
+    return (
+        np.concatenate([data[p] for p in parts]) if parts else data[:0],
+        np.concatenate([indices[p] for p in parts]) if parts else indices[:0],
+        np.concatenate([[0], np.cumsum(lengths)]),
+    )
+
+
+class PreRanker:
+    def __init__(self, n_features=2 ** 18, weights=None, bias=0.0, threshold=0.5):
+        self.n_features = n_features
+        self.weights = np.zeros(n_features, dtype=np.float64) if weights is None else weights
+        self.bias = bias
+        self.threshold = threshold
+
+    @staticmethod
+    def text(title, abstract):
+        return f"{title or ''} {abstract or ''}"
+
+    def fit(self, matrix, labels, weights=None, epochs=300, learning_rate=2.0, l2=1e-4):
+        """带类别平衡的L2正则逻辑回归，全量梯度下降；weights为样本权重（默认全为1）"""
+        labels = np.asarray(labels, dtype=np.float64)
+        weights = np.ones(len(labels)) if weights is None else np.asarray(weights, dtype=np.float64)
+        total = weights.sum()
+        positives = (weights * labels).sum()
+        # 相关论文较少，按（加权的）类别频率加权
+        sample_weight = weights * np.where(labels == 1, total / (2 * max(positives, 1)),
+                                           total / (2 * max(total - positives, 1)))
+        for _ in range(epochs):
+            probs = 1 / (1 + np.exp(-(_matvec(matrix, self.weights) + self.bias)))
+            error = (probs - labels) * sample_weight / max(total, 1)
+            self.weights -= learning_rate * (_rmatvec(matrix, error, self.n_features) + l2 * self.weights)
+            self.bias -= learning_rate * error.sum()
+        return self
+
+    def predict_proba(self, matrix):
+        return 1 / (1 + np.exp(-(_matvec(matrix, self.weights) + self.bias)))
+
+    def score(self, papers):
+        """papers: [(标题, 摘要)]，返回相关概率数组"""
+        return self.predict_proba(hash_features([self.text(t, a) for t, a in papers], self.n_features))
+
+    def choose_threshold(self, probs, labels, target_recall, weights=None):
+        """选出能保住target_recall的最高阈值，weights为样本权重（默认全为1）"""
+        positive = np.asarray(labels) == 1
+        if not positive.any():
+            return 0.0
+        order = np.argsort(probs[positive], kind='stable')
+        positive_probs = probs[positive][order]
+        positive_weights = np.ones(len(order)) if weights is None else np.asarray(weights)[positive][order]
+        # 允许漏掉的（加权）相关论文数，从概率最低的开始漏
+        cumulative = np.cumsum(positive_weights)
+        allowed_misses = cumulative[-1] * (1 - target_recall)
+        index = np.searchsorted(cumulative, allowed_misses, side='right')
+        return float(positive_probs[min(index, len(positive_probs) - 1)])
+
+    def save(self, path):
+        np.savez_compressed(path, weights=self.weights.astype(np.float32), bias=self.bias,
+                            threshold=self.threshold, n_features=self.n_features)
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path) as model:
+            return cls(int(model['n_features']), model['weights'].astype(np.float64),
+                       float(model['bias']), float(model['threshold']))
+
+
+def load_training_data(model, prompt_version):
+    """从paper_analysis读取历史评分：[(标题, 摘要)], 标签数组, 样本权重数组（1/propensity）"""
+    import db
+    papers, labels, weights = [], [], []
+    for title, abstract, score, propensity in db.stream('preranker_training_data', """
+            SELECT p.title, p.abstract, a.relevance_score, coalesce(a.propensity, 1)
+            FROM paper_analysis a
+            JOIN papers p ON p.id = a.paper_id
+            WHERE a.model = %s AND a.prompt_version = %s
+            ORDER BY a.paper_id;
+        """, (model, prompt_version)):
+        papers.append((title, abstract))
+        labels.append(score >= LLM_THRESHOLD)
+        weights.append(1 / propensity)
+    return papers, np.array(labels, dtype=np.int8), np.array(weights, dtype=np.float64)
+
+
+def train(papers, labels, target_recall, weights=None, n_features=2 ** 18, seed=0):
+    """训练最终模型：先在20%验证集上选阈值，再用全部数据训练"""
+    texts = [PreRanker.text(t, a) for t, a in papers]
+    matrix = hash_features(texts, n_features)
+    order = np.random.default_rng(seed).permutation(len(texts))
+    split = max(1, len(texts) // 5)
+    valid, fit = order[:split], order[split:]
+    weights = np.ones(len(texts)) if weights is None else weights
+
+    ranker = PreRanker(n_features).fit(_rows(matrix, fit), labels[fit], weights[fit])
+    threshold = ranker.choose_threshold(ranker.predict_proba(_rows(matrix, valid)), labels[valid],
+                                        target_recall, weights[valid])
+
+    final = PreRanker(n_features).fit(matrix, labels, weights)
+    final.threshold = threshold
+    return final
+
+
+def evaluate(papers, labels, weights=None, folds=5, n_features=2 ** 18, seed=0):
+    """K折交叉验证：打印不同召回率目标下的实际召回率和节省的LLM调用比例
+
+    召回率和送入LLM的比例都按样本权重计算，探索样本代表同一概率下没有送入LLM的论文。
+    """
+    texts = [PreRanker.text(t, a) for t, a in papers]
+    matrix = hash_features(texts, n_features)
+    weights = np.ones(len(texts)) if weights is None else weights
+    order = np.random.default_rng(seed).permutation(len(texts))
+    probs = np.zeros(len(texts))
+    for fold in range(folds):
+        test = order[fold::folds]
+        fit = np.setdiff1d(order, test)
+        ranker = PreRanker(n_features).fit(_rows(matrix, fit), labels[fit], weights[fit])
+        probs[test] = ranker.predict_proba(_rows(matrix, test))
+
+    positives = labels.sum()
+    weighted_positives = (weights * labels).sum()
+    print(f"📊 {len(labels)} 篇历史评分，其中 {positives} 篇 ≥{LLM_THRESHOLD} 分 ({folds}折交叉验证)")
+    explored = (weights > 1).sum()
+    if explored:
+        print(f"   其中 {explored} 篇为预排序的探索样本，按1/propensity加权（加权后共 {weights.sum():.0f} 篇）")
+    print(f"   {'目标召回率':<8} {'阈值':>8} {'召回率':>8} {'送入LLM':>8} {'节省调用':>8}")
+    for target in (1.0, 0.99, 0.97, 0.95, 0.9, 0.8):
+        threshold = PreRanker().choose_threshold(probs, labels, target, weights)
+        kept = probs >= threshold
+        recall = (weights * (kept & (labels == 1))).sum() / max(weighted_positives, 1e-9)
+        sent = (weights * kept).sum() / weights.sum()
+        print(f"   {target:<12.2f} {threshold:8.3f} {recall:8.1%} {sent:8.1%} {1 - sent:8.1%}")
+
+    start = time.perf_counter()
+    PreRanker(n_features).score(papers)
+    elapsed = time.perf_counter() - start
+    print(f"⏱️ 打分速度: {elapsed / len(papers) * 1e6:.0f} µs/篇")
+
+
+def main():
+    import db
+    from config import GROQ_CONFIG, PRERANK_CONFIG
+    from paper_analyzer import PaperAnalyzer
+
+    command = sys.argv[1] if len(sys.argv) > 1 else "evaluate"
+    if "--from-export" in sys.argv:
+        # 从列式导出读取（python paper_export.py），不查询数据库
+        import paper_export
+        papers, labels, weights = paper_export.training_data(GROQ_CONFIG['model'], PaperAnalyzer.score_version())
+    else:
+        papers, labels, weights = load_training_data(GROQ_CONFIG['model'], PaperAnalyzer.score_version())
+    db.close_pool()
+
+    if len(papers) < 20 or labels.sum() < 2:
+        print(f"❌ 历史评分太少（{len(papers)} 篇，{labels.sum()} 篇相关），无法训练预排序模型")
+        return
+
+    if command == "train":
+        ranker = train(papers, labels, PRERANK_CONFIG['target_recall'], weights)
+        ranker.save(PRERANK_CONFIG['model_path'])
+        print(f"✅ 预排序模型已保存: {PRERANK_CONFIG['model_path']} "
+              f"({len(papers)} 篇训练数据，阈值 {ranker.threshold:.3f}，目标召回率 {PRERANK_CONFIG['target_recall']:.0%})")
+    elif command == "evaluate":
+        evaluate(papers, labels, weights)
+    else:
+        print(f"❌ 未知命令: {command}（可用: train, evaluate）")
+
+
+if __name__ == "__main__":
+    main()
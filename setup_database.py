@@ -6,6 +6,9 @@ import os
 import psycopg2
 from dotenv import load_dotenv
 
+from migrations import MIGRATIONS, migrate
+from partitions import maintain
+
 def setup_database():
     print("🔧 正在设置PostgreSQL数据库...")
     
@@ -86,20 +89,11 @@ def setup_database():
         connection = psycopg2.connect(**target_config)
         cursor = connection.cursor()
         
-        # 读取并执行init.sql
-        with open('init.sql', 'r', encoding='utf-8') as f:
-            sql_content = f.read()
-        
-        # 分割SQL语句并执行
-        sql_statements = [stmt.strip() for stmt in sql_content.split(';') if stmt.strip()]
-        
-        for sql in sql_statements:
-            if sql:
-                cursor.execute(sql)
-                print(f"   执行: {sql[:50]}...")
-        
-        connection.commit()
-        print("✅ 表结构创建成功")
+        # 执行migrations.py中尚未执行的迁移（已有数据库也会被升级到当前结构）
+        applied = migrate(connection, log=lambda message: print(f"   {message}"))
+        print(f"✅ 表结构已是最新（本次执行 {len(applied)}/{len(MIGRATIONS)} 个迁移）")
+        # 创建当前及之后几个月的papers分区
+        maintain(connection, log=lambda message: print(f"   {message}"))
         
         # 验证表创建
         cursor.execute("""
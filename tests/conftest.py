@@ -0,0 +1,42 @@
+import os
+import sys
+import uuid
+
+import pytest
+
+# 测试直接导入仓库根目录下的模块和tutorial包
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+@pytest.fixture
+def scratch_schema(monkeypatch):
+    """在.env配置的数据库中创建临时schema并迁移到最新结构，连接池只看到这个schema；数据库不可用时跳过"""
+    import psycopg2
+
+    import db
+    import migrations
+    import partitions
+    from config import DB_CONFIG
+
+    schema = f"test_{uuid.uuid4().hex[:8]}"
+    try:
+        admin = psycopg2.connect(**DB_CONFIG, connect_timeout=3)
+    except psycopg2.OperationalError as e:
+        pytest.skip(f"数据库不可用: {e}")
+    admin.autocommit = True
+    with admin.cursor() as cursor:
+        cursor.execute(f"CREATE SCHEMA {schema};")
+
+    db.close_pool()
+    monkeypatch.setenv('PGOPTIONS', f"-c search_path={schema}")
+    monkeypatch.setattr(migrations, '_schema_checked', False)
+    monkeypatch.setattr(partitions, '_ensured', set())
+    with db.connection() as connection:
+        migrations.migrate(connection, log=lambda message: None)
+    try:
+        yield schema
+    finally:
+        db.close_pool()
+        with admin.cursor() as cursor:
+            cursor.execute(f"DROP SCHEMA {schema} CASCADE;")
+        admin.close()
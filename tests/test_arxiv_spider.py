@@ -0,0 +1,78 @@
+from scrapy.http import HtmlResponse, Request
+from scrapy.utils.test import get_crawler
+
+import db
+from tests.test_pipeline import make_item, open_pipeline
+from tutorial.known_ids import KnownIdSet
+from tutorial.spiders.arxiv import ArxivSpider
+
+LISTING_URL = "https://arxiv.org/list/cs.AI/pastweek?skip=0&show=25"
+
+
+def listing(*ids):
+    """只包含parse_listing用到的元素的列表页"""
+    entries = "".join(f"""
+        <dt><a href="/abs/{paper_id}" title="Abstract" id="{paper_id}">arXiv:{paper_id}</a></dt>
+        <dd><div class="list-title mathjax">Title: Paper {paper_id}</div>
+            <div class="list-authors"><a>Alice</a>, <a>Bob</a></div></dd>
+    """ for paper_id in ids)
+    request = Request(LISTING_URL, meta={'category': 'cs.AI', 'target_date': 'recent'})
+    return HtmlResponse(LISTING_URL, body=f"<dl>{entries}</dl>".encode(), encoding='utf-8', request=request)
+
+
+def make_spider(known_ids):
+    spider = ArxivSpider.from_crawler(get_crawler(ArxivSpider))
+    spider.known_ids = known_ids
+    return spider
+
+
+def requested(spider, response):
+    return [(request.meta['id'], request.meta['version']) for request in spider.parse_listing(response)]
+
+
+def test_prefilter_lets_newer_versions_through():
+    spider = make_spider(KnownIdSet([('2501.00001', 1), ('2501.00002', 3), ('2501.00003', None), '2501.00004']))
+    response = listing('2501.00001v2', '2501.00002v2', '2501.00003v1', '2501.00004', '2501.00005v1')
+
+    assert requested(spider, response) == [('2501.00001', 2), ('2501.00003', 1), ('2501.00005', 1)]
+    stats = spider.crawler.stats
+    assert stats.get_value('prefilter/requests_saved') == 2
+    assert stats.get_value('prefilter/new_versions') == 2
+
+
+def test_v2_of_stored_v1_replaces_the_row(scratch_schema):
+    pipeline, spider, stored = open_pipeline()
+    v1 = make_item('2501.00001', version=1, title="Agents v1")
+    pipeline.process_item(v1, spider)
+    pipeline.process_item(make_item('2501.00002', version=1), spider)
+    pipeline.close_spider(spider)
+
+    # 爬虫在列表页看到v2，预过滤放行
+    with db.connection() as connection:
+        known = KnownIdSet.from_database(connection)
+    assert known.version('2501.00001') == 1
+    crawler_spider = make_spider(known)
+    assert requested(crawler_spider, listing('2501.00001v2', '2501.00002v1')) == [('2501.00001', 2)]
+
+    # 管道用v2覆盖库中的v1，不当作新论文；重复的v1不会把版本改回去
+    pipeline, spider, stored = open_pipeline()
+    v2 = {**make_item('2501.00001', version=2, title="Agents v2"), 'added_at': '2001-01-01'}
+    pipeline.process_item(v2, spider)
+    pipeline.process_item(make_item('2501.00002', version=1), spider)
+    pipeline.close_spider(spider)
+    stats = pipeline.stats.get_stats()
+    assert (stats['papers/updated'], stats['papers/inserted'], stats['papers/duplicates']) == (1, 0, 1)
+    pipeline, spider, _ = open_pipeline()
+    pipeline.process_item(v1, spider)
+    pipeline.close_spider(spider)
+
+    assert stored == []
+    with db.connection() as connection, connection.cursor() as cursor:
+        cursor.execute("SELECT id, version, title, url, added_at::text FROM papers ORDER BY id;")
+        rows = cursor.fetchall()
+        cursor.execute("SELECT id, version FROM paper_ids ORDER BY id;")
+        registered = cursor.fetchall()
+        known = KnownIdSet.from_database(connection)
+    assert rows[0] == ('2501.00001', 2, "Agents v2", "http://arxiv.org/abs/2501.00001v2", v1['added_at'])
+    assert registered == [('2501.00001', 2), ('2501.00002', 1)]
+    assert known.version('2501.00001') == 2
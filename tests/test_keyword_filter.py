@@ -0,0 +1,68 @@
+import pytest
+
+from tutorial.keyword_filter import KEYWORD_CLASSES, KeywordMatcher, default_matcher, is_agent_paper, is_vision_paper
+
+
+@pytest.mark.parametrize("title, abstract", [
+    ("Multi-agent debate", "Agents debate to improve factuality."),
+    ("AgentBench", "Evaluating LLMs as agents."),
+    ("AutoAgents: generating agent teams", "Dynamic team construction."),
+    ("Scaling test-time compute", "We build an LLM agent that plans with tools."),
+    ("Named entity recognition with agentic pipelines", "An agentic NER system."),
+    ("Tool use", "Our Agent-Based simulation of markets."),
+    # 重叠的关键词：'autonomous agent' 不是整词，但其中的 'agentic' 是
+    ("Planning", "An autonomous agentic workflow."),
+])
+def test_agent_papers(title, abstract):
+    assert is_agent_paper(title, abstract)
+
+
+@pytest.mark.parametrize("title, abstract", [
+    ("Magenta: music generation", "A transformer for symbolic music."),
+    ("Reagent selection with language models", "Chemistry planning."),
+    ("Scaling laws revisited", "We fit power laws to language model loss."),
+    ("Crawling at scale", "We rotate the user agent of an LLM agent crawler."),
+    ("MRI imaging", "A new contrast agent for multi-agent style imaging."),
+    ("Agency in language", "Linguistic agency and agentive verbs."),
+    ("", None),
+])
+def test_non_agent_papers(title, abstract):
+    assert not is_agent_paper(title, abstract)
+
+
+@pytest.mark.parametrize("title, abstract", [
+    ("Multi-agent visual question answering", "Agents answer questions about images."),
+    ("Object recognition with vision agents", "A computer vision system."),
+    ("Diffusion for video", "We generate Videos from text."),
+    ("A VQA benchmark", "Questions about charts."),
+    ("Segmentation models", "Panoptic segmentation at scale."),
+])
+def test_vision_papers(title, abstract):
+    assert is_vision_paper(title, abstract)
+
+
+@pytest.mark.parametrize("title, abstract", [
+    ("Speech recognition for low-resource languages", "We improve ASR with LLM agents."),
+    ("Scaling laws revisited", "We report results at ACVs and on CVPR-style splits."),
+    ("Revisionist histories", "Television and provisional reviews."),
+    ("Multi-agent debate", "Agents debate to improve factuality."),
+])
+def test_non_vision_papers(title, abstract):
+    assert not is_vision_paper(title, abstract)
+
+
+def test_scan_reports_every_hit_in_its_field():
+    hits = default_matcher.scan("Multi-agent planning", "An LLM agent for object detection; agentic.")
+    assert hits['core'] == {'multi-agent', 'agent planning', 'llm agent', 'agentic'}
+    assert hits['title'] == {'agent*', '*agent'}
+    assert hits['exclude'] == set()
+    assert hits['vision'] == {'object detection'}
+    # 'agent*' 只适用于标题
+    assert default_matcher.scan("Planning", "AgentBench results")['title'] == set()
+
+
+def test_first_stops_after_one_hit_per_class():
+    matcher = KeywordMatcher({'core': KEYWORD_CLASSES['core']})
+    hits = matcher.scan("Agentic multi-agent systems", "", first=True)
+    assert len(hits['core']) == 1
+    assert matcher.scan("Agentic multi-agent systems", "")['core'] == {'agentic', 'multi-agent', 'agent system'}
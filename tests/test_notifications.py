@@ -0,0 +1,125 @@
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from tutorial.notifications import NotificationDispatcher, TelegramChannel
+
+
+class StubTelegram(ThreadingHTTPServer):
+    """本地的Telegram sendMessage接口：按顺序返回预设的响应，记录收到的消息和时间"""
+
+    def __init__(self):
+        super().__init__(('127.0.0.1', 0), StubHandler)
+        self.responses = []
+        self.received = []
+        self.lock = threading.Lock()
+
+    @property
+    def api_base(self):
+        return f"http://127.0.0.1:{self.server_address[1]}"
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    def do_POST(self):
+        payload = json.loads(self.rfile.read(int(self.headers['Content-Length'])))
+        with self.server.lock:
+            self.server.received.append((time.monotonic(), self.path, payload))
+            status, body = self.server.responses.pop(0) if self.server.responses else (200, {'ok': True})
+        data = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format, *args):
+        pass
+
+
+@pytest.fixture
+def server():
+    server = StubTelegram()
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def make_dispatcher(server, **kwargs):
+    channel = TelegramChannel("TOKEN", "-100", api_base=server.api_base, min_interval=0)
+    options = dict(queue_size=10, workers=1, max_retries=3, backoff=0.01, drain_timeout=10)
+    options.update(kwargs)
+    return NotificationDispatcher([channel], **options)
+
+
+def texts(server):
+    return [payload['text'] for _, _, payload in server.received]
+
+
+def test_full_queue_drops_and_close_drains(server):
+    dispatcher = make_dispatcher(server, queue_size=3)
+    # 工作线程还没启动，消息只在队列里
+    assert [dispatcher.submit("telegram", f"paper {i}") for i in range(4)] == [True, True, True, False]
+    assert not dispatcher.submit("twitter", "unknown channel")
+    assert server.received == []
+
+    dispatcher.start()
+    counts = dispatcher.close()
+    assert texts(server) == ["paper 0", "paper 1", "paper 2"]
+    assert counts == {"telegram/dropped": 1, "telegram/sent": 3}
+    _, path, payload = server.received[0]
+    assert path == "/botTOKEN/sendMessage" and payload['chat_id'] == "-100"
+
+
+def test_server_errors_are_retried(server):
+    server.responses = [(502, {}), (500, {})]
+    dispatcher = make_dispatcher(server)
+    dispatcher.start()
+    dispatcher.submit("telegram", "paper")
+    counts = dispatcher.close()
+    assert texts(server) == ["paper"] * 3
+    assert counts == {"telegram/retried": 2, "telegram/sent": 1}
+
+
+def test_gives_up_after_max_retries(server):
+    server.responses = [(500, {})] * 10
+    dispatcher = make_dispatcher(server, max_retries=2)
+    dispatcher.start()
+    dispatcher.submit("telegram", "paper")
+    counts = dispatcher.close()
+    assert len(server.received) == 3
+    assert counts == {"telegram/retried": 2, "telegram/failed": 1}
+
+
+def test_429_waits_for_retry_after(server):
+    server.responses = [(429, {'ok': False, 'error_code': 429, 'description': 'Too Many Requests: retry after 1',
+                               'parameters': {'retry_after': 1}})]
+    dispatcher = make_dispatcher(server, workers=2)
+    dispatcher.start()
+    dispatcher.submit("telegram", "first")
+    time.sleep(0.2)
+    dispatcher.submit("telegram", "second")
+    counts = dispatcher.close()
+
+    times = {}
+    for sent_at, _, payload in server.received:
+        times.setdefault(payload['text'], []).append(sent_at)
+    first_attempt = times["first"][0]
+    # 重试和另一个线程的消息都要等到retry_after之后（退避只有0.01秒）
+    assert times["first"][1] - first_attempt >= 0.95
+    assert times["second"][0] - first_attempt >= 0.95
+    assert counts == {"telegram/retried": 1, "telegram/rate_limited": 1, "telegram/sent": 2}
+
+
+def test_429_without_parameters_uses_retry_after_header():
+    class Response:
+        headers = {'Retry-After': '7'}
+
+        def json(self):
+            raise ValueError("no body")
+
+    assert TelegramChannel._retry_after(Response()) == 7.0
@@ -0,0 +1,159 @@
+import json
+from datetime import date
+from types import SimpleNamespace
+
+import pytest
+
+import db
+import paper_analyzer
+from analysis_store import load_analyses, save_analyses
+from paper_analyzer import PaperAnalyzer
+
+SCORE = {"relevant": True, "confidence": "High", "relevance_score": 9,
+         "analysis": "Multi-agent planning.", "keywords": ["agents"]}
+
+
+@pytest.fixture
+def analyzer(monkeypatch):
+    monkeypatch.setitem(paper_analyzer.GROQ_CONFIG, 'api_key', 'test')
+    monkeypatch.setitem(paper_analyzer.LLM_CACHE_CONFIG, 'enabled', False)
+    return PaperAnalyzer()
+
+
+class FakeLLM:
+    """代替ChatGroq：reply(prompt)返回响应文本，记录收到的prompt"""
+
+    def __init__(self, reply):
+        self.reply = reply
+        self.prompts = []
+
+    def invoke(self, prompt, **kwargs):
+        self.prompts.append(prompt)
+        return SimpleNamespace(content=self.reply(prompt))
+
+
+def respond(analyzer, monkeypatch, content):
+    llm = FakeLLM(lambda prompt: content)
+    monkeypatch.setattr(analyzer, 'llm', llm)
+    return llm
+
+
+def test_abstract_result_is_validated(analyzer, monkeypatch):
+    respond(analyzer, monkeypatch, json.dumps({**SCORE, "relevance_score": "8", "extra": 1}))
+    assert analyzer.analyze_abstract("We study LLM agents.") == {**SCORE, "relevance_score": 8}
+
+
+@pytest.mark.parametrize("content", [
+    "Yes, this is an agent paper.",
+    json.dumps({**SCORE, "relevance_score": 42}),
+    json.dumps({**SCORE, "confidence": "Sure"}),
+])
+def test_abstract_fallback_is_marked_as_error(analyzer, monkeypatch, content):
+    respond(analyzer, monkeypatch, content)
+    result = analyzer.analyze_abstract("We study LLM agents.")
+    assert result['error'] and result['relevance_score'] == 5
+
+
+def test_batch_entry_failing_schema_is_rescored(analyzer, monkeypatch):
+    batch = json.dumps([{"id": 1, **SCORE}, {"id": 2, **SCORE, "relevance_score": -1}])
+    single = json.dumps({**SCORE, "relevance_score": 3})
+    monkeypatch.setattr(analyzer, 'llm', FakeLLM(lambda prompt: batch if "JSON array" in prompt else single))
+    results = analyzer.analyze_batch(["first", "second"])
+    assert [result['relevance_score'] for result in results] == [9, 3]
+    assert results[0]['analysis'] == ""
+
+
+def test_batch_entry_without_confidence_is_rescored(analyzer, monkeypatch):
+    entry = {key: value for key, value in SCORE.items() if key != "confidence"}
+    batch = json.dumps([{"id": 1, **SCORE}, {"id": 2, **entry}])
+    single = json.dumps({**SCORE, "confidence": "Low"})
+    llm = FakeLLM(lambda prompt: batch if "JSON array" in prompt else single)
+    monkeypatch.setattr(analyzer, 'llm', llm)
+    results = analyzer.analyze_batch(["first", "second"])
+    # 不为缺少的confidence编造默认值，这篇逐篇重新评分
+    assert [result['confidence'] for result in results] == ["High", "Low"]
+    assert len(llm.prompts) == 2
+
+
+def test_fallback_scores_are_not_stored(analyzer, monkeypatch, scratch_schema):
+    monkeypatch.setattr(analyzer, 'analyze_many', lambda abstracts, topic: [
+        SCORE if abstract == "good" else analyzer.analyze_abstract(abstract, topic) for abstract in abstracts
+    ])
+    respond(analyzer, monkeypatch, "Yes, probably an agent paper.")
+    papers = [("2501.00001", "good", date.today()), ("2501.00002", "garbled", date.today())]
+
+    results = analyzer.score_papers(papers)
+    assert results[1]['relevance_score'] == 5 and results[1]['error']
+    with db.connection() as connection:
+        stored = load_analyses(connection, ["2501.00001", "2501.00002"],
+                               paper_analyzer.GROQ_CONFIG['model'], analyzer.score_version())
+    assert list(stored) == ["2501.00001"]
+
+
+def test_bad_row_does_not_abort_save(scratch_schema):
+    rows = [("2501.00001", date.today(), SCORE, 1.0),
+            ("2501.00002", date.today(), {**SCORE, "relevance_score": 40000}, 1.0),
+            ("2501.00003", date.today(), {**SCORE, "relevant": None}, 1.0),
+            ("2501.00004", date.today(), SCORE, 1.0)]
+    with db.connection() as connection:
+        assert save_analyses(connection, rows, "model", "v1") == ["2501.00002", "2501.00003"]
+        stored = load_analyses(connection, [row[0] for row in rows], "model", "v1")
+    assert sorted(stored) == ["2501.00001", "2501.00004"]
+
+
+def test_propensity_is_saved_with_the_score(analyzer, monkeypatch, scratch_schema):
+    monkeypatch.setattr(analyzer, 'analyze_many', lambda abstracts, topic: [dict(SCORE) for _ in abstracts])
+    papers = [("2501.00001", "kept", date.today()), ("2501.00002", "explored", date.today())]
+
+    analyzer.score_papers(papers, propensities={"2501.00002": 0.05})
+    with db.connection() as connection:
+        stored = load_analyses(connection, ["2501.00001", "2501.00002"],
+                               paper_analyzer.GROQ_CONFIG['model'], analyzer.score_version())
+    assert 'propensity' not in stored["2501.00001"]
+    assert stored["2501.00002"]['propensity'] == pytest.approx(0.05)
+
+
+def test_detail_papers_reuses_score_with_one_call_per_paper(analyzer, monkeypatch, scratch_schema):
+    llm = respond(analyzer, monkeypatch,
+                  json.dumps({"description": "Uses agents to plan.", "detailed_analysis": "• Planning with agents"}))
+    papers = [("2501.00001", "Agents", "We plan with agents.", date.today(), SCORE),
+              ("2501.00002", "More agents", "We debate with agents.", date.today(), {**SCORE, "relevance_score": 8})]
+
+    results = analyzer.detail_papers(papers)
+    assert [prompt.split('\n')[0] for prompt in llm.prompts] == ["Summarize this AI agent research paper."] * 2
+    assert [result['relevance_score'] for result in results] == [9, 8]
+    assert results[0] == {**SCORE, "description": "Uses agents to plan.", "detailed_analysis": "• Planning with agents"}
+
+    # 第二次直接读取已存结果
+    assert analyzer.detail_papers(papers) == results
+    assert len(llm.prompts) == 2
+
+
+def test_summary_fallback_with_default_text_is_marked_as_error(analyzer, monkeypatch):
+    def reply(prompt):
+        if prompt.startswith("Analyze this AI agent research paper"):
+            raise RuntimeError("rate limited")
+        return "Not JSON." if prompt.startswith("Summarize") else "Uses agents to plan."
+
+    monkeypatch.setattr(analyzer, 'llm', FakeLLM(reply))
+    result = analyzer.summarize_paper("Agents", "We plan with agents.")
+    assert result['description'] == "Uses agents to plan."
+    assert result['error']
+
+
+def test_invalid_response_is_not_cached(monkeypatch, tmp_path):
+    monkeypatch.setitem(paper_analyzer.GROQ_CONFIG, 'api_key', 'test')
+    monkeypatch.setitem(paper_analyzer.LLM_CACHE_CONFIG, 'enabled', True)
+    monkeypatch.setitem(paper_analyzer.LLM_CACHE_CONFIG, 'path', str(tmp_path / "llm_cache.sqlite3"))
+    replies = iter(["Yes, probably an agent paper.", json.dumps(SCORE)])
+    analyzer = PaperAnalyzer()
+    llm = FakeLLM(lambda prompt: next(replies))
+    monkeypatch.setattr(analyzer, 'llm', llm)
+
+    assert analyzer.analyze_abstract("We study LLM agents.")['error']
+    # 重新运行时不会从缓存读到同一个无法解析的响应
+    assert analyzer.analyze_abstract("We study LLM agents.") == SCORE
+    assert analyzer.analyze_abstract("We study LLM agents.") == SCORE
+    assert len(llm.prompts) == 2
+    assert analyzer.cache.hits == 1
+    analyzer.close()
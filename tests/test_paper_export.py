@@ -0,0 +1,46 @@
+import psycopg2
+
+import paper_export
+from config import DB_CONFIG
+from tests.test_pipeline import make_item, open_pipeline
+
+
+def test_updated_paper_is_exported_again(scratch_schema, tmp_path):
+    pipeline, spider, _ = open_pipeline(batch_size=1)
+    pipeline.process_item(make_item('2501.00001'), spider)
+    pipeline.process_item(make_item('2501.00002'), spider)
+    assert paper_export.export(str(tmp_path), log=lambda message: None)['papers'] == 2
+
+    # 新版本原地覆盖旧行，sn不变
+    pipeline.process_item(make_item('2501.00001', version=2, title="Revised"), spider)
+    pipeline.close_spider(spider)
+    assert paper_export.export(str(tmp_path), log=lambda message: None)['papers'] == 1
+
+    papers = paper_export.read('papers', ['id', 'version', 'title'], path=str(tmp_path)).sort_by('id')
+    assert papers.to_pylist() == [
+        {'id': '2501.00001', 'version': 2, 'title': "Revised"},
+        {'id': '2501.00002', 'version': 1, 'title': make_item('2501.00002')['title']},
+    ]
+
+
+def test_rows_of_open_transaction_are_not_skipped(scratch_schema, tmp_path):
+    item = make_item('2501.00003')
+    slow = psycopg2.connect(**DB_CONFIG)
+    try:
+        # 慢事务先分配到较小的seq，提交前另一篇论文已经写入
+        with slow.cursor() as cursor:
+            cursor.execute(f"INSERT INTO papers ({', '.join(item)}) VALUES ({', '.join(['%s'] * len(item))});",
+                           list(item.values()))
+        pipeline, spider, _ = open_pipeline(batch_size=1)
+        pipeline.process_item(make_item('2501.00004'), spider)
+        pipeline.close_spider(spider)
+
+        # 慢事务结束前水位线不能越过它
+        assert paper_export.export(str(tmp_path), log=lambda message: None)['papers'] == 0
+        slow.commit()
+    finally:
+        slow.close()
+
+    assert paper_export.export(str(tmp_path), log=lambda message: None)['papers'] == 2
+    ids = paper_export.read('papers', ['id'], path=str(tmp_path))['id'].to_pylist()
+    assert sorted(ids) == ['2501.00003', '2501.00004']
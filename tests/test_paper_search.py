@@ -0,0 +1,36 @@
+import pytest
+
+import paper_search
+from tests.test_pipeline import make_item, open_pipeline
+
+
+@pytest.fixture
+def papers(scratch_schema):
+    pipeline, spider, _ = open_pipeline()
+    for paper_id, title in [('2501.00001', "Tool use for LLM agents"),
+                            ('2501.00002', "Tool use for robot manipulation"),
+                            ('2501.00003', "Multi-agent planning"),
+                            ('2501.00004', "Robot planning with language")]:
+        pipeline.process_item({**make_item(paper_id, title=title), 'abstract': title}, spider)
+    pipeline.close_spider(spider)
+
+
+def found(query, match_any=False):
+    return sorted(result.paper.id for result in paper_search.search(query, limit=None, match_any=match_any))
+
+
+def test_split_excluded():
+    assert paper_search.split_excluded('tool -robot') == ('tool', '-robot')
+    assert paper_search.split_excluded('"tool use" -"robot arm" multi-agent') == ('"tool use" multi-agent', '-"robot arm"')
+
+
+def test_all_terms(papers):
+    assert found("tool use") == ['2501.00001', '2501.00002']
+    assert found("tool -robot") == ['2501.00001']
+
+
+def test_any_term_keeps_exclusions(papers):
+    assert found("tool planning", match_any=True) == ['2501.00001', '2501.00002', '2501.00003', '2501.00004']
+    # 排除词不能被改成"任一命中"：'tool' | !'robot' 会匹配所有不含robot的论文
+    assert found("tool planning -robot", match_any=True) == ['2501.00001', '2501.00003']
+    assert found('"tool use" -robot', match_any=True) == ['2501.00001']
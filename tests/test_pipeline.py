@@ -0,0 +1,75 @@
+import logging
+from datetime import date
+from types import SimpleNamespace
+
+from scrapy.settings import Settings
+from scrapy.statscollectors import MemoryStatsCollector
+
+import db
+from tutorial.pipelines import PostgresNoDuplicatesPipeline
+
+
+def make_item(paper_id, version=1, title="A multi-agent planning framework"):
+    return {
+        'id': paper_id, 'category': 'cs.AI', 'categories': 'cs.AI cs.MA', 'version': version,
+        'title': title, 'authors': 'Alice, Bob', 'abstract': 'We study LLM agents.',
+        'url': f"http://arxiv.org/abs/{paper_id}v{version}", 'added_at': date.today().isoformat(),
+    }
+
+
+def open_pipeline(batch_size=10):
+    spider = SimpleNamespace(logger=logging.getLogger('test_pipeline'))
+    pipeline = PostgresNoDuplicatesPipeline(batch_size=batch_size, batch_interval=0, settings={})
+    crawler = SimpleNamespace(settings=Settings())
+    pipeline.stats = MemoryStatsCollector(crawler)
+    pipeline.open_spider(spider)
+    stored = []
+    pipeline._on_new_paper = lambda item, spider: stored.append(item['id'])
+    return pipeline, spider, stored
+
+
+def stored_ids():
+    with db.connection() as connection, connection.cursor() as cursor:
+        cursor.execute("SELECT id FROM papers ORDER BY id;")
+        return [row[0] for row in cursor.fetchall()]
+
+
+def test_bad_row_does_not_drop_batch(scratch_schema):
+    pipeline, spider, stored = open_pipeline()
+    # id超过VARCHAR(50)，整批INSERT会失败
+    items = [make_item('2501.00001'), make_item('x' * 60), make_item('2501.00002')]
+    for item in items:
+        pipeline.process_item(item, spider)
+    pipeline.close_spider(spider)
+
+    assert stored_ids() == ['2501.00001', '2501.00002']
+    assert sorted(stored) == ['2501.00001', '2501.00002']
+    stats = pipeline.stats.get_stats()
+    assert stats['papers/failed'] == 1
+    assert stats['papers/inserted'] == 2
+    assert stats['papers/batch_retries'] == 1
+
+
+def test_batch_recovers_from_dropped_connection(scratch_schema):
+    pipeline, spider, stored = open_pipeline()
+    pipeline.process_item(make_item('2501.00003'), spider)
+    pipeline.connection.close()
+    pipeline.process_item(make_item('2501.00004'), spider)
+    pipeline.close_spider(spider)
+
+    assert stored_ids() == ['2501.00003', '2501.00004']
+    assert pipeline.stats.get_stats().get('papers/failed') is None
+
+
+def test_single_mode_updates_newer_version(scratch_schema):
+    pipeline, spider, stored = open_pipeline(batch_size=1)
+    pipeline.process_item(make_item('2501.00005', version=1), spider)
+    pipeline.process_item(make_item('2501.00005', version=2, title="Revised"), spider)
+    pipeline.process_item(make_item('2501.00005', version=1), spider)
+    pipeline.close_spider(spider)
+
+    assert stored == ['2501.00005']
+    assert pipeline.stats.get_stats()['papers/updated'] == 1
+    with db.connection() as connection, connection.cursor() as cursor:
+        cursor.execute("SELECT p.version, p.title, i.version FROM papers p JOIN paper_ids i USING (id);")
+        assert cursor.fetchall() == [(2, "Revised", 2)]
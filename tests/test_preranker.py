@@ -0,0 +1,62 @@
+from datetime import date
+
+import numpy as np
+import pytest
+
+import db
+from analysis_store import save_analyses
+from preranker import PreRanker, hash_features, load_training_data
+from tests.test_pipeline import make_item, open_pipeline
+
+
+@pytest.mark.parametrize("target", [1.0, 0.99, 0.97, 0.95, 0.9, 0.8, 0.5])
+def test_unit_weights_match_unweighted_threshold(target):
+    rng = np.random.default_rng(1)
+    probs = rng.random(200)
+    labels = (rng.random(200) < 0.3).astype(np.int8)
+    ranker = PreRanker(16)
+    # 旧的计算方式：按概率排序后允许漏掉 floor(相关数 × (1 - 目标召回率)) 篇
+    positive_probs = np.sort(probs[labels == 1])
+    expected = positive_probs[int(np.floor(len(positive_probs) * (1 - target)))]
+    assert ranker.choose_threshold(probs, labels, target) == expected
+    assert ranker.choose_threshold(probs, labels, target, np.ones(200)) == expected
+
+
+def test_explored_positive_lowers_threshold():
+    # 20篇高于阈值的相关论文，加上1篇以5%概率探索到的低分相关论文
+    probs = np.concatenate([np.linspace(0.5, 0.95, 20), [0.05]])
+    labels = np.ones(21, dtype=np.int8)
+    weights = np.concatenate([np.ones(20), [20.0]])
+    ranker = PreRanker(16)
+    # 不加权时只算漏掉1篇；加权后它代表20篇没被送入LLM的相关论文
+    assert ranker.choose_threshold(probs, labels, 0.95) == 0.5
+    assert ranker.choose_threshold(probs, labels, 0.95, weights) == 0.05
+
+
+def test_weights_shift_the_decision_boundary():
+    texts = ["agent planning tools", "protein folding structure"]
+    # 同样的文本两个标签各一条，权重决定模型偏向哪一边
+    matrix = hash_features(texts * 2, 2 ** 10)
+    labels = np.array([1, 0, 0, 1])
+    agent_first = PreRanker(2 ** 10).fit(matrix, labels, np.array([5.0, 5.0, 1.0, 1.0]))
+    protein_first = PreRanker(2 ** 10).fit(matrix, labels, np.array([1.0, 1.0, 5.0, 5.0]))
+    single = hash_features(texts, 2 ** 10)
+    assert np.argmax(agent_first.predict_proba(single)) == 0
+    assert np.argmax(protein_first.predict_proba(single)) == 1
+
+
+def test_training_data_weights_explored_samples(scratch_schema):
+    pipeline, spider, _ = open_pipeline()
+    for paper_id in ('2501.00001', '2501.00002'):
+        pipeline.process_item(make_item(paper_id), spider)
+    pipeline.close_spider(spider)
+
+    score = {"relevant": False, "confidence": "High", "relevance_score": 3, "analysis": "", "keywords": []}
+    rows = [("2501.00001", date.today(), score, 1.0),
+            ("2501.00002", date.today(), {**score, "propensity": 0.05}, 1.0)]
+    with db.connection() as connection:
+        assert save_analyses(connection, rows, "model", "v1") == []
+
+    papers, labels, weights = load_training_data("model", "v1")
+    assert len(papers) == 2 and labels.tolist() == [0, 0]
+    assert weights.tolist() == pytest.approx([1.0, 20.0])
@@ -0,0 +1,65 @@
+from types import SimpleNamespace
+
+import pytest
+from scrapy.http import Request, Response
+from scrapy.settings import Settings
+from scrapy.statscollectors import MemoryStatsCollector
+
+from tutorial.middlewares import AdaptiveThrottleMiddleware, page_type
+from tutorial.spiders.arxiv_api import ARXIV_API_URL, ArxivApiSpider
+
+API_URL = f"{ARXIV_API_URL}?search_query=cat:cs.AI&start=0"
+
+
+def make_middleware(budgets=None, spider_settings=ArxivApiSpider.custom_settings):
+    settings = Settings()
+    settings.setmodule('tutorial.settings')
+    settings.update(spider_settings, priority='spider')
+    if budgets is not None:
+        settings.set('ADAPTIVE_THROTTLE_BUDGETS', budgets, priority='cmdline')
+    crawler = SimpleNamespace(settings=settings)
+    crawler.stats = MemoryStatsCollector(crawler)
+    slot = SimpleNamespace(delay=0.0, concurrency=8, randomize_delay=True)
+    crawler.engine = SimpleNamespace(downloader=SimpleNamespace(slots={'export.arxiv.org:api': slot}))
+    return AdaptiveThrottleMiddleware(crawler), slot
+
+
+def respond(middleware, status=200, latency=0.01, headers=None):
+    request = Request(API_URL)
+    middleware.process_request(request)
+    request.meta['download_latency'] = latency
+    middleware.process_response(request, Response(API_URL, status=status, headers=headers or {}))
+    return request
+
+
+def test_api_requests_get_their_own_slot():
+    assert page_type(API_URL) == 'api'
+    assert page_type('https://arxiv.org/list/cs.AI/new') == 'listing'
+    assert page_type('https://arxiv.org/abs/2501.00001') == 'abstract'
+    middleware, _ = make_middleware()
+    assert respond(middleware).meta['download_slot'] == 'export.arxiv.org:api'
+
+
+@pytest.mark.parametrize('budgets', [
+    None,
+    # 配置中没有api预算，或者把api预算配得过于激进，都不能突破3秒/单连接
+    {'listing': {'concurrency': 2, 'start_delay': 1.0, 'min_delay': 0.5, 'max_delay': 60.0}},
+    {'api': {'concurrency': 4, 'start_delay': 0.5, 'min_delay': 0.1, 'max_delay': 60.0}},
+])
+def test_api_slot_delay_never_below_three_seconds(budgets):
+    middleware, slot = make_middleware(budgets)
+    # 大量快速成功响应会让其他slot提速；再混入变慢、出错和限流后恢复的情况
+    sequence = [(200, 0.01)] * 200 + [(200, 2.5)] * 5 + [(500, 0.01)] * 3 + [(200, 0.01)] * 200
+    for status, latency in sequence:
+        respond(middleware, status, latency)
+        assert slot.delay >= 3.0
+        assert slot.concurrency == 1
+    respond(middleware, 429, headers={'Retry-After': '1'})
+    assert slot.delay >= 3.0
+
+
+def test_spider_download_delay_raises_api_floor():
+    middleware, slot = make_middleware(spider_settings={'DOWNLOAD_DELAY': 5})
+    for _ in range(100):
+        respond(middleware)
+        assert slot.delay >= 5.0
@@ -0,0 +1,23 @@
+import numpy as np
+
+import vector_index
+from tests.test_pipeline import make_item, open_pipeline
+
+
+def test_updated_paper_is_embedded_again(scratch_schema, tmp_path):
+    pipeline, spider, _ = open_pipeline(batch_size=1)
+    pipeline.process_item(make_item('2501.00001', title="Tool-using agents for web navigation"), spider)
+    pipeline.process_item(make_item('2501.00002', title="Protein folding with diffusion models"), spider)
+    vector_index.build(str(tmp_path), log=lambda message: None)
+    before = np.array(vector_index.VectorIndex(str(tmp_path)).vectors)
+
+    pipeline.process_item(make_item('2501.00001', version=2, title="Protein folding with diffusion models"), spider)
+    pipeline.close_spider(spider)
+    assert vector_index.update(str(tmp_path), log=lambda message: None) == 1
+
+    # 新版本原地覆盖原来的一行，不追加重复的论文
+    index = vector_index.VectorIndex(str(tmp_path))
+    assert index.count == 2 and index.ids == ['2501.00001', '2501.00002']
+    assert not np.allclose(index.vectors[0], before[0])
+    assert np.allclose(index.vectors[0], index.vectors[1])
+    assert vector_index.update(str(tmp_path), log=lambda message: None) == 0
@@ -0,0 +1,32 @@
+"""
+arXiv论文id工具函数
+"""
+import re
+
+# 新格式: 2410.12345v2 ；旧格式: cs/0701001v1 、math.GT/0309136
+ARXIV_ID_RE = re.compile(
+    r'(?P<base>\d{4}\.\d{4,5}|[a-z\-]+(?:\.[A-Z]{2})?/\d{7})(?:v(?P<version>\d+))?'
+)
+
+
+def normalize_arxiv_id(text):
+    """去掉前缀和版本号，返回基础id（如 'arXiv:2410.12345v2' -> '2410.12345'）"""
+    match = ARXIV_ID_RE.search(text or '')
+    return match.group('base') if match else (text or '').strip()
+
+
+def parse_arxiv_id(text):
+    """解析带版本号的id，返回 (基础id, 版本号)，没有版本号时版本为None"""
+    match = ARXIV_ID_RE.search(text or '')
+    if not match:
+        return (text or '').strip(), None
+    version = match.group('version')
+    return match.group('base'), int(version) if version else None
+
+
+def encode_arxiv_id(base_id):
+    """把新格式id编码为整数（yymm * 100000 + 序号），旧格式返回None"""
+    yymm, dot, number = base_id.partition('.')
+    if not dot or len(yymm) != 4 or not yymm.isdigit() or not number.isdigit():
+        return None
+    return int(yymm) * 100000 + int(number)
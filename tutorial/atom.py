@@ -0,0 +1,44 @@
+"""
+arXiv导出API（Atom格式）的流式解析
+
+用iterparse逐个处理<entry>，处理完立即清理节点，内存占用与单页大小无关。
+"""
+import xml.etree.ElementTree as ET
+
+from tutorial.arxiv_ids import parse_arxiv_id
+
+ATOM = '{http://www.w3.org/2005/Atom}'
+ARXIV = '{http://arxiv.org/schemas/atom}'
+
+
+def _text(element, tag):
+    child = element.find(tag)
+    return ' '.join(child.text.split()) if child is not None and child.text else ''
+
+
+def parse_atom_feed(source):
+    """解析Atom feed（文件路径或二进制文件对象），逐条返回论文字典
+
+    返回字段: id, version, title, authors, abstract, categories,
+    primary_category, published, updated
+    """
+    for _, element in ET.iterparse(source, events=('end',)):
+        if element.tag != f'{ATOM}entry':
+            continue
+
+        paper_id, version = parse_arxiv_id(_text(element, f'{ATOM}id').rsplit('/abs/', 1)[-1])
+        primary = element.find(f'{ARXIV}primary_category')
+        categories = [c.get('term') for c in element.findall(f'{ATOM}category') if c.get('term')]
+
+        yield {
+            'id': paper_id,
+            'version': version,
+            'title': _text(element, f'{ATOM}title'),
+            'authors': ', '.join(_text(author, f'{ATOM}name') for author in element.findall(f'{ATOM}author')),
+            'abstract': _text(element, f'{ATOM}summary'),
+            'categories': categories,
+            'primary_category': primary.get('term') if primary is not None else (categories[0] if categories else ''),
+            'published': _text(element, f'{ATOM}published'),
+            'updated': _text(element, f'{ATOM}updated'),
+        }
+        element.clear()
@@ -0,0 +1,144 @@
+"""
+arXiv页面的HTTP缓存
+
+- CompressedLRUCacheStorage: 响应压缩后存入本地SQLite文件，总大小超过
+  HTTPCACHE_MAX_BYTES时按最近访问时间淘汰
+- ArxivCachePolicy: 摘要页内容不会变化，直接使用缓存；列表页在
+  HTTPCACHE_LISTING_MAX_AGE秒内直接使用缓存，过期后带If-None-Match/
+  If-Modified-Since条件请求重新验证
+- ArxivHttpCacheMiddleware: 在Scrapy自带统计（hit/miss/revalidate）之外
+  记录缓存节省的字节数
+"""
+import os
+import pickle
+import sqlite3
+import time
+import zlib
+
+from scrapy.downloadermiddlewares.httpcache import HttpCacheMiddleware
+from scrapy.extensions.httpcache import RFC2616Policy
+from scrapy.http.headers import Headers
+from scrapy.responsetypes import responsetypes
+from scrapy.utils.project import data_path
+
+
+class ArxivCachePolicy(RFC2616Policy):
+    def __init__(self, settings):
+        super().__init__(settings)
+        self.listing_max_age = settings.getint('HTTPCACHE_LISTING_MAX_AGE', 3600)
+
+    @staticmethod
+    def is_abstract_page(request):
+        return '/abs/' in request.url
+
+    def should_cache_response(self, response, request):
+        if response.status == 200:
+            return True
+        return super().should_cache_response(response, request)
+
+    def is_cached_response_fresh(self, cachedresponse, request):
+        if self.is_abstract_page(request):
+            return True
+
+        age = time.time() - request.meta.get('cache_timestamp', 0)
+        if age < self.listing_max_age:
+            return True
+
+        # 列表页已过期：带上ETag/Last-Modified做条件请求
+        self._set_conditional_validators(request, cachedresponse)
+        return False
+
+
+class ArxivHttpCacheMiddleware(HttpCacheMiddleware):
+    # 新版Scrapy不再向中间件传spider参数，旧版会传，这里原样转发
+    def process_request(self, request, spider=None):
+        response = super().process_request(request, *filter(None, [spider]))
+        if response is not None:
+            self.stats.inc_value('httpcache/bytes_saved', len(response.body))
+        return response
+
+    def process_response(self, request, response, spider=None):
+        result = super().process_response(request, response, *filter(None, [spider]))
+        if response.status == 304 and result is not response:
+            self.stats.inc_value('httpcache/bytes_saved', len(result.body))
+        return result
+
+
+class CompressedLRUCacheStorage:
+    def __init__(self, settings):
+        self.cachedir = data_path(settings['HTTPCACHE_DIR'], createdir=True)
+        self.expiration_secs = settings.getint('HTTPCACHE_EXPIRATION_SECS')
+        self.max_bytes = settings.getint('HTTPCACHE_MAX_BYTES', 200 * 1024 * 1024)
+        self.db = None
+        self.total_bytes = 0
+
+    def open_spider(self, spider):
+        self.db = sqlite3.connect(os.path.join(self.cachedir, f"{spider.name}.sqlite3"))
+        self.db.execute("""
+            CREATE TABLE IF NOT EXISTS responses(
+                key TEXT PRIMARY KEY,
+                stored_at REAL NOT NULL,
+                accessed_at REAL NOT NULL,
+                size INTEGER NOT NULL,
+                data BLOB NOT NULL
+            )
+        """)
+        self.db.execute("CREATE INDEX IF NOT EXISTS idx_responses_accessed ON responses(accessed_at)")
+        self.total_bytes = self.db.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+        self._fingerprinter = spider.crawler.request_fingerprinter
+        spider.logger.info(f"HTTP缓存: {self.total_bytes / 1024 / 1024:.1f} MB / {self.max_bytes / 1024 / 1024:.0f} MB")
+
+    def close_spider(self, spider):
+        self.db.commit()
+        self.db.close()
+
+    def _key(self, request):
+        return self._fingerprinter.fingerprint(request).hex()
+
+    def retrieve_response(self, spider, request):
+        key = self._key(request)
+        row = self.db.execute("SELECT stored_at, data FROM responses WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            return None
+        stored_at, blob = row
+        if 0 < self.expiration_secs < time.time() - stored_at:
+            return None
+
+        self.db.execute("UPDATE responses SET accessed_at = ? WHERE key = ?", (time.time(), key))
+        data = pickle.loads(zlib.decompress(blob))
+        request.meta['cache_timestamp'] = stored_at
+        headers = Headers(data['headers'])
+        respcls = responsetypes.from_args(headers=headers, url=data['url'], body=data['body'])
+        return respcls(url=data['url'], headers=headers, status=data['status'], body=data['body'])
+
+    def store_response(self, spider, request, response):
+        key = self._key(request)
+        blob = zlib.compress(pickle.dumps({
+            'url': response.url,
+            'status': response.status,
+            'headers': dict(response.headers),
+            'body': response.body,
+        }, protocol=4), 6)
+
+        old = self.db.execute("SELECT size FROM responses WHERE key = ?", (key,)).fetchone()
+        now = time.time()
+        self.db.execute(
+            "INSERT OR REPLACE INTO responses (key, stored_at, accessed_at, size, data) VALUES (?, ?, ?, ?, ?)",
+            (key, now, now, len(blob), blob)
+        )
+        self.total_bytes += len(blob) - (old[0] if old else 0)
+        if self.total_bytes > self.max_bytes:
+            self._evict()
+        self.db.commit()
+
+    def _evict(self):
+        """按最近访问时间淘汰，直到总大小降到上限的90%"""
+        target = self.max_bytes * 0.9
+        rows = self.db.execute("SELECT key, size FROM responses ORDER BY accessed_at").fetchall()
+        evicted = []
+        for key, size in rows:
+            if self.total_bytes <= target:
+                break
+            evicted.append((key,))
+            self.total_bytes -= size
+        self.db.executemany("DELETE FROM responses WHERE key = ?", evicted)
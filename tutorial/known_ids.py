@@ -0,0 +1,75 @@
+"""
+已入库论文id的紧凑集合
+
+新格式id编码为int64后存入有序数组，用二分查找判断是否存在，
+另用一个平行的数组保存已入库的版本号（没有记录时为0），每个id只占10字节，
+几百万篇论文也只需几十MB；旧格式id数量很少，放在普通dict中。
+"""
+from array import array
+from bisect import bisect_left
+
+from tutorial.arxiv_ids import encode_arxiv_id, normalize_arxiv_id
+
+
+class KnownIdSet:
+    def __init__(self, ids=()):
+        """ids: 论文id，或 (论文id, 版本号) 对"""
+        self.codes = array('q')
+        self.versions = array('H')
+        self.others = {}
+        for entry in ids:
+            paper_id, version = entry if isinstance(entry, tuple) else (entry, None)
+            self._append(paper_id, version)
+        self._finish()
+
+    @classmethod
+    def from_database(cls, connection, itersize=50000):
+        """用服务端游标分批读取全部已入库的id和版本号（paper_ids，包括已归档分区中的论文）"""
+        known = cls()
+        with connection.cursor(name='known_paper_ids') as cursor:
+            cursor.itersize = itersize
+            cursor.execute('SELECT id, version FROM paper_ids ORDER BY id COLLATE "C";')
+            for paper_id, version in cursor:
+                known._append(paper_id, version)
+        known._finish()
+        return known
+
+    def _append(self, paper_id, version):
+        base_id = normalize_arxiv_id(paper_id)
+        code = encode_arxiv_id(base_id)
+        if code is None:
+            self.others[base_id] = max(self.others.get(base_id, 0), version or 0)
+        else:
+            self.codes.append(code)
+            self.versions.append(version or 0)
+
+    def _finish(self):
+        # 按id排序读取时已经有序，这里只在必要时重新排序并去重（同一id保留最大的版本号）
+        codes = self.codes
+        if any(codes[i] >= codes[i + 1] for i in range(len(codes) - 1)):
+            latest = {}
+            for code, version in zip(codes, self.versions):
+                latest[code] = max(latest.get(code, 0), version)
+            self.codes = array('q', sorted(latest))
+            self.versions = array('H', (latest[code] for code in self.codes))
+
+    def version(self, paper_id):
+        """已入库论文的版本号（没有记录版本时为0），未入库时返回None"""
+        base_id = normalize_arxiv_id(paper_id)
+        code = encode_arxiv_id(base_id)
+        if code is None:
+            return self.others.get(base_id)
+        i = bisect_left(self.codes, code)
+        if i < len(self.codes) and self.codes[i] == code:
+            return self.versions[i]
+        return None
+
+    def __contains__(self, paper_id):
+        return self.version(paper_id) is not None
+
+    def __len__(self):
+        return len(self.codes) + len(self.others)
+
+    @property
+    def nbytes(self):
+        return self.codes.itemsize * len(self.codes) + self.versions.itemsize * len(self.versions)
@@ -0,0 +1,162 @@
+"""
+自适应下载调度
+
+列表页、摘要页和导出API分别放入独立的下载slot，各自有并发和延迟预算。
+导出API（export.arxiv.org/api/）要求单连接、请求间隔至少3秒：它的slot只会在此基础上降速，
+下限还会取爬虫自己设置的DOWNLOAD_DELAY（二者中较大的）。
+根据观察到的响应延迟和错误率调整每个slot的并发数和下载延迟：
+响应快且没有错误时逐步提速，变慢或出错时降速，收到429/503时按
+Retry-After暂停该slot。当前状态写入Scrapy统计（throttle/<类型>/...）。
+"""
+import time
+from email.utils import parsedate_to_datetime
+from urllib.parse import urlparse
+
+from scrapy.exceptions import NotConfigured
+
+DEFAULT_BUDGETS = {
+    'listing': {'concurrency': 2, 'start_delay': 1.0, 'min_delay': 0.5, 'max_delay': 60.0},
+    'abstract': {'concurrency': 4, 'start_delay': 1.0, 'min_delay': 0.25, 'max_delay': 60.0},
+    'api': {'concurrency': 1, 'start_delay': 3.0, 'min_delay': 3.0, 'max_delay': 60.0},
+}
+# arXiv导出API的使用条款：同一时间一个连接，请求间隔不少于3秒，任何预算配置都不能突破
+API_MIN_DELAY = 3.0
+
+
+def page_type(url):
+    """按URL区分列表页、摘要页和导出API"""
+    path = urlparse(url).path
+    if path.startswith('/abs/'):
+        return 'abstract'
+    if path.startswith('/list/'):
+        return 'listing'
+    if path.startswith('/api/'):
+        return 'api'
+    return None
+
+
+def parse_retry_after(value, now=None):
+    """解析Retry-After（秒数或HTTP日期），返回需要等待的秒数"""
+    if not value:
+        return None
+    value = value.decode() if isinstance(value, bytes) else value
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - (now or time.time()))
+    except (TypeError, ValueError):
+        return None
+
+
+class SlotState:
+    def __init__(self, budget):
+        self.max_concurrency = budget['concurrency']
+        self.min_delay = budget['min_delay']
+        self.max_delay = budget['max_delay']
+        self.delay = budget['start_delay']
+        # 从1个并发开始，响应正常时逐步增加到预算上限
+        self.concurrency = 1
+        self.successes = 0
+        self.paused_until = 0.0
+
+
+class AdaptiveThrottleMiddleware:
+    def __init__(self, crawler):
+        settings = crawler.settings
+        if not settings.getbool('ADAPTIVE_THROTTLE_ENABLED'):
+            raise NotConfigured
+        self.crawler = crawler
+        self.stats = crawler.stats
+        self.target_latency = settings.getfloat('ADAPTIVE_THROTTLE_TARGET_LATENCY', 1.0)
+        self.increase_after = settings.getint('ADAPTIVE_THROTTLE_INCREASE_AFTER', 5)
+        budgets = {**DEFAULT_BUDGETS, **(settings.getdict('ADAPTIVE_THROTTLE_BUDGETS') or {})}
+        self.budgets = {kind: {**DEFAULT_BUDGETS.get(kind, {}), **budget} for kind, budget in budgets.items()}
+        api_floor = max(API_MIN_DELAY, settings.getfloat('DOWNLOAD_DELAY'))
+        api = self.budgets['api']
+        api.update(concurrency=1, min_delay=max(api['min_delay'], api_floor),
+                   start_delay=max(api['start_delay'], api_floor), max_delay=max(api['max_delay'], api_floor))
+        self.states = {}
+
+    @classmethod
+    def from_crawler(cls, crawler):
+        return cls(crawler)
+
+    def _slot(self, key):
+        return self.crawler.engine.downloader.slots.get(key)
+
+    def _apply(self, kind, key):
+        """把状态写入Scrapy的下载slot并更新统计"""
+        state = self.states[kind]
+        slot = self._slot(key)
+        if slot is not None:
+            slot.delay = max(state.min_delay, state.delay, state.paused_until - time.time())
+            slot.concurrency = state.concurrency
+            slot.randomize_delay = False
+        self.stats.set_value(f'throttle/{kind}/delay', round(state.delay, 3))
+        self.stats.set_value(f'throttle/{kind}/concurrency', state.concurrency)
+
+    def process_request(self, request, spider=None):
+        kind = page_type(request.url)
+        if kind is None or kind not in self.budgets:
+            return None
+        key = request.meta.setdefault('download_slot', f"{urlparse(request.url).hostname}:{kind}")
+        if kind not in self.states:
+            self.states[kind] = SlotState(self.budgets[kind])
+        self._apply(kind, key)
+        return None
+
+    def process_response(self, request, response, spider=None):
+        kind = page_type(request.url)
+        if kind not in self.states or 'cached' in response.flags:
+            return response
+        state = self.states[kind]
+
+        if response.status in (429, 503):
+            retry_after = parse_retry_after(response.headers.get('Retry-After'))
+            self.stats.inc_value(f'throttle/{kind}/throttled')
+            state.delay = min(state.max_delay, max(state.delay * 2, retry_after or 0))
+            state.concurrency = max(1, state.concurrency // 2)
+            state.successes = 0
+            if retry_after:
+                state.paused_until = time.time() + retry_after
+        elif response.status >= 500:
+            self._on_error(kind)
+        else:
+            self._on_success(kind, request.meta.get('download_latency'))
+
+        self._apply(kind, request.meta.get('download_slot'))
+        return response
+
+    def process_exception(self, request, exception, spider=None):
+        kind = page_type(request.url)
+        if kind in self.states:
+            self._on_error(kind)
+            self._apply(kind, request.meta.get('download_slot'))
+        return None
+
+    def _on_error(self, kind):
+        state = self.states[kind]
+        self.stats.inc_value(f'throttle/{kind}/errors')
+        state.delay = min(state.max_delay, state.delay * 1.5)
+        state.concurrency = max(1, state.concurrency - 1)
+        state.successes = 0
+
+    def _on_success(self, kind, latency):
+        state = self.states[kind]
+        if latency is None:
+            return
+        if latency > self.target_latency * 2:
+            # 服务器变慢：减少并发，延迟向观察到的延迟靠拢
+            state.concurrency = max(1, state.concurrency - 1)
+            state.delay = min(state.max_delay, max(state.min_delay, (state.delay + latency) / 2))
+            state.successes = 0
+            return
+
+        state.successes += 1
+        if latency <= self.target_latency and state.successes >= self.increase_after:
+            # 连续正常响应：提高并发并缩短延迟
+            state.concurrency = min(state.max_concurrency, state.concurrency + 1)
+            state.delay = max(state.min_delay, state.delay * 0.75)
+            state.successes = 0
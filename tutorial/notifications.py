@@ -0,0 +1,189 @@
+"""
+新论文通知的后台分发器
+
+管道只负责把消息放进有界队列，真正的HTTP请求由后台线程池完成，
+避免Telegram的网络延迟阻塞Twisted reactor和整个爬取过程。
+"""
+import logging
+import queue
+import threading
+import time
+
+import requests
+from requests.adapters import HTTPAdapter
+
+logger = logging.getLogger(__name__)
+
+# 队列关闭标记
+_STOP = object()
+
+
+class RetryAfter(Exception):
+    """通道要求至少等待retry_after秒后再发送（如Telegram的HTTP 429）"""
+
+    def __init__(self, retry_after):
+        super().__init__(f"rate limited, retry after {retry_after}s")
+        self.retry_after = retry_after
+
+
+class RateLimiter:
+    """简单的最小间隔限速器（线程安全）"""
+
+    def __init__(self, min_interval):
+        self.min_interval = min_interval
+        self.next_time = 0.0
+        self.lock = threading.Lock()
+
+    def wait(self):
+        with self.lock:
+            now = time.monotonic()
+            delay = self.next_time - now
+            self.next_time = max(now, self.next_time) + self.min_interval
+        if delay > 0:
+            time.sleep(delay)
+
+    def pause(self, seconds):
+        """seconds秒内不再放行任何请求（所有工作线程共同遵守）"""
+        with self.lock:
+            self.next_time = max(self.next_time, time.monotonic() + seconds)
+
+
+class TelegramChannel:
+    """Telegram通知通道，复用同一个HTTP连接池"""
+
+    name = "telegram"
+
+    def __init__(self, token, chat_id, api_base="https://api.telegram.org", min_interval=1.0, timeout=10):
+        self.url = f"{api_base.rstrip('/')}/bot{token}/sendMessage"
+        self.chat_id = chat_id
+        self.timeout = timeout
+        self.limiter = RateLimiter(min_interval)
+        self.session = requests.Session()
+        self.session.mount("http://", HTTPAdapter(pool_maxsize=4))
+        self.session.mount("https://", HTTPAdapter(pool_maxsize=4))
+        self.session.headers.update({
+            "accept": "application/json",
+            "User-Agent": "Telegram Bot SDK - (https://github.com/irazasyed/telegram-bot-sdk)",
+            "content-type": "application/json"
+        })
+
+    def send(self, message):
+        payload = {
+            "text": message,
+            "disable_web_page_preview": False,
+            "disable_notification": False,
+            "reply_to_message_id": None,
+            "chat_id": self.chat_id
+        }
+        response = self.session.post(self.url, json=payload, timeout=self.timeout)
+        if response.status_code == 429:
+            raise RetryAfter(self._retry_after(response))
+        response.raise_for_status()
+
+    @staticmethod
+    def _retry_after(response):
+        """Telegram在 parameters.retry_after 中给出等待秒数，没有时看Retry-After响应头"""
+        try:
+            return float(response.json()["parameters"]["retry_after"])
+        except (ValueError, KeyError, TypeError):
+            pass
+        try:
+            return float(response.headers.get("Retry-After", 1))
+        except ValueError:
+            return 1.0
+
+    def close(self):
+        self.session.close()
+
+
+class NotificationDispatcher:
+    """有界队列 + 工作线程池的通知分发器
+
+    submit() 从不阻塞：队列满时直接丢弃消息并计数。
+    每个通道有独立的限速器，发送失败按指数退避重试；通道返回RetryAfter时
+    暂停该通道的限速器，至少等待服务端要求的时间后再重试。
+    close() 会等待队列中剩余的消息发送完毕（最多等待drain_timeout秒）。
+    """
+
+    def __init__(self, channels, queue_size=1000, workers=2, max_retries=3, backoff=2.0, drain_timeout=60):
+        self.channels = {channel.name: channel for channel in channels}
+        self.queue = queue.Queue(maxsize=queue_size)
+        self.workers = workers
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.drain_timeout = drain_timeout
+        self.threads = []
+        self.counts = {}
+        self.counts_lock = threading.Lock()
+
+    def start(self):
+        for i in range(self.workers):
+            thread = threading.Thread(target=self._worker, name=f"notify-{i}", daemon=True)
+            thread.start()
+            self.threads.append(thread)
+
+    def submit(self, channel_name, message):
+        """把消息放入队列，返回是否成功入队"""
+        if channel_name not in self.channels:
+            return False
+        try:
+            self.queue.put_nowait((channel_name, message))
+            return True
+        except queue.Full:
+            self._count(channel_name, "dropped")
+            logger.warning(f"通知队列已满，丢弃{channel_name}消息")
+            return False
+
+    def _count(self, channel_name, key):
+        with self.counts_lock:
+            name = f"{channel_name}/{key}"
+            self.counts[name] = self.counts.get(name, 0) + 1
+
+    def _worker(self):
+        while True:
+            job = self.queue.get()
+            try:
+                if job is _STOP:
+                    return
+                self._deliver(*job)
+            finally:
+                self.queue.task_done()
+
+    def _deliver(self, channel_name, message):
+        channel = self.channels[channel_name]
+        for attempt in range(self.max_retries + 1):
+            channel.limiter.wait()
+            try:
+                channel.send(message)
+                self._count(channel_name, "sent")
+                return
+            except Exception as e:
+                if attempt >= self.max_retries:
+                    self._count(channel_name, "failed")
+                    logger.error(f"{channel_name}通知发送失败（已重试{attempt}次）: {e}")
+                    return
+                self._count(channel_name, "retried")
+                if isinstance(e, RetryAfter):
+                    # 下一轮的limiter.wait()会等到暂停结束
+                    self._count(channel_name, "rate_limited")
+                    logger.warning(f"{channel_name}限流，{e.retry_after}秒后重试")
+                    channel.limiter.pause(e.retry_after)
+                else:
+                    time.sleep(self.backoff * (2 ** attempt))
+
+    def close(self):
+        """发送完队列中剩余的消息后停止工作线程"""
+        deadline = time.monotonic() + self.drain_timeout
+        for _ in self.threads:
+            try:
+                self.queue.put(_STOP, timeout=max(0.0, deadline - time.monotonic()))
+            except queue.Full:
+                break
+        for thread in self.threads:
+            thread.join(max(0.0, deadline - time.monotonic()))
+        unfinished = self.queue.qsize()
+        if unfinished:
+            logger.warning(f"通知队列未在{self.drain_timeout}秒内发送完毕，剩余 {unfinished} 条")
+        for channel in self.channels.values():
+            channel.close()
+        return dict(self.counts)
@@ -1,140 +1,293 @@
-import psycopg2
-from requests import post
-import tweepy
+import psycopg2.extras
 import sys
 import os
 
 # 添加项目根目录到Python路径
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-from config import DB_CONFIG, TELEGRAM_CONFIG, TWITTER_CONFIG
-
-def send_message_to_telegram(message):
-    """发送消息到Telegram（如果配置了的话）"""
-    if not TELEGRAM_CONFIG['token'] or not TELEGRAM_CONFIG['group_id']:
-        print("Telegram未配置，跳过通知")
-        return
-    
-    url = f"https://api.telegram.org/bot{TELEGRAM_CONFIG['token']}/sendMessage"
-    payload = {
-        "text": message,
-        "disable_web_page_preview": False,
-        "disable_notification": False,
-        "reply_to_message_id": None,
-        "chat_id": TELEGRAM_CONFIG['group_id']
-    }
-    headers = {
-        "accept": "application/json",
-        "User-Agent": "Telegram Bot SDK - (https://github.com/irazasyed/telegram-bot-sdk)",
-        "content-type": "application/json"
-    }
-    
-    try:
-        response = post(url, json=payload, headers=headers)
-        print(f"Telegram通知发送成功: {response.status_code}")
-    except Exception as e:
-        print(f"Telegram通知发送失败: {e}")
-
-def post_on_tweet(message):
-    """发布到Twitter（如果配置了的话）"""
-    try:
-        # 检查Twitter配置是否存在
-        if not hasattr(config, 'TWITTER_CONFIG') or not TWITTER_CONFIG:
-            print("Twitter未配置，跳过发布")
-            return
-            
-        # 检查必要的配置项
-        required_keys = ['consumer_key', 'consumer_secret', 'access_token', 'access_secret']
-        if not all(key in TWITTER_CONFIG and TWITTER_CONFIG[key] for key in required_keys):
-            print("Twitter配置不完整，跳过发布")
-            return
-    except:
-        print("Twitter未配置，跳过发布")
-        return
-    
-    try:
-        client = tweepy.Client(
-            consumer_key=TWITTER_CONFIG['consumer_key'],
-            consumer_secret=TWITTER_CONFIG['consumer_secret'],
-            access_token=TWITTER_CONFIG['access_token'],
-            access_token_secret=TWITTER_CONFIG['access_secret']
-        )
-        response = client.create_tweet(text=message)
-        print("Twitter发布成功")
-    except Exception as e:
-        print(f"Twitter发布失败: {e}")
+import db
+import migrations
+import partitions
+from config import TELEGRAM_CONFIG
+from tutorial.notifications import NotificationDispatcher, TelegramChannel
+from tutorial.signals import paper_stored
 
 class PostgresNoDuplicatesPipeline:
-    """PostgreSQL数据库管道，避免重复数据"""
-    
-    def open_spider(self, spider):
-        # 使用配置文件连接数据库
-        self.connection = psycopg2.connect(
-            host=DB_CONFIG['host'],
-            user=DB_CONFIG['user'],
-            password=DB_CONFIG['password'],
-            database=DB_CONFIG['database'],
-            port=DB_CONFIG['port']
+    """PostgreSQL数据库管道，避免重复数据
+
+    启动时执行数据库迁移（migrations.py）。papers按月分区，写入前由partitions.ensure
+    创建对应月份的分区；id的全局唯一由paper_ids上的触发器保证，已存在的id会被跳过。
+    默认使用批量模式：论文先进入缓冲区，按数量（PAPERS_BATCH_SIZE）或时间
+    （PAPERS_BATCH_INTERVAL秒）凑成一批，用一条多行
+    INSERT ... ON CONFLICT DO NOTHING RETURNING id 写入并只提交一次。
+    RETURNING返回的id就是真正新增的论文，新论文通知只针对这些id发送。
+    已入库论文的新版本（version更大）在同一事务中覆盖库中的记录（id和added_at不变），
+    计入 papers/updated，不发送新论文通知。
+    PAPERS_BATCH_SIZE <= 1 时退回逐条处理模式。
+
+    通知由后台NotificationDispatcher发送，process_item不会等待网络请求。
+    新论文只通知到Telegram；推文由automated_paper_bot.py经发布队列（post_outbox.py）统一发布。
+    """
+
+    def __init__(self, batch_size=100, batch_interval=5.0, settings=None):
+        self.batch_size = batch_size
+        self.batch_interval = batch_interval
+        self.settings = settings or {}
+        self.buffer = {}
+        self.flush_loop = None
+        self.dispatcher = None
+        self.stats = None
+        self.crawler = None
+
+    @classmethod
+    def from_crawler(cls, crawler):
+        pipeline = cls(
+            batch_size=crawler.settings.getint('PAPERS_BATCH_SIZE', 100),
+            batch_interval=crawler.settings.getfloat('PAPERS_BATCH_INTERVAL', 5.0),
+            settings=crawler.settings
+        )
+        pipeline.stats = crawler.stats
+        pipeline.crawler = crawler
+        return pipeline
+
+    def _build_dispatcher(self, spider):
+        """根据配置创建通知通道，没有任何通道时不启动分发器"""
+        channels = []
+        if TELEGRAM_CONFIG['token'] and TELEGRAM_CONFIG['group_id']:
+            channels.append(TelegramChannel(
+                TELEGRAM_CONFIG['token'],
+                TELEGRAM_CONFIG['group_id'],
+                api_base=TELEGRAM_CONFIG['api_base'],
+                min_interval=float(self.settings.get('NOTIFY_TELEGRAM_INTERVAL', 1.0))
+            ))
+        else:
+            spider.logger.info("Telegram未配置，跳过通知")
+
+        if not channels:
+            return None
+        dispatcher = NotificationDispatcher(
+            channels,
+            queue_size=int(self.settings.get('NOTIFY_QUEUE_SIZE', 1000)),
+            workers=int(self.settings.get('NOTIFY_WORKERS', 2)),
+            max_retries=int(self.settings.get('NOTIFY_MAX_RETRIES', 3)),
+            drain_timeout=float(self.settings.get('NOTIFY_DRAIN_TIMEOUT', 60))
         )
+        dispatcher.start()
+        return dispatcher
+
+    def open_spider(self, spider):
+        # 把数据库升级到当前表结构（已是最新时只检查schema_migrations）
+        migrations.ensure_schema(log=spider.logger.info)
+
+        # 从共享连接池取一个连接，整个爬取期间由管道独占
+        self.connection = db.acquire()
         
         # 创建游标
         self.cur = self.connection.cursor()
-        
-        # 创建表（如果不存在）
-        self.cur.execute("""
-        CREATE TABLE IF NOT EXISTS papers(
-            SN serial PRIMARY KEY, 
-            id text,
-            category text,
-            title text,
-            authors text,
-            abstract text,
-            url text,
-            added_at date
-        );
-        """)
-        self.connection.commit()
-        spider.logger.info("数据库连接已建立")
+
+        self.dispatcher = self._build_dispatcher(spider)
+
+        self.batch_mode = self.batch_size > 1
+        if self.batch_mode and self.batch_interval > 0:
+            from twisted.internet import task
+            self.flush_loop = task.LoopingCall(self._flush, spider)
+            self.flush_loop.start(self.batch_interval, now=False)
+
+        spider.logger.info(
+            f"数据库连接已建立（{'批量模式, 每批' + str(self.batch_size) + '篇' if self.batch_mode else '逐条模式'}）"
+        )
 
     def process_item(self, item, spider):
+        if not self.batch_mode:
+            return self._process_item_single(item, spider)
+
+        # 同一批次内按id去重，保留先到的一条
+        self.buffer.setdefault(item["id"], item)
+        if len(self.buffer) >= self.batch_size:
+            self._flush(spider)
+        return item
+
+    def _process_item_single(self, item, spider):
         # 检查是否已存在
         paper_id = item["id"]
-        self.cur.execute("SELECT * FROM papers WHERE id = %s;", (paper_id,))
+        self.cur.execute("SELECT 1 FROM papers WHERE id = %s;", (paper_id,))
         result = self.cur.fetchone()
 
         if result:
-            spider.logger.info(f"论文已存在于数据库: {item['id']}")
+            if self._update_versions([item]):
+                self.connection.commit()
+                spider.logger.info(f"论文已更新到v{item['version']}: {item['id']}")
+                if self.stats:
+                    self.stats.inc_value('papers/updated', spider=spider)
+            else:
+                spider.logger.info(f"论文已存在于数据库: {item['id']}")
         else:
-            # 插入新数据
+            # 插入新数据（papers按月分区，先确保该月的分区存在）
+            partitions.ensure(self.connection, [item["added_at"]])
             self.cur.execute(
                 """
-                INSERT INTO papers (id, category, title, authors, abstract, url, added_at)
-                VALUES (%s, %s, %s, %s, %s, %s, %s)
+                INSERT INTO papers (id, category, categories, version, title, authors, abstract, url, added_at)
+                VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s)
                 """,
-                (
-                    item["id"],
-                    item["category"],
-                    item["title"],
-                    item["authors"],
-                    item["abstract"],
-                    item["url"],
-                    item["added_at"]
-                )
+                self._row(item)
             )
             self.connection.commit()
             spider.logger.info(f"新论文已保存: {item['id']} - {item['title'][:50]}...")
-            
-            # 发送通知（如果配置了的话）
-            notification_message = f"新论文: {item['title']}\n作者: {item['authors']}\n摘要: {item['abstract'][:200]}...\n链接: {item['url']}"
-            send_message_to_telegram(notification_message)
-            
-            tweet_message = f"{item['title'][:100]}... by {item['authors'][:50]} {item['url']}"
-            post_on_tweet(tweet_message)
+            self._on_new_paper(item, spider)
         
         return item
 
+    def _flush(self, spider):
+        """把缓冲区中的论文一次性写入数据库，返回新增论文列表
+
+        整批写入失败时（某一行数据有问题、分区错误、连接断开）回滚后逐条重试，
+        只有逐条写入仍然失败的论文才会被丢弃，并计入 papers/failed 统计。
+        """
+        if not self.buffer:
+            return []
+
+        items = list(self.buffer.values())
+        self.buffer = {}
+        failed = []
+        try:
+            new_ids, updated_ids = self._insert(items)
+        except Exception as e:
+            self._rollback()
+            spider.logger.warning(f"批量写入失败（{len(items)}篇），改为逐条写入: {e}")
+            if self.stats:
+                self.stats.inc_value('papers/batch_retries', spider=spider)
+            new_ids, updated_ids = set(), set()
+            for item in items:
+                try:
+                    inserted, updated = self._insert([item])
+                    new_ids |= inserted
+                    updated_ids |= updated
+                except Exception as item_error:
+                    self._rollback()
+                    failed.append(item)
+                    spider.logger.error(f"论文写入失败: {item['id']} - {item_error}")
+
+        new_items = [item for item in items if item["id"] in new_ids]
+        duplicates = len(items) - len(new_items) - len(updated_ids) - len(failed)
+        spider.logger.info(f"批量写入 {len(items)} 篇，新增 {len(new_items)} 篇，"
+                           + (f"更新版本 {len(updated_ids)} 篇，" if updated_ids else "")
+                           + f"已存在 {duplicates} 篇"
+                           + (f"，失败 {len(failed)} 篇" if failed else ""))
+        if self.stats:
+            self.stats.inc_value('papers/batches', spider=spider)
+            self.stats.inc_value('papers/inserted', len(new_items), spider=spider)
+            self.stats.inc_value('papers/duplicates', duplicates, spider=spider)
+            if updated_ids:
+                self.stats.inc_value('papers/updated', len(updated_ids), spider=spider)
+            if failed:
+                self.stats.inc_value('papers/failed', len(failed), spider=spider)
+
+        for item in new_items:
+            spider.logger.info(f"新论文已保存: {item['id']} - {item['title'][:50]}...")
+            self._on_new_paper(item, spider)
+        return new_items
+
+    def _insert(self, items):
+        """用一条多行INSERT写入items，已入库论文的新版本覆盖旧记录，提交后返回 (新增id集合, 更新id集合)"""
+        partitions.ensure(self.connection, [item["added_at"] for item in items])
+        with db.timed('insert_papers_batch'):
+            inserted = psycopg2.extras.execute_values(
+                self.cur,
+                """
+                INSERT INTO papers (id, category, categories, version, title, authors, abstract, url, added_at)
+                VALUES %s
+                ON CONFLICT DO NOTHING
+                RETURNING id
+                """,
+                [self._row(item) for item in items],
+                page_size=len(items),
+                fetch=True
+            )
+            new_ids = {row[0] for row in inserted}
+            updated_ids = self._update_versions([item for item in items if item["id"] not in new_ids])
+            self.connection.commit()
+        return new_ids, updated_ids
+
+    def _update_versions(self, items):
+        """已入库的论文版本比items中的旧（或没有记录版本）时用items覆盖，返回被更新的id集合（不提交）
+
+        id和added_at是分区键，保持不变；paper_ids中的版本号由触发器同步。
+        """
+        items = [item for item in items if item.get("version")]
+        if not items:
+            return set()
+        updated = psycopg2.extras.execute_values(
+            self.cur,
+            """
+            UPDATE papers p
+            SET version = v.version, category = v.category, categories = v.categories,
+                title = v.title, authors = v.authors, abstract = v.abstract, url = v.url
+            FROM (VALUES %s) AS v (id, category, categories, version, title, authors, abstract, url)
+            WHERE p.id = v.id AND (p.version IS NULL OR p.version < v.version)
+            RETURNING p.id
+            """,
+            [self._row(item)[:8] for item in items],
+            template="(%s, %s, %s, %s::integer, %s, %s, %s, %s)",
+            page_size=len(items),
+            fetch=True
+        )
+        return {row[0] for row in updated}
+
+    def _rollback(self):
+        """回滚失败的事务；连接已断开时归还给连接池并重新获取一个"""
+        if not self.connection.closed:
+            try:
+                self.connection.rollback()
+                return
+            except psycopg2.Error:
+                pass
+        db.release(self.connection)
+        self.connection = db.acquire()
+        self.cur = self.connection.cursor()
+
+    @staticmethod
+    def _row(item):
+        return (
+            item["id"],
+            item["category"],
+            item.get("categories") or item["category"],
+            item.get("version"),
+            item["title"],
+            item["authors"],
+            item["abstract"],
+            item["url"],
+            item["added_at"]
+        )
+
+    def _on_new_paper(self, item, spider):
+        """论文真正写入数据库后：发出paper_stored信号并发送通知"""
+        if self.crawler:
+            self.crawler.signals.send_catch_log(signal=paper_stored, item=item, spider=spider)
+        self._notify_new_paper(item)
+
+    def _notify_new_paper(self, item):
+        """把新论文通知放入后台队列（如果配置了的话）"""
+        if not self.dispatcher:
+            return
+        notification_message = f"新论文: {item['title']}\n作者: {item['authors']}\n摘要: {item['abstract'][:200]}...\n链接: {item['url']}"
+        self.dispatcher.submit("telegram", notification_message)
+
     def close_spider(self, spider):
-        # 关闭数据库连接
+        # 写入剩余的缓冲数据
+        if self.flush_loop and self.flush_loop.running:
+            self.flush_loop.stop()
+        if self.batch_mode:
+            self._flush(spider)
+
+        # 等待后台通知发送完毕
+        if self.dispatcher:
+            counts = self.dispatcher.close()
+            for key, value in counts.items():
+                if self.stats:
+                    self.stats.set_value(f'notifications/{key}', value, spider=spider)
+            spider.logger.info(f"通知发送统计: {counts}")
+
+        # 把连接归还给连接池
         self.cur.close()
-        self.connection.close()
-        spider.logger.info("数据库连接已关闭")
\ No newline at end of file
+        db.release(self.connection)
+        spider.logger.info("数据库连接已归还")
\ No newline at end of file
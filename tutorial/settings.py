@@ -20,8 +20,60 @@ ITEM_PIPELINES = {
     'tutorial.pipelines.PostgresNoDuplicatesPipeline': 300,
 }
 
+# 启动时加载已入库论文id，跳过这些论文的摘要页请求
+KNOWN_ID_PREFILTER = True
+
+# 增量爬取水位线：漏跑时最多补爬的天数；pastweek每页条数、无水位线时的条数上限、有水位线时的翻页上限
+CRAWL_WATERMARKS = True
+WATERMARK_MAX_DAYS = 14
+PASTWEEK_PAGE_SIZE = 25
+PASTWEEK_MAX_ENTRIES = 100
+WATERMARK_MAX_ENTRIES = 2000
+
+# arxiv_api爬虫：每页条数、最多获取条数、默认时间窗口（天）
+ARXIV_API_PAGE_SIZE = 200
+ARXIV_API_MAX_RESULTS = 2000
+ARXIV_API_DAYS = 2
+
+# 批量写库：每批论文数（<=1 表示逐条写入）和最长缓冲时间（秒）
+PAPERS_BATCH_SIZE = 100
+PAPERS_BATCH_INTERVAL = 5.0
+
+# 后台通知分发：队列长度、工作线程数、重试次数、Telegram最小发送间隔（秒）、关闭时最长等待时间
+NOTIFY_QUEUE_SIZE = 1000
+NOTIFY_WORKERS = 2
+NOTIFY_MAX_RETRIES = 3
+NOTIFY_TELEGRAM_INTERVAL = 1.0
+NOTIFY_DRAIN_TIMEOUT = 60
+
+# HTTP缓存：压缩存储在 .scrapy/httpcache 下，超过上限按LRU淘汰
+# 摘要页直接使用缓存，列表页超过HTTPCACHE_LISTING_MAX_AGE秒后用条件请求重新验证
+HTTPCACHE_ENABLED = True
+HTTPCACHE_DIR = 'httpcache'
+HTTPCACHE_STORAGE = 'tutorial.httpcache.CompressedLRUCacheStorage'
+HTTPCACHE_POLICY = 'tutorial.httpcache.ArxivCachePolicy'
+HTTPCACHE_MAX_BYTES = 200 * 1024 * 1024
+HTTPCACHE_LISTING_MAX_AGE = 3600
+DOWNLOADER_MIDDLEWARES = {
+    'scrapy.downloadermiddlewares.httpcache.HttpCacheMiddleware': None,
+    'tutorial.middlewares.AdaptiveThrottleMiddleware': 560,
+    'tutorial.httpcache.ArxivHttpCacheMiddleware': 900,
+}
+
+# 自适应调度：列表页和摘要页各自的并发/延迟预算，根据响应延迟和429/503自动调整
+# （启用时替代AutoThrottle）
+ADAPTIVE_THROTTLE_ENABLED = True
+ADAPTIVE_THROTTLE_TARGET_LATENCY = 1.0
+ADAPTIVE_THROTTLE_INCREASE_AFTER = 5
+ADAPTIVE_THROTTLE_BUDGETS = {
+    'listing': {'concurrency': 2, 'start_delay': 1.0, 'min_delay': 0.5, 'max_delay': 60.0},
+    'abstract': {'concurrency': 4, 'start_delay': 1.0, 'min_delay': 0.25, 'max_delay': 60.0},
+    # 导出API：单连接，间隔不少于3秒（中间件强制执行这个下限）
+    'api': {'concurrency': 1, 'start_delay': 3.0, 'min_delay': 3.0, 'max_delay': 60.0},
+}
+
 # Enable autothrottling
-AUTOTHROTTLE_ENABLED = True
+AUTOTHROTTLE_ENABLED = not ADAPTIVE_THROTTLE_ENABLED
 AUTOTHROTTLE_START_DELAY = 1
 AUTOTHROTTLE_MAX_DELAY = 60
 AUTOTHROTTLE_TARGET_CONCURRENCY = 1.0
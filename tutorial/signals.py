@@ -0,0 +1,6 @@
+"""
+自定义Scrapy信号
+"""
+
+# 论文新写入数据库时发送，参数: item, spider
+paper_stored = object()
@@ -1,3 +1,4 @@
+import re
 import scrapy
 from urllib.parse import urljoin
 from datetime import datetime, timedelta
@@ -7,52 +8,120 @@ import os
 # 添加项目根目录到Python路径
 sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
 
-from config import DB_CONFIG
+import db
 from tutorial.pipelines import PostgresNoDuplicatesPipeline
+from tutorial.known_ids import KnownIdSet
+from tutorial.arxiv_ids import encode_arxiv_id, parse_arxiv_id
+from tutorial.watermarks import load_watermarks, save_watermarks
+from tutorial.keyword_filter import is_agent_paper
+
+# 摘要页Subjects中的分类代码，如 "Artificial Intelligence (cs.AI)"
+SUBJECT_CODE_RE = re.compile(r'\(([a-z\-]+(?:\.[A-Za-z\-]+)?)\)')
 
 # arXiv分类 - 专注Agent相关领域
 ARXIV_CATEGORIES = ["cs.CL", "cs.AI"]  # 计算语言学和人工智能
 
+def sort_categories(categories):
+    """按ARXIV_CATEGORIES的顺序排序分类，其余分类保持原顺序排在后面"""
+    return sorted(categories, key=lambda c: ARXIV_CATEGORIES.index(c) if c in ARXIV_CATEGORIES else len(ARXIV_CATEGORIES))
+
 class ArxivSpider(scrapy.Spider):
     name = "arxiv"
     allowed_domains = ["arxiv.org"]
 
+    known_ids = None
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        # 本次运行已调度的论文: (基础id, 版本) -> 出现过的分类列表
+        # 同一篇论文在多个分类/列表页中出现时只请求一次摘要页
+        self.seen_papers = {}
+        # 上次爬取的水位线，以及本次在列表页中见到的每个分类的最大id
+        self.watermarks = {}
+        self.max_seen = {}
+
+    def _load_known_ids(self):
+        """启动时加载数据库中已有的论文id，用于在请求摘要页之前过滤"""
+        if not self.settings.getbool('KNOWN_ID_PREFILTER', True):
+            return
+        try:
+            with db.connection() as connection:
+                self.known_ids = KnownIdSet.from_database(connection)
+        except Exception as e:
+            self.logger.warning(f"加载已入库论文id失败，不做预过滤: {e}")
+            return
+
+        self.crawler.stats.set_value('prefilter/known_ids', len(self.known_ids))
+        self.logger.info(f"已加载 {len(self.known_ids)} 个已入库论文id（{self.known_ids.nbytes / 1024:.0f} KB）")
+
+    def _is_stored(self, paper_id, version):
+        """论文已入库，且列表中的版本不比库中的新（列表没有版本号时只看id）"""
+        if self.known_ids is None:
+            return False
+        stored = self.known_ids.version(paper_id)
+        if stored is None:
+            return False
+        if version is not None and version > stored:
+            # 已入库论文的新版本：放行，由管道覆盖库中的记录
+            self.crawler.stats.inc_value('prefilter/new_versions')
+            return False
+        return True
+
+    def _load_watermarks(self):
+        """读取每个分类的水位线，失败时按首次运行处理"""
+        if not self.settings.getbool('CRAWL_WATERMARKS', True):
+            return
+        try:
+            with db.connection() as connection:
+                self.watermarks = load_watermarks(connection)
+        except Exception as e:
+            self.logger.warning(f"读取爬取水位线失败，按默认窗口爬取: {e}")
+
+    def _listing_dates(self, category, today):
+        """需要爬取的日期列表：默认今天和昨天，漏跑时从上次公告日期一直补到今天"""
+        days = 1
+        watermark = self.watermarks.get(category)
+        if watermark:
+            missed = (today.date() - watermark['announce_date']).days
+            days = max(days, min(missed, self.settings.getint('WATERMARK_MAX_DAYS', 14)))
+        return [today - timedelta(days=d) for d in range(days + 1)]
+
+    def _pastweek_request(self, category, skip):
+        page_size = self.settings.getint('PASTWEEK_PAGE_SIZE', 25)
+        url = f"https://arxiv.org/list/{category}/pastweek?skip={skip}&show={page_size}"
+        self.logger.info(f"爬取{category}最近论文: {url}")
+        return scrapy.Request(
+            url=url, 
+            callback=self.parse_listing, 
+            meta={'category': category, 'backup': True, 'target_date': 'recent', 'skip': skip, 'show': page_size}
+        )
+
+    async def start(self):
+        """Scrapy 2.13+ 通过start()获取初始请求，这里复用start_requests()"""
+        for request in self.start_requests():
+            yield request
+
     def start_requests(self):
-        """生成初始请求 - 爬取过去24小时的论文"""
+        """生成初始请求 - 爬取上次水位线之后（默认过去24小时）的论文"""
+        self._load_known_ids()
+        self._load_watermarks()
+
         today = datetime.now()
-        yesterday = today - timedelta(days=1)
-        
-        today_str = today.strftime('%y%m%d')
-        yesterday_str = yesterday.strftime('%y%m%d')
         
         for category in ARXIV_CATEGORIES:
-            # 爬取今天的论文
-            url = f"https://arxiv.org/list/{category}/{today_str}?show=100"
-            self.logger.info(f"爬取{category}今天({today_str})的论文: {url}")
-            yield scrapy.Request(
-                url=url, 
-                callback=self.parse_listing, 
-                meta={'category': category, 'date': today_str, 'target_date': today.strftime('%Y-%m-%d')}
-            )
-            
-            # 爬取昨天的论文
-            url = f"https://arxiv.org/list/{category}/{yesterday_str}?show=100"
-            self.logger.info(f"爬取{category}昨天({yesterday_str})的论文: {url}")
-            yield scrapy.Request(
-                url=url, 
-                callback=self.parse_listing, 
-                meta={'category': category, 'date': yesterday_str, 'target_date': yesterday.strftime('%Y-%m-%d')}
-            )
-            
-            # 爬取最近一周的论文作为补充
-            for skip in range(0, 100, 25):
-                url = f"https://arxiv.org/list/{category}/pastweek?skip={skip}&show=25"
-                self.logger.info(f"爬取{category}最近论文: {url}")
+            # 爬取今天、昨天以及漏跑的日期
+            for day in self._listing_dates(category, today):
+                day_str = day.strftime('%y%m%d')
+                url = f"https://arxiv.org/list/{category}/{day_str}?show=100"
+                self.logger.info(f"爬取{category} {day_str} 的论文: {url}")
                 yield scrapy.Request(
                     url=url, 
                     callback=self.parse_listing, 
-                    meta={'category': category, 'backup': True, 'target_date': 'recent'}
+                    meta={'category': category, 'date': day_str, 'target_date': day.strftime('%Y-%m-%d')}
                 )
+            
+            # 爬取最近一周的论文作为补充，逐页请求直到低于水位线
+            yield self._pastweek_request(category, 0)
 
     def parse_listing(self, response):
         """解析论文列表页面"""
@@ -64,8 +133,32 @@ class ArxivSpider(scrapy.Spider):
 
         self.logger.info(f"在{category}分类中找到 {len(articles)} 篇论文")
 
+        # 记录本页最大id（用于更新水位线），pastweek页面按水位线决定是否翻页
+        page_ids = [parse_arxiv_id(i.split('-')[-1])[0] for i in ids]
+        codes = [code for code in map(encode_arxiv_id, page_ids) if code]
+        if codes and max(codes) > self.max_seen.get(category, (0, ''))[0]:
+            self.max_seen[category] = max((code, paper_id) for code, paper_id in zip(map(encode_arxiv_id, page_ids), page_ids) if code)
+        if response.meta.get('backup'):
+            next_page = self._next_pastweek_page(response, codes)
+            if next_page:
+                yield next_page
+
         for i in range(min(len(articles), len(authors), len(abs_links), len(ids))):
-            paper_id = ids[i].split('-')[-1]
+            paper_id, version = parse_arxiv_id(ids[i].split('-')[-1])
+            if self._is_stored(paper_id, version):
+                # 已入库的论文无需再请求摘要页
+                self.crawler.stats.inc_value('prefilter/requests_saved')
+                continue
+
+            seen_categories = self.seen_papers.get((paper_id, version))
+            if seen_categories is not None:
+                # 交叉列出或重复出现的论文：只记录分类，不再请求摘要页
+                if category not in seen_categories:
+                    seen_categories.append(category)
+                self.crawler.stats.inc_value('dedup/duplicate_listings')
+                continue
+            self.seen_papers[(paper_id, version)] = [category]
+
             article_title = ''.join([t.strip() for t in articles[i].css('::text').getall() if t.strip()])
             author_text = ''.join([a.strip() for a in authors[i].css('::text').getall() if a.strip()])
             abs_url = urljoin(response.url, abs_links[i])
@@ -75,12 +168,50 @@ class ArxivSpider(scrapy.Spider):
                 callback=self.parse_abstract, 
                 meta={
                     "id": paper_id,
+                    'version': version,
                     'title': article_title,
                     'authors': author_text,
                     'category': category
                 }
             )
 
+    def _next_pastweek_page(self, response, codes):
+        """有水位线时一直翻页到整页都不高于水位线为止，否则只翻PASTWEEK_MAX_ENTRIES条"""
+        category = response.meta['category']
+        next_skip = response.meta['skip'] + response.meta['show']
+        watermark = self.watermarks.get(category)
+
+        if not codes:
+            return None
+        if watermark and watermark['max_code']:
+            if max(codes) <= watermark['max_code']:
+                self.logger.info(f"{category}已到达水位线 {watermark['max_id']}，停止翻页")
+                self.crawler.stats.inc_value('watermark/stopped_early')
+                return None
+            limit = self.settings.getint('WATERMARK_MAX_ENTRIES', 2000)
+        else:
+            limit = self.settings.getint('PASTWEEK_MAX_ENTRIES', 100)
+        if next_skip >= limit:
+            return None
+        return self._pastweek_request(category, next_skip)
+
+    def closed(self, reason):
+        """爬取正常结束时前移水位线"""
+        if reason != 'finished' or not self.max_seen or not self.settings.getbool('CRAWL_WATERMARKS', True):
+            return
+        today = datetime.now().date()
+        watermarks = {
+            category: {'max_id': max_id, 'announce_date': today}
+            for category, (_, max_id) in self.max_seen.items()
+        }
+        try:
+            with db.connection() as connection:
+                save_watermarks(connection, watermarks)
+            summary = ', '.join(f"{category}={watermark['max_id']}" for category, watermark in watermarks.items())
+            self.logger.info(f"水位线已更新: {summary}")
+        except Exception as e:
+            self.logger.warning(f"保存爬取水位线失败: {e}")
+
     def parse_abstract(self, response):
         """解析论文摘要页面"""
         abstract_text = ''.join([
@@ -89,40 +220,8 @@ class ArxivSpider(scrapy.Spider):
         
         title = response.meta['title']
         
-        # 检查是否包含Agent相关关键词 - 更严格的筛选
-        # 核心Agent关键词（必须在标题或摘要中出现）
-        core_agent_keywords = [
-            'multi-agent', 'agentic', 'llm agent', 'ai agent', 'autonomous agent',
-            'agent-based', 'intelligent agent', 'conversational agent', 'agent system',
-            'agent framework', 'agent architecture', 'agent interaction', 'agent planning',
-            'agent reasoning', 'agent learning', 'agent coordination', 'agent communication'
-        ]
-        
-        # 标题中的Agent关键词（权重更高）
-        title_agent_keywords = ['agent', 'agents']
-        
-        title_lower = title.lower()
-        abstract_lower = abstract_text.lower()
-        
-        # 检查核心关键词
-        has_core_keyword = any(keyword in title_lower or keyword in abstract_lower 
-                              for keyword in core_agent_keywords)
-        
-        # 检查标题中是否有Agent关键词
-        has_title_agent = any(keyword in title_lower for keyword in title_agent_keywords)
-        
-        # 排除非Agent相关的词汇
-        exclude_keywords = [
-            'user agent', 'software agent', 'web agent', 'browser agent',
-            'reagent', 'magnetic agent', 'contrast agent', 'therapeutic agent',
-            'chemical agent', 'biological agent', 'cleaning agent'
-        ]
-        
-        has_exclude_keyword = any(keyword in title_lower or keyword in abstract_lower 
-                                 for keyword in exclude_keywords)
-        
         # 只有满足条件且不包含排除词汇的论文才处理
-        if not (has_core_keyword or has_title_agent) or has_exclude_keyword:
+        if not is_agent_paper(title, abstract_text):
             self.logger.info(f"跳过非Agent论文: {title[:50]}...")
             return None  # 不处理非Agent论文
         
@@ -131,9 +230,14 @@ class ArxivSpider(scrapy.Spider):
         if target_date == 'recent':
             target_date = datetime.now().strftime('%Y-%m-%d')
         
+        categories = self._merge_categories(response)
+        version = response.meta.get('version') or self._latest_version(response)
+
         result = {
             'id': response.meta['id'],
-            'category': response.meta['category'],
+            'version': version,
+            'category': next((c for c in ARXIV_CATEGORIES if c in categories), response.meta['category']),
+            'categories': ' '.join(categories),
             'title': response.meta['title'],
             'authors': response.meta['authors'],
             'abstract': abstract_text,
@@ -142,4 +246,22 @@ class ArxivSpider(scrapy.Spider):
         }
 
         self.logger.info(f"✅ Agent论文: {result['title'][:50]}...")
-        return result
\ No newline at end of file
+        return result
+
+    def _merge_categories(self, response):
+        """合并列表页中见过的分类和摘要页Subjects中的分类，按ARXIV_CATEGORIES优先排序"""
+        key = (response.meta['id'], response.meta.get('version'))
+        categories = list(self.seen_papers.get(key, [response.meta['category']]))
+        subjects = ' '.join(response.css('td.subjects ::text').getall())
+        for code in SUBJECT_CODE_RE.findall(subjects):
+            if code not in categories:
+                categories.append(code)
+        return sort_categories(categories)
+
+    @staticmethod
+    def _latest_version(response):
+        """从摘要页的提交历史中取最新版本号"""
+        versions = [
+            int(v) for v in re.findall(r'\[v(\d+)\]', ' '.join(response.css('div.submission-history ::text').getall()))
+        ]
+        return max(versions) if versions else None
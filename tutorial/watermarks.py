@@ -0,0 +1,38 @@
+"""
+每个分类的增量爬取水位线
+
+记录每个分类已处理过的最大arXiv id和最近一次成功爬取的公告日期，
+下次爬取时据此决定要补爬哪些日期、列表分页何时停止。
+crawl_watermarks表由migrations.py创建。
+"""
+from tutorial.arxiv_ids import encode_arxiv_id, normalize_arxiv_id
+
+
+def load_watermarks(connection):
+    """返回 {分类: {'max_id': ..., 'max_code': ..., 'announce_date': date}}"""
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT category, max_id, announce_date FROM crawl_watermarks;")
+        return {
+            category: {
+                'max_id': max_id,
+                'max_code': encode_arxiv_id(normalize_arxiv_id(max_id)),
+                'announce_date': announce_date
+            }
+            for category, max_id, announce_date in cursor.fetchall()
+        }
+
+
+def save_watermarks(connection, watermarks):
+    """保存水位线；已有记录只会前移，不会后退"""
+    with connection.cursor() as cursor:
+        for category, watermark in watermarks.items():
+            cursor.execute("""
+                INSERT INTO crawl_watermarks (category, max_id, announce_date, updated_at)
+                VALUES (%s, %s, %s, CURRENT_TIMESTAMP)
+                ON CONFLICT (category) DO UPDATE SET
+                    max_id = CASE WHEN %s COLLATE "C" > crawl_watermarks.max_id COLLATE "C" THEN EXCLUDED.max_id
+                                  ELSE crawl_watermarks.max_id END,
+                    announce_date = GREATEST(crawl_watermarks.announce_date, EXCLUDED.announce_date),
+                    updated_at = CURRENT_TIMESTAMP;
+            """, (category, watermark['max_id'], watermark['announce_date'], watermark['max_id']))
+    connection.commit()
@@ -0,0 +1,314 @@
+#!/usr/bin/env python3
+"""
+本地语义向量索引 - 哈希特征 + TF-IDF + 截断SVD，只用CPU和NumPy
+
+标题+摘要先转换为哈希词/词对特征（与preranker.py相同），乘以IDF权重后
+用随机化截断SVD降到dim维并做L2归一化，向量以float32保存在内存映射文件中，
+查询时一次矩阵乘法算出与全部论文的余弦相似度。
+
+索引目录中的文件:
+    model.npz      IDF权重和SVD投影矩阵 (dim, n_features)（build时在最近的sample_size篇论文上拟合）
+    vectors.f32    (论文数, dim) 的float32矩阵，新论文追加在末尾，论文更新版本后原地覆盖
+    ids.txt        每行一个论文id，与vectors的行一一对应
+    categories.u8  每篇论文的分类编号
+    meta.json      论文数、水位线 (modified_xid, seq)（见db.CHANGED_AFTER）、分类列表和ids.txt的有效长度；
+                   最后写入，中途失败时以它为准
+
+用法:
+    python vector_index.py build                 # 重新拟合模型并为全部论文建索引
+    python vector_index.py update                # 加入新入库和更新了版本的论文（不重新拟合）
+    python vector_index.py topic "tool-using agents" [k]
+    python vector_index.py related <论文id> [k]
+"""
+import json
+import os
+import sys
+import time
+
+import numpy as np
+
+from preranker import hash_features
+
+FILES = ('vectors.f32', 'ids.txt', 'categories.u8')
+
+
+def _dot(matrix, dense_t):
+    """CSR稀疏矩阵 (data, indices, indptr) 乘稠密矩阵，稠密矩阵以转置 (列数, 行数) 的形式传入
+
+    按列计算：每列只需一次一维gather和reduceat，比对二维数组逐行reduceat快。
+    """
+    data, indices, indptr = matrix
+    rows = len(indptr) - 1
+    result = np.zeros((len(dense_t), rows), dtype=np.float32)
+    nonempty = indptr[:-1] < indptr[1:]
+    starts = indptr[:-1][nonempty]
+    if len(starts):
+        for j, column in enumerate(dense_t):
+            result[j, nonempty] = np.add.reduceat(column[indices] * data, starts)
+    return result.T
+
+
+def _transpose(matrix, n_features):
+    """CSR矩阵的转置（同样以CSR表示）"""
+    data, indices, indptr = matrix
+    order = np.argsort(indices, kind='stable')
+    rows = np.repeat(np.arange(len(indptr) - 1), np.diff(indptr))
+    counts = np.bincount(indices, minlength=n_features)
+    return data[order], rows[order].astype(np.int32), np.r_[0, np.cumsum(counts)]
+
+
+def _weighted(matrix, idf):
+    """乘以IDF权重后重新做L2归一化"""
+    data, indices, indptr = matrix
+    data = data * idf[indices]
+    rows = np.repeat(np.arange(len(indptr) - 1), np.diff(indptr))
+    norms = np.sqrt(np.bincount(rows, weights=data * data, minlength=len(indptr) - 1))
+    norms[norms == 0] = 1
+    return (data / norms[rows]).astype(np.float32), indices, indptr
+
+
+def fit(texts, dim=128, n_features=2 ** 16, oversample=10, power_iterations=2, seed=0):
+    """在样本文本上拟合IDF和SVD投影矩阵，返回 (idf, components)，components为 (dim, n_features)"""
+    matrix = hash_features(texts, n_features)
+    document_frequency = np.bincount(matrix[1], minlength=n_features)
+    idf = (np.log((1 + len(texts)) / (1 + document_frequency)) + 1).astype(np.float32)
+    matrix = _weighted(matrix, idf)
+    transposed = _transpose(matrix, n_features)
+
+    # 随机化SVD（Halko等）：先找出矩阵列空间的近似正交基，再在小矩阵上做精确SVD
+    rank = min(dim + oversample, len(texts))
+    omega = np.random.default_rng(seed).standard_normal((rank, n_features)).astype(np.float32)
+    basis, _ = np.linalg.qr(_dot(matrix, omega))
+    for _ in range(power_iterations):
+        projected, _ = np.linalg.qr(_dot(transposed, np.ascontiguousarray(basis.T)))
+        basis, _ = np.linalg.qr(_dot(matrix, np.ascontiguousarray(projected.T)))
+    small = _dot(transposed, np.ascontiguousarray(basis.T)).T   # (rank, n_features) = basis^T X
+    _, _, vt = np.linalg.svd(small, full_matrices=False)
+    return idf, np.ascontiguousarray(vt[:dim].astype(np.float32))
+
+
+def embed(texts, idf, components):
+    """把文本投影为L2归一化的float32向量 (文本数, dim)"""
+    vectors = _dot(_weighted(hash_features(texts, len(idf)), idf), components)
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    norms[norms == 0] = 1
+    return vectors / norms
+
+
+class VectorIndex:
+    def __init__(self, path):
+        self.path = path
+        with np.load(os.path.join(path, 'model.npz')) as model:
+            self.idf = model['idf']
+            self.components = model['components']
+        with open(os.path.join(path, 'meta.json'), encoding='utf-8') as f:
+            meta = json.load(f)
+        self.count = meta['count']
+        # 旧版本只记录sn，迁移时已有论文的modified_xid为0，seq与sn相同
+        self.last_key = meta.get('last_key', [0, meta.get('last_sn', 0)])
+        self.category_names = meta['categories']
+        self.ids_bytes = meta['ids_bytes']
+        self.dim = len(self.components)
+
+        with open(os.path.join(path, 'ids.txt'), encoding='utf-8') as f:
+            self.ids = f.read(self.ids_bytes).splitlines()
+        self._open_arrays()
+
+    def _open_arrays(self):
+        if self.count:
+            self.vectors = np.memmap(os.path.join(self.path, 'vectors.f32'), dtype=np.float32, mode='r',
+                                     shape=(self.count, self.dim))
+            self.categories = np.memmap(os.path.join(self.path, 'categories.u8'), dtype=np.uint8, mode='r',
+                                        shape=(self.count,))
+        else:
+            self.vectors = np.zeros((0, self.dim), np.float32)
+            self.categories = np.zeros(0, np.uint8)
+        self._rows = None
+
+    @classmethod
+    def exists(cls, path):
+        return os.path.exists(os.path.join(path, 'meta.json'))
+
+    @staticmethod
+    def create(path, idf, components):
+        """写入新模型并清空索引"""
+        os.makedirs(path, exist_ok=True)
+        np.savez(os.path.join(path, 'model.npz'), idf=idf, components=components)
+        for name in FILES:
+            open(os.path.join(path, name), 'wb').close()
+        _write_meta(path, 0, [0, 0], [], 0)
+
+    def row(self, paper_id):
+        if self._rows is None:
+            self._rows = {paper_id: row for row, paper_id in enumerate(self.ids)}
+        return self._rows.get(paper_id)
+
+    def add(self, papers, last_key):
+        """写入 [Paper] 的向量：已在索引中的论文（更新了版本）原地覆盖，其余追加；写完数据文件后再更新meta.json"""
+        names = list(self.category_names)
+        codes = []
+        for paper in papers:
+            if paper.category not in names:
+                names.append(paper.category)
+            codes.append(names.index(paper.category))
+        codes = np.asarray(codes, dtype=np.uint8)
+        vectors = embed([f"{paper.title or ''} {paper.abstract or ''}" for paper in papers],
+                        self.idf, self.components).astype(np.float32)
+        rows = [self.row(paper.id) for paper in papers]
+        existing = [i for i, row in enumerate(rows) if row is not None]
+        new = [i for i, row in enumerate(rows) if row is None]
+
+        if existing:
+            # 重新运行时覆盖的内容相同，中途失败也不需要回滚
+            targets = [rows[i] for i in existing]
+            for name, values, shape in (('vectors.f32', vectors, (self.count, self.dim)),
+                                        ('categories.u8', codes, (self.count,))):
+                array = np.memmap(os.path.join(self.path, name), dtype=values.dtype, mode='r+', shape=shape)
+                array[targets] = values[existing]
+                array.flush()
+                del array
+        ids = ''.join(f"{papers[i].id}\n" for i in new).encode('utf-8')
+        # 上次中途失败时文件末尾可能有多余的数据，先截断到meta.json记录的长度
+        for name, size, data in (('vectors.f32', self.count * self.dim * 4, vectors[new].tobytes()),
+                                 ('categories.u8', self.count, codes[new].tobytes()),
+                                 ('ids.txt', self.ids_bytes, ids)):
+            with open(os.path.join(self.path, name), 'r+b') as f:
+                f.truncate(size)
+                f.seek(size)
+                f.write(data)
+        _write_meta(self.path, self.count + len(new), last_key, names, self.ids_bytes + len(ids))
+
+        self.count += len(new)
+        self.last_key = last_key
+        self.category_names = names
+        self.ids_bytes += len(ids)
+        self.ids.extend(papers[i].id for i in new)
+        self._open_arrays()
+
+    def search_vector(self, vector, k=10, category=None, exclude=()):
+        """与vector最相似的k篇论文：[(论文id, 余弦相似度)]"""
+        if not self.count:
+            return []
+        scores = self.vectors @ vector.astype(np.float32)
+        if category is not None:
+            code = self.category_names.index(category) if category in self.category_names else -1
+            scores = np.where(self.categories == code, scores, -np.inf)
+        for paper_id in exclude:
+            row = self.row(paper_id)
+            if row is not None:
+                scores[row] = -np.inf
+        k = min(k, self.count)
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        return [(self.ids[row], float(scores[row])) for row in top if np.isfinite(scores[row])]
+
+    def topic(self, text, k=10, category=None):
+        """与主题描述最相似的k篇论文；主题中的词都没有出现在拟合样本中时返回空列表"""
+        vector = embed([text], self.idf, self.components)[0]
+        return self.search_vector(vector, k, category) if vector.any() else []
+
+    def related(self, paper_id, k=10):
+        """与某篇论文最相似的k篇论文（不含其自身），论文不在索引中时返回None"""
+        row = self.row(paper_id)
+        if row is None:
+            return None
+        return self.search_vector(np.asarray(self.vectors[row]), k, exclude=[paper_id])
+
+
+def _write_meta(path, count, last_key, categories, ids_bytes):
+    temporary = os.path.join(path, 'meta.json.tmp')
+    with open(temporary, 'w', encoding='utf-8') as f:
+        json.dump({'count': count, 'last_key': last_key, 'categories': categories, 'ids_bytes': ids_bytes}, f)
+    os.replace(temporary, os.path.join(path, 'meta.json'))
+
+
+def _changed_papers(after_key):
+    """逐批返回水位线after_key之后入库或更新了版本的论文：(论文列表, 这批最后一篇的 [modified_xid, seq])"""
+    import db
+    from config import DB_POOL_CONFIG
+
+    batch, last_key = [], after_key
+    for row in db.stream('vector_index_papers', f"""
+            SELECT {db.PAPER_COLUMNS}, modified_xid, seq FROM papers WHERE {db.CHANGED_AFTER};
+        """, tuple(after_key)):
+        batch.append(db.Paper(*row[:-2]))
+        last_key = list(row[-2:])
+        if len(batch) >= DB_POOL_CONFIG['itersize']:
+            yield batch, last_key
+            batch = []
+    if batch:
+        yield batch, last_key
+
+
+def update(path=None, log=print):
+    """把新入库和更新了版本的论文写入索引，返回写入的论文数；索引不存在时返回None"""
+    from config import VECTOR_INDEX_CONFIG
+
+    path = path or VECTOR_INDEX_CONFIG['path']
+    if not VectorIndex.exists(path):
+        return None
+    index = VectorIndex(path)
+    start, added = time.perf_counter(), 0
+    for papers, last_key in _changed_papers(index.last_key):
+        index.add(papers, last_key)
+        added += len(papers)
+    if added:
+        log(f"🧭 向量索引写入 {added} 篇论文，共 {index.count} 篇 ({time.perf_counter() - start:.1f}s)")
+    return added
+
+
+def build(path=None, log=print):
+    """在最近的sample_size篇论文上拟合模型，然后为全部论文重建索引"""
+    import db
+    from config import VECTOR_INDEX_CONFIG
+
+    path = path or VECTOR_INDEX_CONFIG['path']
+    start = time.perf_counter()
+    sample = [f"{title or ''} {abstract or ''}" for title, abstract in db.stream(
+        'vector_index_sample', "SELECT title, abstract FROM papers ORDER BY sn DESC LIMIT %s;",
+        (VECTOR_INDEX_CONFIG['sample_size'],)
+    )]
+    if not sample:
+        log("❌ papers表中没有论文，无法建立向量索引")
+        return
+    idf, components = fit(sample, VECTOR_INDEX_CONFIG['dim'], VECTOR_INDEX_CONFIG['n_features'])
+    log(f"🧮 在 {len(sample)} 篇论文上拟合了 {len(components)} 维投影 ({time.perf_counter() - start:.1f}s)")
+    VectorIndex.create(path, idf, components)
+    update(path, log)
+
+
+def main():
+    import db
+    from config import VECTOR_INDEX_CONFIG
+
+    path = VECTOR_INDEX_CONFIG['path']
+    command = sys.argv[1] if len(sys.argv) > 1 else "update"
+    if command == "build":
+        build(path)
+    elif command == "update":
+        if update(path) is None:
+            print(f"❌ 向量索引 {path} 不存在，请先运行 python vector_index.py build")
+    elif command in ("topic", "related") and len(sys.argv) > 2:
+        if not VectorIndex.exists(path):
+            print(f"❌ 向量索引 {path} 不存在，请先运行 python vector_index.py build")
+            return
+        index = VectorIndex(path)
+        k = int(sys.argv[3]) if len(sys.argv) > 3 else 10
+        start = time.perf_counter()
+        results = index.topic(sys.argv[2], k) if command == "topic" else index.related(sys.argv[2], k)
+        elapsed = (time.perf_counter() - start) * 1000
+        if results is None:
+            print(f"❌ 论文 {sys.argv[2]} 不在向量索引中（可运行 python vector_index.py update）")
+            return
+        papers = {paper.id: paper for paper in db.get_papers_by_ids([paper_id for paper_id, _ in results])}
+        for i, (paper_id, score) in enumerate(results, 1):
+            paper = papers.get(paper_id)
+            print(f"{i:3d}. [{score:.3f}] {paper_id} {paper.title[:80] if paper else ''}")
+        print(f"\n🧭 {index.count} 篇论文中查询用时 {elapsed:.1f} ms")
+    else:
+        print(f"❌ 未知命令: {' '.join(sys.argv[1:])}（可用: build, update, topic <主题> [k], related <论文id> [k]）")
+    db.close_pool()
+
+
+if __name__ == "__main__":
+    main()